@@ -12,6 +12,7 @@ BuildRequires: intltool
 BuildRequires: gettext
 BuildRequires: python-setuptools
 BuildRequires: libappstream-glib
+BuildRequires: systemd
 Requires: python3
 Requires: pygobject3
 Requires: gettext
@@ -23,6 +24,7 @@ Requires: yelp
 Requires: python3-meh
 Requires: python3-meh-gui
 Requires: python3-pid
+Requires: python3-pyudev
 URL: http://github.com/rhinstaller/blivet-gui
 
 %description
@@ -62,6 +64,8 @@ fi
 %{_datadir}/polkit-1/actions/org.fedoraproject.pkexec.blivet-gui.policy
 %{_datadir}/icons/hicolor/*/apps/blivet-gui.png
 %{_datadir}/appdata/blivet-gui.appdata.xml
+%{_unitdir}/blivet-gui-daemon.socket
+%{_unitdir}/blivet-gui-daemon.service
 %{_datadir}/blivet-gui
 %{_bindir}/blivet-gui
 %{_bindir}/blivet-gui-daemon
@@ -30,12 +30,22 @@ from blivet.formats import DeviceFormat
 from blivet.devicelibs.crypto import LUKS_METADATA_SIZE
 
 from .communication.proxy_utils import ProxyDataContainer
+from .size_info_cache import SizeInfoCache
+from .device_index import DeviceIndex
+from .timings import timeline
 
+import functools
+import os
 import socket
 import platform
 import re
 import traceback
 import parted
+import queue
+import threading
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait as futures_wait
 
 import atexit
 
@@ -160,19 +170,161 @@ class FreeSpaceDevice(object):
         return "existing " + str(self.size) + " free space"
 
 
+class ScopedStorage(object):
+    """ Blivet instance limited to selected disks, used for partition allocation
+        on these disks only (see :func:`BlivetUtils._do_partitioning`)
+
+        Only lists of partitioned disks and partitions are limited, all other
+        attributes are read from (and set to) the Blivet instance.
+    """
+
+    def __init__(self, storage, disks):
+        object.__setattr__(self, "_storage", storage)
+        object.__setattr__(self, "_disk_ids", set(disk.id for disk in disks))
+
+    @property
+    def partitioned(self):
+        return [disk for disk in self._storage.partitioned if disk.id in self._disk_ids]
+
+    @property
+    def partitions(self):
+        return [part for part in self._storage.partitions if self._in_scope(part)]
+
+    def _in_scope(self, partition):
+        if not partition.exists and partition.req_disks:
+            return all(disk.id in self._disk_ids for disk in partition.req_disks)
+        else:
+            return partition.disk is not None and partition.disk.id in self._disk_ids
+
+    def __getattr__(self, name):
+        return getattr(self._storage, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._storage, name, value)
+
+
+class SizeInfoProbe(object):
+    """ Probing of size information (minimal size) of one format
+    """
+
+    def __init__(self, fmt, prefetch):
+        """
+
+        :param fmt: probed format
+        :type fmt: blivet.formats.DeviceFormat
+        :param prefetch: probing started in background (not requested by the client)
+        :type prefetch: bool
+
+        """
+
+        self.fmt = fmt
+        self.prefetch = prefetch
+
+        self.future = None
+        self.started = threading.Event()
+        self.start_time = None
+
+    def run(self, update_size_info):
+        self.start_time = time.monotonic()
+        self.started.set()
+
+        update_size_info(self.fmt)
+
+
+class DaemonThreadPool(object):
+    """ Minimal thread pool running the tasks in daemon threads
+
+        ..note.: threads of :class:`concurrent.futures.ThreadPoolExecutor` are
+                 joined when the interpreter exits, a probe hanging past its
+                 timeout would block the daemon from exiting
+    """
+
+    # seconds an idle thread waits for a new task before it exits
+    idle_timeout = 10
+
+    def __init__(self, max_workers, name):
+        """
+
+        :param max_workers: maximal number of threads
+        :type max_workers: int
+        :param name: prefix of names of the threads
+        :type name: str
+
+        """
+
+        self.max_workers = max_workers
+        self.name = name
+
+        self._tasks = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """ Run fn(*args, **kwargs) in one of the threads
+
+            :rtype: :class:`concurrent.futures.Future`
+
+        """
+
+        future = Future()
+        self._tasks.put((future, fn, args, kwargs))
+
+        with self._lock:
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker, name="%s-%d" % (self.name, len(self._threads)))
+                thread.daemon = True
+                self._threads.append(thread)
+                thread.start()
+
+        return future
+
+    def _worker(self):
+        while True:
+            try:
+                future, fn, args, kwargs = self._tasks.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    # task could be added right before we got the lock
+                    if self._tasks.empty():
+                        self._threads.remove(threading.current_thread())
+                        return
+                continue
+
+            # task canceled while waiting in the queue
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:  # pylint: disable=broad-except
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
 class BlivetUtils(object):
     """ Class with utils directly working with blivet itselves
     """
 
+    # number of threads probing filesystems for size information (minimal size)
+    size_info_workers = 4
+    # how long can probing of one format take (in seconds)
+    size_info_timeout = 120
+    # probe all resizable formats in background after the device tree is loaded
+    size_info_prefetch = True
+    # number of threads opening LUKS devices in luks_decrypt_all
+    luks_decrypt_workers = 4
+
     def __init__(self, kickstart=False):
 
         self.kickstart = kickstart
 
-        if self.kickstart:
-            self.ksparser = pykickstart.parser.KickstartParser(makeVersion())
-            self.storage = blivet.Blivet(ksdata=self.ksparser.handler)
-        else:
-            self.storage = blivet.Blivet()
+        with timeline.phase("blivet.Blivet()"):
+            if self.kickstart:
+                self.ksparser = pykickstart.parser.KickstartParser(makeVersion())
+                self.storage = blivet.Blivet(ksdata=self.ksparser.handler)
+            else:
+                self.storage = blivet.Blivet()
 
         self.blivet_logfile, self.program_logfile = self.set_logging()
 
@@ -180,8 +332,42 @@ class BlivetUtils(object):
         blivet.formats.fs.NTFS._formattable = True
         blivet.formats.fs.NTFS._supported = True
 
-        self.storage.reset()
-        self._update_min_sizes_info()
+        # generation of the device tree information sent to the client and
+        # 'keys' of the devices in it (see get_devicetree_diff)
+        self._snapshot_generation = 0
+        self._snapshot_keys = {}
+
+        # id of format -> SizeInfoProbe; size information is probed in
+        # background and waited for only when needed, formats requested by the
+        # client have their own threads and don't wait for the background ones
+        self._size_info = {}
+        self._size_info_lock = threading.Lock()
+        self._size_info_executor = DaemonThreadPool(self.size_info_workers, "blivet-gui-size-info")
+        self._size_info_demand_executor = DaemonThreadPool(self.size_info_workers, "blivet-gui-size-info-demand")
+        # size information saved from previous runs
+        self._size_info_cache = SizeInfoCache()
+
+        # id of disk -> aligned free regions on the disk; regions are computed
+        # only when needed and dropped when an action touching the disk is
+        # added or removed (generation is increased with every change)
+        self._free_regions = {}
+        self._free_regions_generation = 0
+        self._free_regions_lock = threading.Lock()
+        # key -> (free space or raw format device, ids of its disks); the same
+        # pseudo-device is returned until its disks are changed
+        self._pseudo_devices = {}
+
+        with timeline.phase("storage.reset()"):
+            self.storage.reset()
+        with timeline.phase("_update_min_sizes_info"):
+            self._update_min_sizes_info()
+
+        # lookup indexes for the device tree, updated when actions are added
+        # or removed (see _on_action_changed)
+        self._device_index = DeviceIndex(self.storage)
+
+        blivet.callbacks.callbacks.action_added.add(self._on_action_changed)
+        blivet.callbacks.callbacks.action_removed.add(functools.partial(self._on_action_changed, removed=True))
 
     def set_logging(self):
         """ Set logging for blivet-gui-daemon process
@@ -227,6 +413,163 @@ class BlivetUtils(object):
 
         return devices
 
+    def get_devicetree_snapshot(self):
+        """ Return information about all devices in the device tree
+
+            :returns: picklable information about devices (parents and children
+                      are represented by device ids)
+            :rtype: :class:`~.communication.proxy_utils.ProxyDataContainer`
+
+        """
+
+        devices = [self._device_snapshot(device) for device in self.storage.devices]
+
+        self._snapshot_keys = dict((info.id, self._snapshot_key(info)) for info in devices)
+        self._snapshot_generation += 1
+
+        return ProxyDataContainer(generation=self._snapshot_generation, devices=devices,
+                                  **self._snapshot_toplevel())
+
+    def get_devicetree_diff(self):
+        """ Return changes in the device tree since the last snapshot (or diff)
+
+            :returns: generation of the device tree information, information
+                      about added and changed devices and ids of removed devices
+            :rtype: :class:`~.communication.proxy_utils.ProxyDataContainer`
+
+        """
+
+        devices = dict((info.id, info) for info in (self._device_snapshot(device) for device in self.storage.devices))
+        keys = dict((dev_id, self._snapshot_key(info)) for dev_id, info in devices.items())
+
+        added = [devices[dev_id] for dev_id in keys.keys() if dev_id not in self._snapshot_keys.keys()]
+        removed = [dev_id for dev_id in self._snapshot_keys.keys() if dev_id not in keys.keys()]
+        changed = [devices[dev_id] for dev_id in keys.keys() if dev_id in self._snapshot_keys.keys() and
+                   keys[dev_id] != self._snapshot_keys[dev_id]]
+
+        self._snapshot_keys = keys
+        self._snapshot_generation += 1
+
+        return ProxyDataContainer(generation=self._snapshot_generation, added=added, removed=removed,
+                                  changed=changed, **self._snapshot_toplevel())
+
+    def _snapshot_toplevel(self):
+        return dict(disks=[disk.id for disk in self.storage.disks],
+                    lvm=[vg.id for vg in self.storage.vgs],
+                    raid=[md.id for md in self.storage.mdarrays],
+                    btrfs=[btrfs.id for btrfs in self.storage.btrfs_volumes])
+
+    def _snapshot_key(self, info):
+        """ Return comparable representation of device information (without
+            the device itself)
+        """
+
+        fmt_key = tuple(("format." + key, info.format[key]) for key in sorted(info.format))
+
+        return tuple((key, info[key]) for key in sorted(info) if key not in ("device", "format")) + fmt_key
+
+    def _device_snapshot(self, blivet_device):
+        """ Return picklable information about a device
+        """
+
+        fmt = blivet_device.format
+
+        fmt_info = ProxyDataContainer(type=fmt.type,
+                                      exists=fmt.exists,
+                                      status=fmt.status if fmt.type else False,
+                                      mountable=fmt.mountable,
+                                      mountpoint=getattr(fmt, "mountpoint", None),
+                                      system_mountpoint=getattr(fmt, "system_mountpoint", None),
+                                      label=getattr(fmt, "label", None))
+
+        info = ProxyDataContainer(device=blivet_device,
+                                  id=blivet_device.id,
+                                  name=blivet_device.name,
+                                  type=blivet_device.type,
+                                  size=blivet_device.size,
+                                  exists=blivet_device.exists,
+                                  protected=blivet_device.protected,
+                                  isleaf=blivet_device.isleaf,
+                                  is_disk=blivet_device.is_disk,
+                                  removable=getattr(blivet_device, "removable", False),
+                                  model=getattr(blivet_device, "model", None),
+                                  format=fmt_info,
+                                  parents=[parent.id for parent in blivet_device.parents],
+                                  children=[child.id for child in blivet_device.children],
+                                  disk=None, start=None, end=None,
+                                  is_extended=False, is_logical=False, is_primary=False)
+
+        if blivet_device.type == "partition":
+            info["disk"] = blivet_device.disk.id if blivet_device.disk else None
+            info["is_extended"] = blivet_device.is_extended
+            info["is_logical"] = blivet_device.is_logical
+            info["is_primary"] = blivet_device.is_primary
+
+            if blivet_device.parted_partition:
+                info["start"] = blivet_device.parted_partition.geometry.start
+                info["end"] = blivet_device.parted_partition.geometry.end
+
+        return info
+
+    def get_device_by_name(self, name):
+        """ Get device with given name
+
+            :param name: name of the device
+            :type name: str
+            :returns: device or None if it doesn't exist
+            :rtype: blivet.devices.StorageDevice or None
+
+        """
+
+        devices = self._device_index.get("names", name)
+        return devices[0] if devices else None
+
+    def get_devices_by_type(self, device_type):
+        """ Get all devices of given type
+
+            :param device_type: type of the devices (e.g. "lvmvg")
+            :type device_type: str
+            :rtype: list of blivet.devices.StorageDevice
+
+        """
+
+        return self._device_index.get("types", device_type)
+
+    def get_disk_partitions(self, disk):
+        """ Get all partitions on the disk
+
+            :param disk: disk
+            :type disk: blivet.devices.DiskDevice
+            :rtype: list of blivet.devices.PartitionDevice
+
+        """
+
+        return self._device_index.get("partitions", disk.id)
+
+    def get_snapshots(self, blivet_device):
+        """ Get snapshots of the LV
+
+            :param blivet_device: LV
+            :type blivet_device: blivet.devices.LVMLogicalVolumeDevice
+            :rtype: list of blivet.devices.LVMSnapShotDevice
+
+        """
+
+        return self._device_index.get("snapshots", blivet_device.id)
+
+    def get_container(self, blivet_device):
+        """ Get container (VG, MD array or btrfs volume) the device is member of
+
+            :param blivet_device: member device
+            :type blivet_device: blivet.devices.StorageDevice
+            :returns: container or None if the device isn't a member of one
+            :rtype: blivet.devices.StorageDevice or None
+
+        """
+
+        containers = self._device_index.get("containers", blivet_device.id)
+        return containers[0] if containers else None
+
     def get_free_pvs_info(self):
         """ Return list of PVs without VGs
 
@@ -241,7 +584,7 @@ class BlivetUtils(object):
 
         for pv in pvs:
             if not pv.children:
-                free_pvs.append((pv, FreeSpaceDevice(pv.size, self.storage.next_id, None, None, pv.parents)))
+                free_pvs.append((pv, self._free_space_device(pv.size, None, None, pv.parents)))
 
         return free_pvs
 
@@ -252,7 +595,111 @@ class BlivetUtils(object):
         if blivet_device.type != "lvmvg":
             return None
 
-        return FreeSpaceDevice(blivet_device.free_space, self.storage.next_id, None, None, [blivet_device])
+        return self._free_space_device(blivet_device.free_space, None, None, [blivet_device])
+
+    def _get_free_regions(self, disk):
+        """ Return aligned free regions on the disk
+
+            :param disk: disk with a disklabel
+            :type disk: blivet.devices.DiskDevice
+            :returns: start, end and size of the free regions
+            :rtype: list of tuples
+
+        """
+
+        with self._free_regions_lock:
+            regions = self._free_regions.get(disk.id)
+            generation = self._free_regions_generation
+
+        if regions is not None:
+            return regions
+
+        regions = [(region.start, region.end, blivet.size.Size(region.length * region.device.sectorSize))
+                   for region in blivet.partitioning.get_free_regions([disk], align=True)]
+
+        with self._free_regions_lock:
+            # don't save regions if the device tree changed in the meantime
+            if generation == self._free_regions_generation:
+                self._free_regions[disk.id] = regions
+
+        return regions
+
+    def _invalidate_free_regions(self, disks=None):
+        """ Drop cached free regions and pseudo-devices of the disks (or of
+            all disks for None)
+        """
+
+        with self._free_regions_lock:
+            self._free_regions_generation += 1
+
+            if disks is None:
+                self._free_regions.clear()
+                self._pseudo_devices.clear()
+            else:
+                disk_ids = set(disk.id for disk in disks)
+                for disk_id in disk_ids:
+                    self._free_regions.pop(disk_id, None)
+
+                stale = [key for key, (_device, device_disks) in self._pseudo_devices.items()
+                         if device_disks & disk_ids]
+                for key in stale:
+                    del self._pseudo_devices[key]
+
+    def _get_pseudo_device(self, key, parents, create):
+        """ Return existing pseudo-device (free space or raw format) with given
+            key or a new one created by calling 'create' with new device id
+        """
+
+        with self._free_regions_lock:
+            if key in self._pseudo_devices.keys():
+                return self._pseudo_devices[key][0]
+
+            disk_ids = set(disk.id for parent in parents for disk in parent.disks)
+            disk_ids.update(parent.id for parent in parents if parent.is_disk)
+
+            device = create(self.storage.next_id)
+            self._pseudo_devices[key] = (device, disk_ids)
+
+        return device
+
+    def _free_space_device(self, free_size, start, end, parents, logical=False):
+        """ Return :class:`FreeSpaceDevice` for the free space, the same free
+            space is always represented by the same object
+        """
+
+        key = ("free space", tuple(parent.id for parent in parents), start, end, logical, int(free_size))
+
+        return self._get_pseudo_device(key, parents,
+                                       lambda dev_id: FreeSpaceDevice(free_size, dev_id, start, end, parents, logical))
+
+    def _raw_format_device(self, disk):
+        """ Return :class:`RawFormatDevice` for the disk, the same format is
+            always represented by the same object
+        """
+
+        key = ("raw format", disk.id, id(disk.format))
+
+        return self._get_pseudo_device(key, [disk],
+                                       lambda dev_id: RawFormatDevice(disk=disk, fmt=disk.format, dev_id=dev_id))
+
+    def _on_action_changed(self, action, removed=False):
+        """ Callback for added/removed actions
+        """
+
+        disks = list(action.device.disks)
+        if action.device.is_disk:
+            disks.append(action.device)
+
+        self._invalidate_free_regions(disks)
+        self._device_index.update(action, removed)
+
+    def _devicetree_reloaded(self):
+        """ Drop all cached information about the device tree (after reset
+            or populate)
+        """
+
+        self._invalidate_free_regions()
+        self._device_index.rebuild()
 
     def get_free_disks_regions(self, include_uninitialized=False):
         """ Returns list of non-empty disks with free space
@@ -262,19 +709,15 @@ class BlivetUtils(object):
 
         for disk in self.storage.disks:
             if not disk.format.type and include_uninitialized:
-                free_disks.append(FreeSpaceDevice(disk.size, self.storage.next_id, 0, disk.current_size, [disk]))
+                free_disks.append(self._free_space_device(disk.size, 0, disk.current_size, [disk]))
                 continue
 
             elif disk.format.type not in ("disklabel",):
                 continue
 
-            free_space = blivet.partitioning.get_free_regions([disk], align=True)
-
-            for free in free_space:
-                free_size = blivet.size.Size(free.length * free.device.sectorSize)
-
+            for start, end, free_size in self._get_free_regions(disk):
                 if free_size > blivet.size.Size("2 MiB"):
-                    free_disks.append(FreeSpaceDevice(free_size, self.storage.next_id, free.start, free.end, [disk]))
+                    free_disks.append(self._free_space_device(free_size, start, end, [disk]))
 
         return free_disks
 
@@ -341,7 +784,7 @@ class BlivetUtils(object):
         childs = blivet_device.children
 
         if blivet_device.type == "lvmvg" and blivet_device.free_space > blivet.size.Size(0):
-            childs.append(FreeSpaceDevice(blivet_device.free_space, self.storage.next_id, None, None, [blivet_device]))
+            childs.append(self._free_space_device(blivet_device.free_space, None, None, [blivet_device]))
 
         return childs
 
@@ -351,12 +794,12 @@ class BlivetUtils(object):
 
         if blivet_device.is_disk and not blivet_device.format.type:
             # empty disk without disk label
-            partitions = [FreeSpaceDevice(blivet_device.size, self.storage.next_id, 0, blivet_device.current_size, [blivet_device], False)]
+            partitions = [self._free_space_device(blivet_device.size, 0, blivet_device.current_size, [blivet_device], False)]
             return ProxyDataContainer(partitions=partitions, extended=None, logicals=None)
 
         if blivet_device.format and blivet_device.format.type not in ("disklabel", "btrfs", "luks", None):
             # special occasion -- raw device format
-            partitions = [RawFormatDevice(disk=blivet_device, fmt=blivet_device.format, dev_id=self.storage.next_id)]
+            partitions = [self._raw_format_device(blivet_device)]
             return ProxyDataContainer(partitions=partitions, extended=None, logicals=None)
 
         if blivet_device.format and blivet_device.format.type == "btrfs" and blivet_device.children:
@@ -368,7 +811,7 @@ class BlivetUtils(object):
             if blivet_device.children:
                 luks = blivet_device.children[0]
             else:
-                luks = RawFormatDevice(disk=blivet_device, fmt=blivet_device.format, dev_id=self.storage.next_id)
+                luks = self._raw_format_device(blivet_device)
 
             return ProxyDataContainer(partitions=[luks], extended=None, logicals=None)
 
@@ -446,15 +889,13 @@ class BlivetUtils(object):
 
         free_logical = []
 
-        free_regions = blivet.partitioning.get_free_regions([blivet_device], align=True)
-        for region in free_regions:
-            region_size = blivet.size.Size(region.length * region.device.sectorSize)
+        for start, end, region_size in self._get_free_regions(blivet_device):
             if region_size < blivet.size.Size("4 MiB"):
                 continue
 
-            if region.start >= extended.geometry.start and \
-               region.end <= extended.geometry.end:
-                free_logical.append(FreeSpaceDevice(region_size, self.storage.next_id, region.start, region.end, [blivet_device], True))
+            if start >= extended.geometry.start and \
+               end <= extended.geometry.end:
+                free_logical.append(self._free_space_device(region_size, start, end, [blivet_device], True))
 
         return free_logical
 
@@ -464,18 +905,16 @@ class BlivetUtils(object):
 
         free_primary = []
         extended = blivet_device.format.extended_partition
-        free_regions = blivet.partitioning.get_free_regions([blivet_device], align=True)
 
-        for region in free_regions:
-            region_size = blivet.size.Size(region.length * region.device.sectorSize)
+        for start, end, region_size in self._get_free_regions(blivet_device):
             if region_size < blivet.size.Size("4 MiB"):
                 continue
 
-            if extended and not (region.start >= extended.geometry.start and
-               region.end <= extended.geometry.end):
-                free_primary.append(FreeSpaceDevice(region_size, self.storage.next_id, region.start, region.end, [blivet_device], False))
+            if extended and not (start >= extended.geometry.start and
+               end <= extended.geometry.end):
+                free_primary.append(self._free_space_device(region_size, start, end, [blivet_device], False))
             elif not extended:
-                free_primary.append(FreeSpaceDevice(region_size, self.storage.next_id, region.start, region.end, [blivet_device], False))
+                free_primary.append(self._free_space_device(region_size, start, end, [blivet_device], False))
 
         return free_primary
 
@@ -605,25 +1044,166 @@ class BlivetUtils(object):
 
         return ProxyDataContainer(success=True, actions=actions, message=None, exception=None, traceback=None)
 
-    def _has_snapshots(self, blivet_device):
+    def _do_partitioning(self, actions=None):
+        """ Allocate partitions
 
-        for lvs in blivet_device.vg.children:
-            if isinstance(lvs, LVMSnapShotDevice) and lvs.origin == blivet_device:
-                return True
+            If possible, only disks with partitions changed by 'actions' are
+            allocated, other disks are left as they are.
 
-        return False
+            :param actions: newly added actions
+            :type actions: list of blivet.deviceaction.DeviceAction
+
+        """
+
+        disks = self._partitioning_scope(actions)
+
+        # new partitions can be moved when allocating
+        self._invalidate_free_regions(disks)
+
+        if disks is None:
+            blivet.partitioning.do_partitioning(self.storage)
+        else:
+            blivet.partitioning.do_partitioning(ScopedStorage(self.storage, disks))
+
+        self._device_index.refresh_partitions(disks)
+
+    def _partitioning_scope(self, actions):
+        """ Disks that need to be allocated after adding 'actions' or None if
+            all disks need to be allocated
+        """
+
+        if actions is None:
+            return None
+
+        disks = {}
+
+        for action in actions:
+            device = action.device
+            if device.type != "partition":
+                continue
+
+            if not device.exists:
+                if not device.req_disks:
+                    return None
+                disks.update((disk.id, disk) for disk in device.req_disks)
+            elif device.disk is not None:
+                disks[device.disk.id] = device.disk
+
+        # partitions growing together on multiple disks (e.g. for md or lvm)
+        if getattr(self.storage, "size_sets", None):
+            return None
+
+        for part in self.storage.partitions:
+            if part.exists:
+                continue
+
+            req_disks = set(disk.id for disk in part.req_disks)
+
+            # request that can be allocated on (or grow to) multiple disks
+            if not req_disks or (part.req_grow and len(req_disks) > 1):
+                return None
+
+            # request partially in scope could be moved out of its disk
+            if req_disks & set(disks.keys()) and not req_disks <= set(disks.keys()):
+                return None
+
+        return list(disks.values())
+
+    def _has_snapshots(self, blivet_device):
+        return bool(self._device_index.get("snapshots", blivet_device.id))
 
     def _update_min_sizes_info(self):
-        """ Update information of minimal size for resizable devices
+        """ Start updating information of minimal size for resizable devices
+            in background (see :func:`_size_info_probe`)
         """
 
+        # formats of devices from before reset are no longer interesting
+        self._cancel_size_info()
+
+        if not self.size_info_prefetch:
+            return
+
         for device in self.storage.devices:
             if device.type in ("partition", "lvmlv"):
                 if device.format and device.format.type and device.format.resizable and hasattr(device.format, "update_size_info"):
-                    try:
-                        device.format.update_size_info()
-                    except blivet.errors.FSError:
-                        pass
+                    self._size_info_probe(device.format, prefetch=True)
+
+    def _cancel_size_info(self):
+        """ Forget all probes and cancel the ones that haven't started yet
+
+            :returns: futures of probes that are still running
+            :rtype: list of :class:`concurrent.futures.Future`
+
+        """
+
+        with self._size_info_lock:
+            probes = list(self._size_info.values())
+            self._size_info = {}
+
+        return [probe.future for probe in probes if not probe.future.cancel()]
+
+    def _size_info_probe(self, fmt, prefetch=False):
+        """ Get probe of size information of the format; probing is started
+            if it wasn't started before
+
+            :param fmt: format
+            :type fmt: blivet.formats.DeviceFormat
+            :param prefetch: probe in background (otherwise the format is
+                             probed ahead of formats probed in background)
+            :type prefetch: bool
+            :rtype: :class:`SizeInfoProbe`
+
+            ..note.: probing runs external tools (resize2fs, ntfsresize...),
+                     formats are probed in parallel in a thread pool
+        """
+
+        with self._size_info_lock:
+            probe = self._size_info.get(id(fmt))
+            if probe is not None and probe.fmt is fmt:
+                # format still waiting for the background probing is probed now
+                if prefetch or not probe.prefetch or not probe.future.cancel():
+                    return probe
+
+            probe = SizeInfoProbe(fmt, prefetch)
+            executor = self._size_info_executor if prefetch else self._size_info_demand_executor
+            probe.future = executor.submit(probe.run, self._update_size_info)
+            self._size_info[id(fmt)] = probe
+
+        return probe
+
+    def _update_size_info(self, fmt):
+        """ Update size information of the format, use cached information if
+            the filesystem wasn't changed since it was saved
+        """
+
+        if not self._size_info_cache.supported(fmt):
+            fmt.update_size_info()
+            return
+
+        if self._size_info_cache.apply(fmt):
+            return
+
+        fmt.update_size_info()
+        self._size_info_cache.store(fmt)
+
+    def _wait_size_info(self, fmt):
+        """ Wait for size information of the format
+
+            :raises blivet.errors.FSError: when probing failed
+            :raises concurrent.futures.TimeoutError: when probing takes too long
+
+            ..note.: time spent waiting for a free thread doesn't count, but
+                     it is limited too -- threads can be blocked by probes
+                     that never finish
+        """
+
+        probe = self._size_info_probe(fmt)
+
+        if not probe.started.wait(timeout=self.size_info_timeout):
+            raise FutureTimeoutError()
+
+        remaining = self.size_info_timeout - (time.monotonic() - probe.start_time)
+        probe.future.result(timeout=max(remaining, 0))
 
     def device_resizable(self, blivet_device):
         """ Is given device resizable
@@ -655,16 +1235,22 @@ class BlivetUtils(object):
                                       max_size=blivet_device.size)
 
         try:
-            blivet_device.format.update_size_info()
+            self._wait_size_info(blivet_device.format)
 
             if blivet_device.type == "luks/dm-crypt":
-                blivet_device.slave.format.update_size_info()
+                self._wait_size_info(blivet_device.slave.format)
 
         except blivet.errors.FSError as e:
             return ProxyDataContainer(resizable=False, error=str(e),
                                       min_size=blivet.size.Size("1 MiB"),
                                       max_size=blivet_device.size)
 
+        except FutureTimeoutError:
+            msg = _("Getting size information for {name} timed out.").format(name=blivet_device.name)
+            return ProxyDataContainer(resizable=False, error=msg,
+                                      min_size=blivet.size.Size("1 MiB"),
+                                      max_size=blivet_device.size)
+
         if blivet_device.resizable and blivet_device.format.resizable:
 
             if blivet_device.type == "luks/dm-crypt":
@@ -739,7 +1325,7 @@ class BlivetUtils(object):
         try:
             for ac in actions:
                 self.storage.devicetree.actions.add(ac)
-            blivet.partitioning.do_partitioning(self.storage)
+            self._do_partitioning(actions)
             return ProxyDataContainer(success=True, actions=actions, message=None, exception=None, traceback=None)
 
         except Exception as e:  # pylint: disable=broad-except
@@ -800,16 +1386,18 @@ class BlivetUtils(object):
 
         else:
             name = self.storage.safe_device_name(name)
+            # list of names is computed from all devices, get it only once
+            names = set(self.storage.names)
 
             # if name exists add -XX suffix
-            if name in self.storage.names or (parent_device and parent_device.name + "-" + name in self.storage.names):
+            if name in names or (parent_device and parent_device.name + "-" + name in names):
                 for i in range(100):
-                    if name + "-" + str(i) not in self.storage.names:
+                    if name + "-" + str(i) not in names:
                         name = name + "-" + str(i)
                         break
 
             # if still exists let blivet pick it
-            if name in self.storage.names:
+            if name in names:
                 name = self._pick_device_name(name=None, parent_device=parent_device)
 
         return name
@@ -1148,7 +1736,7 @@ class BlivetUtils(object):
                 if not ac._applied:
                     self.storage.devicetree.actions.add(ac)
 
-            blivet.partitioning.do_partitioning(self.storage)
+            self._do_partitioning(actions)
 
         except Exception as e:  # pylint: disable=broad-except
             return ProxyDataContainer(success=False, actions=None, message=None,
@@ -1157,6 +1745,49 @@ class BlivetUtils(object):
         return ProxyDataContainer(success=True, actions=actions, message=None,
                                   exception=None, traceback=None)
 
+    def add_devices(self, user_inputs):
+        """ Create multiple new devices
+
+            Actions for all devices are scheduled first and partitioning is
+            done only once for all of them. If creating any of the devices
+            fails, all already scheduled actions are canceled.
+
+            :param user_inputs: selected parameters from AddDialog
+            :type user_inputs: list of class UserInput
+            :returns: list of actions for every new device
+            :rtype: list of lists of :class:`blivet.deviceaction.DeviceAction`
+
+        """
+
+        devices_actions = []
+        scheduled = []
+
+        # some handlers schedule actions themselves, on failure all actions
+        # added since now are canceled
+        old_actions = set(id(ac) for ac in self.storage.devicetree.actions)
+
+        try:
+            for user_input in user_inputs:
+                actions = self.add_dict[user_input.device_type](self, user_input)
+                devices_actions.append(actions)
+
+                for ac in actions:
+                    if not ac._applied:
+                        self.storage.devicetree.actions.add(ac)
+                    scheduled.append(ac)
+
+            self._do_partitioning(scheduled)
+
+        except Exception as e:  # pylint: disable=broad-except
+            tb = traceback.format_exc()
+            self.blivet_cancel_actions([ac for ac in self.storage.devicetree.actions if id(ac) not in old_actions])
+
+            return ProxyDataContainer(success=False, actions=None, message=None,
+                                      exception=e, traceback=tb)
+
+        return ProxyDataContainer(success=True, actions=devices_actions, message=None,
+                                  exception=None, traceback=None)
+
     def _remove_lvmvg_parent(self, container, parent):
         """ Add parent fromexisting lvmg
 
@@ -1203,7 +1834,7 @@ class BlivetUtils(object):
             for ac in (ac_part, ac_fmt):
                 self.storage.devicetree.actions.add(ac)
 
-            blivet.partitioning.do_partitioning(self.storage)
+            self._do_partitioning([ac_part, ac_fmt])
             parent = dev
 
         try:
@@ -1327,7 +1958,9 @@ class BlivetUtils(object):
             disk_device = self.storage.devicetree.get_device_by_name(name)
             self.storage.devicetree.hide(disk_device)
 
-        self.storage.devicetree.populate()
+        # hiding removes the disks and all devices on them from the device
+        # tree, no need to scan the devices again
+        self._devicetree_reloaded()
 
     def luks_decrypt(self, blivet_device, passphrase):
         """ Decrypt selected luks device
@@ -1348,9 +1981,320 @@ class BlivetUtils(object):
             return False
 
         else:
-            self.storage.devicetree.populate()
+            self._populate_luks_devices([blivet_device])
             return True
 
+    def get_locked_luks_devices(self):
+        """ Get all LUKS devices that are not opened
+
+            :rtype: list of blivet.devices.StorageDevice
+
+        """
+
+        return [device for device in self.storage.devices
+                if device.format.type == "luks" and device.format.exists and
+                not device.format.status and not device.children]
+
+    def luks_decrypt_all(self, blivet_devices, passphrase):
+        """ Decrypt multiple luks devices with the same passphrase
+
+            Devices are opened in parallel and the device tree is updated only
+            once after all of them were opened.
+
+            :param blivet_devices: devices to decrypt
+            :type blivet_devices: list of LUKSDevice
+            :param passphrase: passphrase
+            :type passphrase: str
+            :returns: successfully decrypted devices and devices that failed
+            :rtype: :class:`~.communication.proxy_utils.ProxyDataContainer`
+
+        """
+
+        def _decrypt(blivet_device):
+            blivet_device.format._set_passphrase(passphrase)
+
+            try:
+                blivet_device.format.setup()
+            except blivet.errors.LUKSError:
+                return False
+            else:
+                return True
+
+        with ThreadPoolExecutor(max_workers=self.luks_decrypt_workers) as executor:
+            results = list(executor.map(_decrypt, blivet_devices))
+
+        decrypted = [device for (device, result) in zip(blivet_devices, results) if result]
+        failed = [device for (device, result) in zip(blivet_devices, results) if not result]
+
+        if decrypted:
+            self._populate_luks_devices(decrypted)
+
+        return ProxyDataContainer(decrypted=decrypted, failed=failed)
+
+    def _populate_luks_devices(self, blivet_devices):
+        """ Add newly opened LUKS devices and devices on them to the device tree
+
+            Only the new dm-crypt devices and their holders are scanned, full
+            populate is used only when some of the new devices can't be found.
+
+            :param blivet_devices: opened LUKS devices
+            :type blivet_devices: list of blivet.devices.StorageDevice
+
+        """
+
+        devicetree = self.storage.devicetree
+
+        blivet.udev.settle()
+        to_scan = [blivet.udev.get_device(device_node="/dev/mapper/" + device.format.map_name)
+                   for device in blivet_devices]
+
+        if None in to_scan:
+            devicetree.populate()
+            self._devicetree_reloaded()
+            return
+
+        # LVM information might have changed (e.g. new PV on the LUKS device)
+        self._drop_device_info_cache()
+
+        self._scan_devices(to_scan)
+
+        # only devices on the LUKS devices were added
+        self._invalidate_free_regions([disk for device in blivet_devices for disk in device.disks] + blivet_devices)
+        self._device_index.rebuild()
+
+    def _drop_device_info_cache(self):
+        """ Drop information about LVM (and other) devices cached by blivet
+
+            ..note.: older versions of blivet cache only LVM information
+        """
+
+        devicetree = self.storage.devicetree
+
+        if hasattr(devicetree, "drop_device_info_cache"):
+            devicetree.drop_device_info_cache()
+        elif hasattr(devicetree, "drop_lvm_cache"):
+            devicetree.drop_lvm_cache()
+
+    def _scan_devices(self, infos, update_orig_fmt=False):
+        """ Add devices and all their holders to the device tree
+
+            :param infos: udev information about the devices
+            :type infos: list of dict
+            :param update_orig_fmt: update original format of the devices (for
+                                    devices that were already in the tree)
+            :type update_orig_fmt: bool
+
+            ..note.: versions of blivet that can't add a single device to the
+                     device tree or get its holders scan all devices (existing
+                     devices are kept)
+        """
+
+        if not hasattr(self.storage.devicetree, "handle_device") or \
+           not hasattr(blivet.udev, "device_get_holders"):
+            self.storage.devicetree.populate()
+            return
+
+        scanned = set()
+        to_scan = list(infos)
+
+        while to_scan:
+            info = to_scan.pop(0)
+
+            sysfs_path = blivet.udev.device_get_sysfs_path(info)
+            if sysfs_path in scanned:
+                continue
+            scanned.add(sysfs_path)
+
+            self.storage.devicetree.handle_device(info, update_orig_fmt=update_orig_fmt)
+            to_scan.extend(blivet.udev.device_get_holders(info))
+
+    def _disk_partitions_info(self, info):
+        """ Get udev information about partitions on the disk
+        """
+
+        sysfs_path = blivet.udev.device_get_sysfs_path(info)
+
+        partitions = []
+        for name in sorted(os.listdir(sysfs_path)):
+            if os.path.exists(os.path.join(sysfs_path, name, "partition")):
+                part_info = blivet.udev.get_device(sysfs_path=os.path.join(sysfs_path, name))
+                if part_info is not None:
+                    partitions.append(part_info)
+
+        return partitions
+
+    def _reload_scope(self, blivet_device):
+        """ Get disks that need to be scanned again to reload the device -- disks
+            of the device and disks of all devices depending on them
+        """
+
+        if blivet_device.is_disk:
+            disks = [blivet_device]
+        else:
+            disks = list(blivet_device.disks)
+
+        to_check = list(disks)
+        while to_check:
+            disk = to_check.pop()
+            for dependent in self.storage.devicetree.get_dependent_devices(disk):
+                for dep_disk in dependent.disks:
+                    if dep_disk not in disks:
+                        disks.append(dep_disk)
+                        to_check.append(dep_disk)
+
+        return disks
+
+    def reload_device(self, blivet_device):
+        """ Scan the device (disk, VG, MD array...) again without resetting
+            the whole device tree
+
+            All disks the device is on are scanned again, together with all
+            devices on them. This is possible only when there are no pending
+            actions for any of these devices.
+
+            :param blivet_device: device to reload
+            :type blivet_device: blivet.devices.StorageDevice
+
+        """
+
+        disks = self._reload_scope(blivet_device)
+
+        if self._has_pending_actions(disks):
+            msg = _("{name} can't be reloaded, there are pending actions for it.").format(name=blivet_device.name)
+            return ProxyDataContainer(success=False, message=msg, exception=None, traceback=None)
+
+        try:
+            self._rescan_disks(disks)
+        except Exception as e:  # pylint: disable=broad-except
+            return ProxyDataContainer(success=False, message=None, exception=e, traceback=traceback.format_exc())
+
+        return ProxyDataContainer(success=True, message=None, exception=None, traceback=None)
+
+    def _has_pending_actions(self, disks):
+        """ Are there any scheduled actions for the disks or devices on them
+        """
+
+        disk_ids = set(disk.id for disk in disks)
+
+        for action in self.storage.devicetree.actions:
+            if action.device.id in disk_ids or any(disk.id in disk_ids for disk in action.device.disks):
+                return True
+
+        return False
+
+    def _rescan_disks(self, disks, new_infos=None):
+        """ Remove the disks and all devices on them from the device tree and
+            scan them again
+
+            :param disks: disks to scan
+            :type disks: list of blivet.devices.DiskDevice
+            :param new_infos: udev information about other (new) devices to scan
+            :type new_infos: list of dict
+
+        """
+
+        devicetree = self.storage.devicetree
+
+        try:
+            blivet.udev.settle()
+            self._drop_device_info_cache()
+
+            to_scan = []
+            for disk in disks:
+                devicetree.recursive_remove(disk, actions=False, modparent=False)
+
+                info = blivet.udev.get_device(sysfs_path=disk.sysfs_path)
+                if info is None:
+                    # disk is no longer available, devices on it were already
+                    # removed
+                    devicetree.hide(disk)
+                    continue
+
+                to_scan.append(info)
+                to_scan.extend(self._disk_partitions_info(info))
+
+            for info in new_infos or []:
+                to_scan.append(info)
+                if blivet.udev.device_is_disk(info):
+                    to_scan.extend(self._disk_partitions_info(info))
+
+            # formats of the devices could change since the last scan
+            self._scan_devices(to_scan, update_orig_fmt=True)
+
+        finally:
+            self._invalidate_free_regions(disks)
+            self._device_index.rebuild()
+
+    def apply_udev_events(self, events):
+        """ Update the device tree for udev events (see
+            :class:`~.udev_monitor.UdevMonitor`) without resetting it
+
+            Disks of devices with an event are scanned again (see
+            :func:`reload_device`), new devices are added to the tree. Disks
+            with pending actions are not changed.
+
+            :param events: (action, sysfs path) for changed devices
+            :type events: list of tuple
+            :returns: whether the device tree was changed
+            :rtype: bool
+
+        """
+
+        disks = []
+        new_infos = []
+
+        for action, sysfs_path in events:
+            known = self._udev_event_devices(sysfs_path)
+
+            if known:
+                for device in known:
+                    scope = self._reload_scope(device)
+                    # the device tree can't be changed under scheduled actions,
+                    # changes will be visible after the actions are applied
+                    if not self._has_pending_actions(scope):
+                        disks.extend(disk for disk in scope if disk not in disks)
+
+            elif action != "remove":
+                info = blivet.udev.get_device(sysfs_path=sysfs_path)
+                if info is not None:
+                    new_infos.append(info)
+
+        if not disks and not new_infos:
+            return False
+
+        names = set(self.storage.names)
+        self._rescan_disks(disks, new_infos)
+
+        return bool(disks) or set(self.storage.names) != names
+
+    def _udev_event_devices(self, sysfs_path):
+        """ Devices from the device tree affected by an udev event for the
+            sysfs path -- the device itself or (for devices we don't know yet)
+            its disk or the devices it is on top of
+        """
+
+        devicetree = self.storage.devicetree
+
+        device = devicetree.get_device_by_sysfs_path(sysfs_path, incomplete=True, hidden=True)
+        if device is not None:
+            return [device]
+
+        # new partition -- its disk is the parent directory in sysfs
+        disk = devicetree.get_device_by_sysfs_path(os.path.dirname(sysfs_path), incomplete=True, hidden=True)
+        if disk is not None and disk.is_disk:
+            return [disk]
+
+        # new holder (dm, md...) -- devices it is on top of are in 'slaves'
+        slaves_dir = os.path.join(sysfs_path, "slaves")
+        if not os.path.isdir(slaves_dir):
+            return []
+
+        slaves = (devicetree.get_device_by_sysfs_path(os.path.realpath(os.path.join(slaves_dir, name)),
+                                                      incomplete=True, hidden=True)
+                  for name in sorted(os.listdir(slaves_dir)))
+
+        return [slave for slave in slaves if slave is not None]
+
     def blivet_cancel_actions(self, actions):
         """ Cancel scheduled actions
         """
@@ -1364,6 +2308,8 @@ class BlivetUtils(object):
         """
 
         self.storage.reset()
+        self._devicetree_reloaded()
+        self._update_min_sizes_info()
 
     def blivet_do_it(self, progress_report_hook):
         """ Blivet.do_it()
@@ -1373,6 +2319,18 @@ class BlivetUtils(object):
 
         callbacks_reg = blivet.callbacks.create_new_callbacks_register(report_progress=progress_clbk)
 
+        # don't run fs tools on devices we are going to change
+        futures_wait(self._cancel_size_info(), timeout=self.size_info_timeout)
+
+        # cached size information of resized and reformatted filesystems is no
+        # longer valid (even if the actions fail)
+        uuids = []
+        for action in self.storage.devicetree.actions:
+            if action.is_format or action.is_resize:
+                uuids.append(getattr(action.device.format, "uuid", None))
+                uuids.append(getattr(getattr(action, "orig_format", None), "uuid", None))
+        self._size_info_cache.invalidate(uuids)
+
         try:
             self.storage.do_it(callbacks=callbacks_reg)
 
@@ -1382,6 +2340,9 @@ class BlivetUtils(object):
         else:
             return (True, ProxyDataContainer(success=True))
 
+        finally:
+            self._devicetree_reloaded()
+
     def create_kickstart_file(self, fname):
         """ Create kickstart config file
         """
@@ -33,6 +33,7 @@ from blivet.size import Size
 from .list_devices import ListDevices
 from .list_partitions import ListPartitions
 from .list_parents import ListParents
+from .device_snapshot import DeviceSnapshot
 from .list_actions import ListActions
 from .main_menu import MainMenu
 from .actions_menu import ActionsMenu
@@ -41,6 +42,7 @@ from .visualization.logical_view import LogicalView
 from .visualization.physical_view import PhysicalView
 
 from .communication.client import BlivetGUIClient
+from .communication.proxy_utils import ProxyDataContainer
 
 from .logs import set_logging, set_python_meh, remove_logs
 from .i18n import _
@@ -48,6 +50,7 @@ from .gui_utils import locate_ui_file
 from .dialogs import message_dialogs, other_dialogs, edit_dialog, add_dialog, device_info_dialog
 from .processing_window import ProcessingActions
 from .loading_window import LoadingWindow
+from .timings import timeline
 
 import threading
 import os
@@ -62,25 +65,40 @@ class BlivetGUI(object):
         Gtk.Widgets used in blivet-gui.
     """
 
-    def __init__(self, server_socket, secret, version, kickstart_mode=False):
+    def __init__(self, daemon, version, kickstart_mode=False):
+        """
+
+        :param daemon: future returning socket and secret of blivet-gui-daemon
+                       (the daemon starts while the UI is being loaded)
+        :type daemon: concurrent.futures.Future
+
+        """
 
-        self.server_socket = server_socket
-        self.secret = secret
         self.version = version
         self.kickstart_mode = kickstart_mode
 
-        self.builder = Gtk.Builder()
-        self.builder.set_translation_domain("blivet-gui")
-        self.builder.add_from_file(locate_ui_file("blivet-gui.ui"))
+        with timeline.phase("load UI"):
+            self.builder = Gtk.Builder()
+            self.builder.set_translation_domain("blivet-gui")
+            self.builder.add_from_file(locate_ui_file("blivet-gui.ui"))
 
         # MainWindow
         self.main_window = self.builder.get_object("main_window")
         self.main_window.connect("delete-event", self.quit)
 
         # BlivetUtils
-        self.client = BlivetGUIClient(self, self.server_socket, self.secret)
+        try:
+            self.server_socket, self.secret = daemon.result()
+        except Exception:  # pylint: disable=broad-except
+            self.show_error_dialog(_("Failed to start blivet-gui-daemon."))
+            sys.exit(1)
+
+        with timeline.phase("socket connect"):
+            self.client = BlivetGUIClient(self, self.server_socket, self.secret)
+
         dialog = LoadingWindow(self.main_window)
-        ret = self.blivet_init(dialog)
+        with timeline.phase("init"):
+            ret = self.blivet_init(dialog)
 
         if not ret.success:  # pylint: disable=maybe-no-member
             if ret.reason == "running":
@@ -105,7 +123,8 @@ class BlivetGUI(object):
         atexit.register(self.client.quit)
 
         # Supported types
-        self._get_supported_types()
+        with timeline.phase("capability discovery"):
+            self._get_supported_types()
 
         # Kickstart devices dialog
         if self.kickstart_mode:
@@ -121,8 +140,13 @@ class BlivetGUI(object):
         self.device_toolbar = DeviceToolbar(self)
         self.actions_toolbar = ActionsToolbar(self)
 
+        # DeviceSnapshot
+        self.device_snapshot = DeviceSnapshot()
+        self.update_device_snapshot()
+
         # ListDevices
-        self.list_devices = ListDevices(self)
+        with timeline.phase("load_devices"):
+            self.list_devices = ListDevices(self)
 
         # ListPartitions
         self.list_partitions = ListPartitions(self)
@@ -144,18 +168,50 @@ class BlivetGUI(object):
 
         # select first device in ListDevice
         self.list_devices.disks_view.set_cursor(1)
+        self._draw_signal = self.main_window.connect("draw", self._on_first_paint)
         self.main_window.show_all()
         self.list_devices.disks_view.set_cursor(0)
 
+        # device tree changes (e.g. connected disks) are pushed by the server
+        self.client.watch_notifications(self._on_server_notification)
+
+    def _on_first_paint(self, _window, _cairo_context):
+        timeline.mark("first paint")
+        self.main_window.disconnect(self._draw_signal)
+
+        if timeline.enabled:
+            GLib.idle_add(self._report_timings)
+
+        return False
+
+    def _report_timings(self):
+        """ Print timeline of the startup (together with phases from the
+            daemon) as JSON and write it to the log
+        """
+
+        daemon_phases = self.client.remote_control("timings")
+
+        timeline.log(self.log)
+        print(timeline.to_json(daemon_phases))
+        sys.stdout.flush()
+
+        return False
+
     def _get_supported_types(self):
         """ Get various supported 'types' (filesystems, raid levels...) from
             blivet and store them for future use
         """
 
-        self._supported_raid_levels = {"btrfs volume": self.client.remote_call("get_available_raid_levels", "btrfs volume"),
-                                       "mdraid": self.client.remote_call("get_available_raid_levels", "mdraid")}
-        self._supported_filesystems = self.client.remote_call("get_available_filesystems")
-        self._supported_disklabels = self.client.remote_call("get_available_disklabels", True)
+        # all requests are sent at once, server answers them concurrently
+        btrfs_levels, md_levels, filesystems, disklabels = self.client.remote_calls(
+            ("get_available_raid_levels", ("btrfs volume",)),
+            ("get_available_raid_levels", ("mdraid",)),
+            ("get_available_filesystems", ()),
+            ("get_available_disklabels", (True,)))
+
+        self._supported_raid_levels = {"btrfs volume": btrfs_levels, "mdraid": md_levels}
+        self._supported_filesystems = filesystems
+        self._supported_disklabels = disklabels
 
     def _set_physical_view_visible(self, visible):
         notebook = self.builder.get_object("notebook_views")
@@ -166,15 +222,81 @@ class BlivetGUI(object):
         else:
             physical_page.hide()
 
+    def update_device_snapshot(self):
+        """ Update local information about devices; this needs to be done after
+            every change of the device tree
+
+            Device tree diffs received from the server are applied if possible,
+            full snapshot is loaded otherwise.
+
+            :returns: ids of affected devices and whether list of disks and group
+                      devices changed or None if full snapshot was loaded
+            :rtype: :class:`~.communication.proxy_utils.ProxyDataContainer` or None
+
+        """
+
+        diffs = self.client.devicetree_diffs
+        self.client.devicetree_diffs = []
+
+        changes = ProxyDataContainer(ids=set(), toplevel_changed=False) if diffs else None
+
+        for diff in diffs:
+            applied = self.device_snapshot.apply_diff(diff)
+            if applied is None:
+                changes = None
+                break
+
+            changes["ids"] |= applied.ids
+            changes["toplevel_changed"] |= applied.toplevel_changed
+
+        if changes is None:
+            self.device_snapshot.load(self.client.remote_call("get_devicetree_snapshot"))
+
+        return changes
+
+    def update_views(self):
+        """ Update device snapshot and refresh views affected by the changes
+        """
+
+        changes = self.update_device_snapshot()
+
+        if changes is None or changes.toplevel_changed:
+            self.list_devices.update_devices_view()
+            self.update_partitions_view()
+            return
+
+        self.list_devices.update_device_rows(changes.ids)
+
+        selected_info = self.device_snapshot.get(self.list_devices.selected_device)
+        if selected_info is None or changes.ids & self.device_snapshot.get_related_ids(selected_info):
+            self.update_partitions_view()
+
+    def _on_server_notification(self, notification):
+        """ Refresh views when the device tree was changed on the server
+            (e.g. after a device was connected or removed)
+        """
+
+        if notification.event == "devicetree-changed":
+            self.update_views()
+
     def update_partitions_view(self):
-        self.list_partitions.update_partitions_list(self.list_devices.selected_device)
+        # partitions are loaded in background, logical view is updated after that
+        self.list_partitions.update_partitions_list(self.list_devices.selected_device,
+                                                    callback=self._update_logical_view)
+
+    def _update_logical_view(self):
         self.logical_view.visualize_devices(self.list_partitions.partitions_list)
 
     def update_physical_view(self):
         self.list_parents.update_parents_list(self.list_devices.selected_device)
         self.physical_view.visualize_parents(self.list_parents.parents_list)
 
-        if self.list_devices.selected_device.is_disk:
+        # use the device itself if it isn't in the snapshot (yet)
+        info = self.device_snapshot.get(self.list_devices.selected_device)
+        if info is None:
+            info = self.list_devices.selected_device
+
+        if info.is_disk:
             self._set_physical_view_visible(False)
         else:
             self._set_physical_view_visible(True)
@@ -330,7 +452,7 @@ class BlivetGUI(object):
                     action_str = _("edit {name} {type}").format(name=device.name, type=device.type)
                     self.list_actions.append("edit", action_str, result.actions)
 
-            self.update_partitions_view()
+            self.update_views()
 
         dialog.destroy()
         return
@@ -421,7 +543,7 @@ class BlivetGUI(object):
                     if result.actions:
                         action_str = _("create new disklabel on {name}").format(name=self.list_devices.selected_device.name)
                         self.list_actions.append("add", action_str, result.actions)
-                self.update_partitions_view()
+                self.update_views()
             return
 
         # for snapshots we don't know the free space device because user doesn't choose one
@@ -448,7 +570,16 @@ class BlivetGUI(object):
         if response == Gtk.ResponseType.OK:
 
             user_input = dialog.get_selection()
-            result = self.client.remote_call("add_device", user_input)
+
+            # multiple devices are added at once and partitioned only once
+            if isinstance(user_input, list):
+                user_inputs = user_input
+                result = self.client.remote_call("add_devices", user_inputs)
+                devices_actions = result.actions
+            else:
+                user_inputs = [user_input]
+                result = self.client.remote_call("add_device", user_input)
+                devices_actions = [result.actions]
 
             if not result.success:
                 if not result.exception:
@@ -458,7 +589,10 @@ class BlivetGUI(object):
                     self._reraise_exception(result.exception, result.traceback)
 
             else:
-                if result.actions:
+                for user_input, actions in zip(user_inputs, devices_actions):
+                    if not actions:
+                        continue
+
                     if not user_input.filesystem:
                         action_str = _("add {size} {type} device").format(size=str(user_input.size),
                                                                           type=user_input.device_type)
@@ -466,10 +600,9 @@ class BlivetGUI(object):
                         action_str = _("add {size} {fmt} partition").format(size=str(user_input.size),
                                                                             fmt=user_input.filesystem)
 
-                    self.list_actions.append("add", action_str, result.actions)
+                    self.list_actions.append("add", action_str, actions)
 
-            self.list_devices.update_devices_view()
-            self.update_partitions_view()
+            self.update_views()
 
         dialog.destroy()
         return
@@ -504,8 +637,7 @@ class BlivetGUI(object):
                 action_str = _("delete partition {name}").format(name=deleted_device.name)
                 self.list_actions.append("delete", action_str, result.actions)
 
-            self.update_partitions_view()
-            self.list_devices.update_devices_view()
+            self.update_views()
 
     def perform_actions(self, dialog):
         """ Perform queued actions
@@ -544,8 +676,7 @@ class BlivetGUI(object):
 
         self.list_actions.clear()
 
-        self.list_devices.update_devices_view()
-        self.update_partitions_view()
+        self.update_views()
 
     def apply_event(self, _widget=None):
         """ Apply event for main menu/toolbar
@@ -609,6 +740,7 @@ class BlivetGUI(object):
             msg = _("Unmount failed. Are you sure device is not in use?")
             self.show_error_dialog(msg)
 
+        self.update_device_snapshot()
         self.update_partitions_view()
 
     def decrypt_device(self, _widget=None):
@@ -631,8 +763,36 @@ class BlivetGUI(object):
 
                 return
 
-        self.list_devices.update_devices_view()
-        self.update_partitions_view()
+        self.update_views()
+
+    def decrypt_all_devices(self, _widget=None):
+        """ Decrypt all locked LUKS devices using one passphrase
+
+            :param widget: widget calling this function (only for calls via signal.connect)
+            :type widget: Gtk.Widget()
+        """
+
+        locked_devices = self.client.remote_call("get_locked_luks_devices")
+
+        if not locked_devices:
+            msg = _("There are no locked encrypted devices.")
+            message_dialogs.InfoDialog(self.main_window, msg)
+
+            return
+
+        dialog = other_dialogs.LuksPassphraseDialog(self.main_window)
+
+        response = dialog.run()
+
+        if response:
+            result = self.client.remote_call("luks_decrypt_all", locked_devices, response)
+
+            if result.failed:
+                msg = _("Decryption of following devices failed:\n\n{devices}").format(
+                    devices="\n".join(device.name for device in result.failed))
+                message_dialogs.ErrorDialog(self.main_window, msg)
+
+        self.update_views()
 
     def actions_undo(self, _widget=None):
         """ Undo last action
@@ -645,8 +805,7 @@ class BlivetGUI(object):
         removed_actions = self.list_actions.pop()
         self.client.remote_call("blivet_cancel_actions", removed_actions)
 
-        self.list_devices.update_devices_view()
-        self.update_partitions_view()
+        self.update_views()
 
     def clear_actions(self, _widget=None):
         """ Clear all scheduled actions
@@ -660,8 +819,7 @@ class BlivetGUI(object):
 
         self.list_actions.clear()
 
-        self.list_devices.update_devices_view()
-        self.update_partitions_view()
+        self.update_views()
 
     def show_actions(self, _widget=None, _uri=None):
         """ Show scheduled actions
@@ -692,6 +850,24 @@ class BlivetGUI(object):
 
         return ret[0]
 
+    def reload_device(self, _widget=None):
+        """ Reload only the selected device (and devices on the same disks)
+
+            :param widget: widget calling this function (only for calls via signal.connect)
+            :type widget: Gtk.Widget()
+
+        """
+
+        result = self.client.remote_call("reload_device", self.list_devices.selected_device)
+
+        if not result.success:
+            if not result.exception:
+                self.show_error_dialog(result.message)
+            else:
+                self._reraise_exception(result.exception, result.traceback)
+
+        self.update_views()
+
     def reload(self, _widget=None):
         """ Reload storage information
 
@@ -716,8 +892,7 @@ class BlivetGUI(object):
 
         self.list_actions.clear()
 
-        self.list_devices.update_devices_view()
-        self.update_partitions_view()
+        self.update_views()
 
     def quit(self, _event=None, _widget=None):
         """ Quit blivet-gui
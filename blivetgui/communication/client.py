@@ -21,13 +21,27 @@
 #
 # ---------------------------------------------------------------------------- #
 
-import pickle
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from threading import Lock, RLock
 
+import itertools
 import os
+import select
 import socket
-import struct
+import time
+import weakref
+
+import gi
+gi.require_version("GLib", "2.0")
+
+from gi.repository import GLib
 
 from .proxy_utils import ProxyID, ProxyDataContainer
+from . import codec
+from . import socket_utils
+from .stats import RequestStats, request_key
 
 from ..dialogs.message_dialogs import ErrorDialog
 from ..i18n import _
@@ -72,7 +86,10 @@ class ClientProxyObject(object):
         return remote_str
 
     def __getattr__(self, attr_name):
-        remote_attr = self.client.remote_param(self.proxy_id, attr_name)
+        if (self.proxy_id.id, attr_name) in self.client.prefetched_params:
+            remote_attr = self.client.prefetched_params[(self.proxy_id.id, attr_name)]
+        else:
+            remote_attr = self.client.remote_param(self.proxy_id, attr_name)
 
         if isinstance(remote_attr, BaseException) and attr_name not in ("exception",):
             raise remote_attr
@@ -80,14 +97,144 @@ class ClientProxyObject(object):
         else:
             return remote_attr
 
+
+class BatchResult(object):
+    """ Placeholder for an answer of a request queued in ProxyBatch
+    """
+
+    def __init__(self, raise_exceptions=True):
+        self.raise_exceptions = raise_exceptions
+
+        self._answer = None
+        self._done = False
+
+    def set_answer(self, answer):
+        self._answer = answer
+        self._done = True
+
+    @property
+    def done(self):
+        return self._done
+
+    @property
+    def answer(self):
+        """ Answer exactly as received from the server (exceptions are not raised)
+        """
+
+        if not self._done:
+            raise RuntimeError("Batch with this request hasn't been sent yet.")
+
+        return self._answer
+
+    @property
+    def value(self):
+        answer = self.answer
+
+        if self.raise_exceptions and isinstance(answer, BaseException):
+            raise answer
+
+        return answer
+
+
+class ProxyBatch(object):
+    """ Queue of param/method/key requests sent to the server in a single
+        "multi" message
+
+        ..note.: requests are sent when leaving the 'with' block (or when
+                 calling 'flush' directly), answers are available using
+                 'value' of returned BatchResult objects after that
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+        self._requests = []
+        self._results = []
+
+    def _queue(self, request, raise_exceptions=True):
+        result = BatchResult(raise_exceptions)
+
+        self._requests.append(request)
+        self._results.append(result)
+
+        return result
+
+    def param(self, proxy_object, param_name):
+        """ Queue request for param of proxy_object
+        """
+
+        return self._queue(("param", proxy_object.proxy_id, param_name))
+
+    def method(self, proxy_object, method_name, args=()):
+        """ Queue call of method of proxy_object
+        """
+
+        return self._queue(("method", proxy_object.proxy_id, method_name, tuple(args)), raise_exceptions=False)
+
+    def key(self, proxy_object, key):
+        """ Queue request for member of iterable proxy_object
+        """
+
+        return self._queue(("key", proxy_object.proxy_id, key))
+
+    def flush(self):
+        """ Send all queued requests to the server
+        """
+
+        if not self._requests:
+            return
+
+        requests, self._requests = self._requests, []
+        results, self._results = self._results, []
+
+        answers = self.client.remote_multi(requests)
+
+        for result, answer in zip(results, answers):
+            result.set_answer(answer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is None:
+            self.flush()
+
 # ---------------------------------------------------------------------------- #
 
-from threading import Lock
+
+# statistics of requests sent by the client, times are in microseconds, sizes
+# in bytes (including the message header)
+client_stats = RequestStats(("round_trip", "request_size", "reply_size"))
+
+
+class PendingRequest(object):
+    """ Slot for answers of a request sent to the server
+
+        ..note.: answers can arrive in a different order than the requests were
+                 sent, every answer is put to the slot of its request
+    """
+
+    def __init__(self, request_id, future=None, callback=None):
+        self.request_id = request_id
+        self.answers = deque()
+
+        # for asynchronous calls: future completed with the answer and
+        # function called when it is completed
+        self.future = future
+        self.callback = callback
+
+        # kind and name of the request, when it was sent and sizes of the
+        # request and all received answers (see 'client_stats')
+        self.key = None
+        self.sent = None
+        self.request_size = 0
+        self.reply_size = 0
 
 
 class BlivetGUIClient(object):
 
-    id_dict = {}
+    # number of released proxy objects sent to the server at once
+    release_batch_size = 32
 
     def __init__(self, blivetgui, server_socket, secret):
 
@@ -97,7 +244,41 @@ class BlivetGUIClient(object):
 
         self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self.sock.connect(server_socket)
-        self.mutex = Lock()
+
+        # multiple requests can wait for answers at the same time; only one
+        # thread reads from the socket and puts the answers to their slots
+        self._send_lock = Lock()
+        self._recv_lock = Lock()
+        self._request_ids = itertools.count(1)
+        # request id -> PendingRequest
+        self._pending = {}
+        # GLib watch for answers of asynchronous calls and notifications
+        self._watch_id = None
+        # function called with notifications sent by the server
+        self.notification_callback = None
+
+        # codec used to encode messages; preferred codec is used for the
+        # "init" message, the server answers with the negotiated one
+        self.codec = codec.codecs[codec.supported_versions()[0]]()
+
+        # params fetched in advance using 'prefetch'
+        self.prefetched_params = {}
+
+        # device tree diffs received with answers for methods changing the
+        # device tree, see :func:`~.device_snapshot.DeviceSnapshot.apply_diff`
+        self.devicetree_diffs = []
+
+        # proxy id (int) -> ClientProxyObject; objects no longer used anywhere
+        # in the client are removed and released on the server
+        self.id_dict = weakref.WeakValueDictionary()
+        self._released_ids = []
+        # proxy id (int) -> how many times we received the id since we last
+        # released it (server removes the object only when it knows we
+        # received all ids it sent, see _release_msg)
+        self._received_ids = {}
+        # finalizers can run in any thread at any time (even while the lock is
+        # held by the same thread), so this needs to be reentrant
+        self._release_lock = RLock()
 
     def _answer_convertTo_object(self, answer):
         """ All data sent from server to BlivetGUI must be either built-in types (int, str...) or
@@ -105,19 +286,72 @@ class BlivetGUIClient(object):
         """
 
         if isinstance(answer, ProxyID):
-            if answer.id in self.id_dict.keys():  # we already recieved this id before and have our proxy object for it
-                return self.id_dict[answer]
-            else:
-                self.id_dict[answer] = ClientProxyObject(client=self, proxy_id=answer)  # new id, create new proxy object
-                return self.id_dict[answer]  # and return it
+            return self._get_proxy_object(answer)
+        elif isinstance(answer, ProxyDataContainer):
+            new_answer = ProxyDataContainer()
+            for item in answer:
+                new_answer[item] = self._answer_convertTo_object(answer[item])
+            return new_answer
         elif isinstance(answer, (list, tuple)):
             new_answer = []
             for item in answer:
                 new_answer.append(self._answer_convertTo_object(item))
             return new_answer
+        elif isinstance(answer, dict):
+            new_answer = {}
+            for key, item in answer.items():
+                new_answer[key] = self._answer_convertTo_object(item)
+            return new_answer
         else:
             return answer
 
+    def _get_proxy_object(self, proxy_id):
+        """ Get ClientProxyObject for given ProxyID -- server sends the same id
+            for the same object, so we reuse proxy objects we still have
+        """
+
+        with self._release_lock:
+            self._received_ids[proxy_id.id] = self._received_ids.get(proxy_id.id, 0) + 1
+
+            proxy_object = self.id_dict.get(proxy_id.id)
+
+            if proxy_object is None:
+                proxy_object = ClientProxyObject(client=self, proxy_id=proxy_id)
+                self.id_dict[proxy_id.id] = proxy_object
+                weakref.finalize(proxy_object, self._proxy_released, proxy_id.id)
+
+                # the object might have been released but we haven't told the
+                # server yet
+                if proxy_id.id in self._released_ids:
+                    self._released_ids.remove(proxy_id.id)
+
+        return proxy_object
+
+    def _proxy_released(self, proxy_id):
+        """ Finalizer for ClientProxyObjects
+        """
+
+        with self._release_lock:
+            # new proxy object for this id could be already created
+            if proxy_id not in self.id_dict:
+                self._released_ids.append(proxy_id)
+
+    def _release_msg(self):
+        """ Message with released proxy objects to send to the server before
+            the next request (or empty list if there aren't enough of them)
+        """
+
+        with self._release_lock:
+            if len(self._released_ids) < self.release_batch_size:
+                return []
+
+            released = [(proxy_id, self._received_ids.pop(proxy_id, 0)) for proxy_id in self._released_ids]
+            self._released_ids = []
+
+        data = self.codec.encode((self.secret, "release", released))
+
+        return socket_utils.msg_buffers(data)
+
     def _args_convertTo_id(self, args):
         """ All args sent from client to server must be either built-in types (int, str...) or
             ProxyID (or ProxyDataContainer), never ClientProxyObject
@@ -147,15 +381,299 @@ class BlivetGUIClient(object):
 
         return args_id
 
+    def _send_request(self, msg, future=None, callback=None):
+        """ Send a request to the server
+
+            :param msg: request (without the secret)
+            :type msg: tuple
+            :param future: future to complete with the answer (for asynchronous calls)
+            :type future: concurrent.futures.Future
+            :param callback: function to call when the future is completed
+            :type callback: func
+            :returns: slot for answers of this request
+            :rtype: :class:`PendingRequest`
+
+        """
+
+        data = self.codec.encode((self.secret,) + msg)
+
+        request = PendingRequest(next(self._request_ids), future, callback)
+        request.key = request_key(msg)
+        request.request_size = len(data) + socket_utils.msg_header.size
+        self._pending[request.request_id] = request
+
+        request.sent = time.monotonic()
+        self._send(data, request.request_id)
+
+        return request
+
+    def _recv_answer(self, request, last=True):
+        """ Wait for an answer of the request
+
+            :param request: slot of the request
+            :type request: :class:`PendingRequest`
+            :param last: whether this is the last answer we expect for this request
+            :type last: bool
+            :returns: received (not decoded) answer
+            :rtype: bytearray
+
+        """
+
+        while True:
+            with self._recv_lock:
+                if not request.answers:
+                    self._put_answer(*self._recv_msg())
+
+                if request.answers:
+                    answer = request.answers.popleft()
+                    break
+
+        if last:
+            del self._pending[request.request_id]
+            self._record_stats(request)
+
+        return answer
+
+    def _put_answer(self, request_id, data):
+        """ Put received answer to the slot of its request
+        """
+
+        if request_id == 0:
+            self._put_notification(data)
+            return
+
+        request = self._pending[request_id]
+        request.reply_size += len(data) + socket_utils.msg_header.size
+
+        if request.future is None:
+            request.answers.append(data)
+
+        else:
+            del self._pending[request_id]
+            self._record_stats(request)
+
+            # answers can be received in any thread, asynchronous calls are
+            # always completed in the main loop
+            GLib.idle_add(self._complete_call, request, data)
+
+    def _put_notification(self, data):
+        """ Process notification sent by the server without a request
+        """
+
+        notification = self._answer_convertTo_object(self.codec.decode(data))
+
+        # diff needs to be added right away -- diffs must be applied in the
+        # same order the server sent them
+        if "diff" in notification:
+            self.devicetree_diffs.append(notification.diff)  # pylint: disable=maybe-no-member
+
+        if self.notification_callback:
+            GLib.idle_add(self._notify, notification)
+
+    def _notify(self, notification):
+        if self.notification_callback:
+            self.notification_callback(notification)
+
+        return False
+
+    def _record_stats(self, request):
+        client_stats.record(request.key, round_trip=(time.monotonic() - request.sent) * 1000000,
+                            request_size=request.request_size, reply_size=request.reply_size)
+
+    def get_stats(self):
+        """ Statistics of requests -- round trip times measured by the client
+            and handling times measured by the server
+
+            :returns: client and server statistics (see
+                      :func:`~.stats.RequestStats.snapshot`)
+            :rtype: dict
+
+        """
+
+        return {"client": client_stats.snapshot(), "server": self.remote_control("stats")}
+
+    def reset_stats(self):
+        """ Clear statistics of requests on the client and the server
+        """
+
+        client_stats.reset()
+        self.remote_control("reset")
+
+    def _complete_call(self, request, data):
+        if request.future.cancelled():
+            # the answer still needs to be converted, server counts the proxy
+            # ids it sent and we have to release them
+            self._answer_convertTo_object(self.codec.decode(data))
+            return False
+
+        try:
+            answer = self._call_answer(self.codec.decode(data))
+        except Exception as e:  # pylint: disable=broad-except
+            request.future.set_exception(e)
+        else:
+            request.future.set_result(answer)
+
+        if request.callback:
+            request.callback(request.future)
+
+        return False
+
+    def watch_notifications(self, callback):
+        """ Receive notifications from the server (e.g. about changes of the
+            device tree) in the main loop
+
+            :param callback: function called with the notification in the
+                             main loop
+            :type callback: func
+
+        """
+
+        self.notification_callback = callback
+        self._watch_socket()
+
+    def _watch_socket(self):
+        """ Watch the socket for answers of asynchronous calls and notifications
+            in the main loop (instead of waiting for them in a blocking recv)
+        """
+
+        if self._watch_id is None:
+            self._watch_id = GLib.io_add_watch(self.sock.fileno(), GLib.PRIORITY_DEFAULT,
+                                               GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR,
+                                               self._on_socket_ready)
+
+    def _on_socket_ready(self, _source, _condition):
+        # other thread is already waiting for an answer, it will read the
+        # message and put it to its slot
+        if not self._recv_lock.acquire(blocking=False):
+            return True
+
+        try:
+            # message could be read by the other thread before we got the lock
+            readable, _wlist, _xlist = select.select([self.sock], [], [], 0)
+            if readable:
+                self._put_answer(*self._recv_msg())
+        finally:
+            self._recv_lock.release()
+
+        if not self.notification_callback and not any(request.future for request in list(self._pending.values())):
+            # no more asynchronous calls waiting
+            self._watch_id = None
+            return False
+
+        return True
+
+    def _request(self, *msg):
+        """ Send a request and wait for the (decoded) answer
+        """
+
+        request = self._send_request(msg)
+
+        return self.codec.decode(self._recv_answer(request))
+
     def remote_call(self, method, *args):
         """ Call a method on server
         """
 
-        pickled_data = pickle.dumps((self.secret, "call", method, self._args_convertTo_id(args)))
+        answer = self._request("call", method, self._args_convertTo_id(args))
+
+        return self._call_answer(answer)
+
+    def remote_calls(self, *calls):
+        """ Call multiple methods on server -- all requests are sent before
+            waiting for the first answer (read-only methods run concurrently
+            on the server)
+
+            :param calls: method names and their arguments
+            :type calls: tuple of (str, tuple)
+            :returns: return values of the methods (in the same order)
+            :rtype: list
+
+        """
+
+        requests = [self._send_request(("call", method, self._args_convertTo_id(args))) for method, args in calls]
+
+        # receive all answers before raising any exception
+        answers = [self.codec.decode(self._recv_answer(request)) for request in requests]
+
+        return [self._call_answer(answer) for answer in answers]
+
+    def call_async(self, method, *args, callback=None):
+        """ Call a method on server without waiting for the answer
 
-        with self.mutex:
-            self._send(pickled_data)
-            answer = pickle.loads(self._recv_msg())
+            ..note.: this needs to be called from the main thread with running
+                     GLib main loop; the future is completed in the main loop
+
+            :param method: name of BlivetUtils method
+            :type method: str
+            :param callback: function called with the (completed) future when
+                             the answer is received, called in the main loop
+                             so it can work with the GUI
+            :type callback: func
+            :returns: future for the answer (result is the same as return value
+                      of :func:`remote_call`, exception is set if the call fails)
+            :rtype: concurrent.futures.Future
+
+        """
+
+        future = Future()
+        self._send_request(("call", method, self._args_convertTo_id(args)), future, callback)
+        self._watch_socket()
+
+        return future
+
+    def calls_async(self, calls, callback=None):
+        """ Call multiple methods on server without waiting for the answers
+            (see :func:`call_async`)
+
+            :param calls: method names and their arguments
+            :type calls: list of tuple of (str, tuple)
+            :param callback: function called with the (completed) future when
+                             all answers are received, called in the main loop
+            :type callback: func
+            :returns: future for the answers (result is the same as return value
+                      of :func:`remote_calls`, exception of the first failed
+                      call is set if any of the calls fails); cancelling it
+                      cancels all the calls
+            :rtype: concurrent.futures.Future
+
+        """
+
+        future = Future()
+        call_futures = []
+
+        def _completed(_call_future):
+            if future.done() or not all(call_future.done() for call_future in call_futures):
+                return False
+
+            try:
+                answers = [call_future.result() for call_future in call_futures]
+            except Exception as e:  # pylint: disable=broad-except
+                future.set_exception(e)
+            else:
+                future.set_result(answers)
+
+            if callback:
+                callback(future)
+
+            return False
+
+        def _cancelled(done_future):
+            if done_future.cancelled():
+                for call_future in call_futures:
+                    call_future.cancel()
+
+        for method, args in calls:
+            call_futures.append(self.call_async(method, *args, callback=_completed))
+        future.add_done_callback(_cancelled)
+
+        if not call_futures:
+            GLib.idle_add(_completed, None)
+
+        return future
+
+    def _call_answer(self, answer):
+        """ Return value of the remote method (or raise its exception)
+        """
 
         ret = self._answer_convertTo_object(answer)
 
@@ -163,17 +681,15 @@ class BlivetGUIClient(object):
             raise type(ret.exception)(str(ret.exception) + "\n" + ret.traceback)  # pylint: disable=maybe-no-member
 
         else:
+            if "diff" in ret:
+                self.devicetree_diffs.append(ret.diff)  # pylint: disable=maybe-no-member
             return ret.answer  # pylint: disable=maybe-no-member
 
     def remote_param(self, proxy_id, param_name):
         """ Get a param of proxy_id object
         """
 
-        pickled_data = pickle.dumps((self.secret, "param", proxy_id, param_name))
-
-        with self.mutex:
-            self._send(pickled_data)
-            answer = pickle.loads(self._recv_msg())
+        answer = self._request("param", proxy_id, param_name)
 
         return self._answer_convertTo_object(answer)
 
@@ -181,11 +697,7 @@ class BlivetGUIClient(object):
         """ Call remotely a method on proxy_id object
         """
 
-        pickled_data = pickle.dumps((self.secret, "method", proxy_id, method_name, args))
-
-        with self.mutex:
-            self._send(pickled_data)
-            answer = pickle.loads(self._recv_msg())
+        answer = self._request("method", proxy_id, method_name, args)
 
         return self._answer_convertTo_object(answer)
 
@@ -193,11 +705,7 @@ class BlivetGUIClient(object):
         """ Ask for a next member of iterable proxy_id object
         """
 
-        pickled_data = pickle.dumps((self.secret, "next", proxy_id))
-
-        with self.mutex:
-            self._send(pickled_data)
-            answer = pickle.loads(self._recv_msg())
+        answer = self._request("next", proxy_id)
 
         return self._answer_convertTo_object(answer)
 
@@ -205,44 +713,115 @@ class BlivetGUIClient(object):
         """ Ask for a member of iterable proxy_id object
         """
 
-        pickled_data = pickle.dumps((self.secret, "key", proxy_id, key))
+        answer = self._request("key", proxy_id, key)
 
-        with self.mutex:
-            self._send(pickled_data)
-            answer = pickle.loads(self._recv_msg())
+        return self._answer_convertTo_object(answer)
+
+    def remote_multi(self, requests):
+        """ Send multiple param/method/next/key requests in one message
+
+            :param requests: list of requests, e.g. ("param", proxy_id, param_name)
+            :type requests: list of tuple
+            :returns: list of answers (in the same order as the requests)
+            :rtype: list
+
+        """
+
+        answer = self._request("multi", requests)
 
         return self._answer_convertTo_object(answer)
 
+    def batch(self):
+        """ Create a new batch of requests, use as a context manager
+        """
+
+        return ProxyBatch(self)
+
+    @contextmanager
+    def prefetch(self, proxy_objects, param_names):
+        """ Fetch selected params of multiple proxy objects in one message, inside
+            the 'with' block these params are read without contacting the server
+
+            :param proxy_objects: list of objects, other than ClientProxyObject are ignored
+            :type proxy_objects: list
+            :param param_names: names of params to fetch, params of params can be
+                                fetched too using dots, e.g. "format.type"
+            :type param_names: list of str
+
+        """
+
+        keys = []
+        self._prefetch_params(proxy_objects, param_names, keys)
+
+        try:
+            yield
+        finally:
+            for key in keys:
+                self.prefetched_params.pop(key, None)
+
+    def _prefetch_params(self, proxy_objects, param_names, keys):
+        proxy_objects = [obj for obj in proxy_objects if isinstance(obj, ClientProxyObject)]
+
+        # "format.type" -- we need to fetch the format first and its type in the next round
+        first_names = []
+        nested_names = {}
+        for param_name in param_names:
+            first, _sep, rest = param_name.partition(".")
+            if first not in first_names:
+                first_names.append(first)
+            if rest:
+                nested_names.setdefault(first, []).append(rest)
+
+        results = []
+        with self.batch() as batch:
+            for proxy_object in proxy_objects:
+                for param_name in first_names:
+                    key = (proxy_object.proxy_id.id, param_name)
+                    if key not in self.prefetched_params:
+                        results.append((key, batch.param(proxy_object, param_name)))
+
+        for key, result in results:
+            self.prefetched_params[key] = result.answer
+            keys.append(key)
+
+        for first, rest in nested_names.items():
+            subobjects = [self.prefetched_params.get((obj.proxy_id.id, first)) for obj in proxy_objects]
+            self._prefetch_params(subobjects, rest, keys)
+
     def remote_control(self, command, *args):
         """ Send a control command to server
         """
 
-        pickled_data = pickle.dumps((self.secret, command, args))
+        if command == "init":
+            # offer supported protocol versions to the server
+            request = self._send_request((command, args, codec.supported_versions()))
+        else:
+            request = self._send_request((command, args))
+
+        raw_answer = self._recv_answer(request)
+
+        if command == "init":
+            self.codec = codec.detect(raw_answer)
 
-        with self.mutex:
-            self._send(pickled_data)
-            answer = pickle.loads(self._recv_msg())
+        answer = self.codec.decode(raw_answer)
 
         return self._answer_convertTo_object(answer)
 
     def remote_do_it(self, show_progress_clbk):
 
-        pickled_data = pickle.dumps((self.secret, "call", "blivet_do_it", ()))
-
-        with self.mutex:
-            self._send(pickled_data)
-            answer = pickle.loads(self._recv_msg())
+        request = self._send_request(("call", "blivet_do_it", ()))
 
+        # progress messages are sent as answers for this request
+        while True:
+            answer = self.codec.decode(self._recv_answer(request, last=False))
             ret = self._answer_convertTo_object(answer)
 
-            while True:
-                if ret[0]:  # pylint: disable=maybe-no-member
-                    break
+            if ret[0]:  # pylint: disable=maybe-no-member
+                break
 
-                show_progress_clbk(ret[1])
+            show_progress_clbk(ret[1])
 
-                answer = pickle.loads(self._recv_msg())
-                ret = self._answer_convertTo_object(answer)
+        del self._pending[request.request_id]
 
         return ret[1]
 
@@ -250,58 +829,36 @@ class BlivetGUIClient(object):
         """ Quit the client
         """
 
-        pickled_data = pickle.dumps((self.secret, "quit",))
+        data = self.codec.encode((self.secret, "quit",))
 
-        with self.mutex:
-            self._send(pickled_data)
-            self.sock.close()
+        self._send(data)
+        self.sock.close()
 
     def _recv_msg(self):
         """ Recieve a message from server
 
             ..note.: first for bites represents message length
         """
-        raw_msglen = self._recv_data(4)
-
-        if not raw_msglen:
-            return None
-
-        msglen = struct.unpack(">I", raw_msglen)[0]
-
-        return self._recv_data(msglen)
-
-    def _recv_data(self, length):
-        """ Recieve 'length' of data from client
 
-            :param length: length of data to receive
-            :type length: int
-
-        """
-
-        data = b""
-
-        while len(data) < length:
-
-            try:
-                packet = self.sock.recv(length - len(data))
-
-            except (OSError, BrokenPipeError) as e:
-                ErrorDialog(parent_window=self.blivetgui.main_window,
-                            msg=_("Failed to connect to blivet-gui-daemon.\n{err}").format(err=e))
-                os._exit(1)
-
-            if not packet:
-                return None
+        try:
+            msg = socket_utils.recv_msg(self.sock)
+            if msg is None:
+                raise OSError("Connection closed by the server.")
 
-            data += packet
+            return msg
 
-        return data
+        except (OSError, BrokenPipeError) as e:
+            ErrorDialog(parent_window=self.blivetgui.main_window,
+                        msg=_("Failed to connect to blivet-gui-daemon.\n{err}").format(err=e))
+            os._exit(1)
 
-    def _send(self, data):
-        data = struct.pack(">I", len(data)) + data
+    def _send(self, data, request_id=0):
+        # released proxy objects are sent together with the next request
+        buffers = self._release_msg() + socket_utils.msg_buffers(data, request_id)
 
         try:
-            self.sock.sendall(data)
+            with self._send_lock:
+                socket_utils.sendmsg_all(self.sock, buffers)
 
         except OSError as e:
             ErrorDialog(parent_window=self.blivetgui.main_window,
@@ -0,0 +1,449 @@
+# codec.py
+# Encoding of messages between blivet-gui client and server
+#
+# Copyright (C) 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Red Hat Author(s): Vojtech Trefny <vtrefny@redhat.com>
+#
+# ---------------------------------------------------------------------------- #
+
+from blivet import size
+
+import builtins
+import decimal
+import pickle
+import struct
+import sys
+
+from .proxy_utils import ProxyID, ProxyDataContainer
+
+# ---------------------------------------------------------------------------- #
+
+
+class CodecError(Exception):
+    """ Message can't be encoded or decoded
+    """
+
+
+class PickleCodec(object):
+    """ Original wire format -- pickled python objects
+    """
+
+    version = 0
+
+    def encode(self, message):
+        return pickle.dumps(message)
+
+    def decode(self, data):
+        return pickle.loads(data)
+
+
+class BinaryCodec(object):
+    """ Compact tagged binary encoding
+
+        Only a limited set of types is supported: None, bool, int, float, str,
+        bytes, list, tuple, dict, :class:`~.proxy_utils.ProxyID`,
+        :class:`~.proxy_utils.ProxyDataContainer`, :class:`blivet.size.Size`
+        and exceptions. Exception classes are never imported while decoding,
+        only classes from already imported modules are used.
+
+    """
+
+    version = 1
+
+    # every message starts with this byte -- it can't be confused with a pickle
+    # (pickle protocol 2+ starts with 0x80)
+    header = bytes([0xC0 | version])
+
+    _NONE = 0x00
+    _FALSE = 0x01
+    _TRUE = 0x02
+    _INT = 0x03
+    _FLOAT = 0x04
+    _STR = 0x05
+    _BYTES = 0x06
+    _LIST = 0x07
+    _TUPLE = 0x08
+    _DICT = 0x09
+    _PROXYID = 0x0A
+    _CONTAINER = 0x0B
+    _SIZE = 0x0C
+    _EXCEPTION = 0x0D
+    _SIZE_DECIMAL = 0x0E
+
+    _float = struct.Struct(">d")
+
+    # maximal nesting of lists, dicts, containers and exceptions in a message
+    max_depth = 100
+
+    def __init__(self):
+        # exact type -> encoding function; subclasses (and Size which may be
+        # a subclass of int) are handled in _encode_other
+        self._encoders = {type(None): self._encode_none,
+                          bool: self._encode_bool,
+                          int: self._encode_int,
+                          float: self._encode_float,
+                          str: self._encode_str_obj,
+                          bytes: self._encode_bytes,
+                          list: self._encode_list,
+                          tuple: self._encode_list,
+                          dict: self._encode_dict,
+                          ProxyID: self._encode_proxyid,
+                          ProxyDataContainer: self._encode_container,
+                          size.Size: self._encode_size}
+
+        self._decoders = {self._NONE: lambda data, offset: (None, offset),
+                          self._TRUE: lambda data, offset: (True, offset),
+                          self._FALSE: lambda data, offset: (False, offset),
+                          self._INT: self._decode_int,
+                          self._FLOAT: self._decode_float,
+                          self._STR: self._decode_str,
+                          self._BYTES: self._decode_bytes,
+                          self._LIST: self._decode_list,
+                          self._TUPLE: self._decode_tuple,
+                          self._DICT: self._decode_dict,
+                          self._PROXYID: self._decode_proxyid,
+                          self._CONTAINER: self._decode_container,
+                          self._SIZE: self._decode_size,
+                          self._SIZE_DECIMAL: self._decode_size_decimal,
+                          self._EXCEPTION: self._decode_exception}
+
+        # decoders of values that contain other values -- these get the
+        # current nesting depth
+        self._nested = {self._LIST, self._TUPLE, self._DICT, self._CONTAINER, self._EXCEPTION}
+
+    def encode(self, message):
+        data = bytearray(self.header)
+        self._encode(message, data)
+
+        return bytes(data)
+
+    def decode(self, data):
+        if data[:1] != self.header:
+            raise CodecError("Message is not encoded using codec version %d." % self.version)
+
+        try:
+            message, offset = self._decode(memoryview(data), 1)
+        except (IndexError, struct.error, UnicodeDecodeError, RecursionError) as e:
+            raise CodecError("Malformed message: %s" % e)
+
+        if offset != len(data):
+            raise CodecError("Unexpected data at the end of the message.")
+
+        return message
+
+    # encoding
+
+    def _encode(self, obj, data):
+        encoder = self._encoders.get(type(obj))
+
+        if encoder is None:
+            self._encode_other(obj, data)
+        else:
+            encoder(obj, data)
+
+    def _encode_other(self, obj, data):
+        # Size has to be checked before int (and float)
+        if isinstance(obj, size.Size):
+            self._encode_size(obj, data)
+        elif isinstance(obj, bool):
+            self._encode_bool(obj, data)
+        elif isinstance(obj, int):
+            self._encode_int(obj, data)
+        elif isinstance(obj, float):
+            self._encode_float(obj, data)
+        elif isinstance(obj, str):
+            self._encode_str_obj(obj, data)
+        elif isinstance(obj, bytearray):
+            self._encode_bytes(obj, data)
+        elif isinstance(obj, (list, tuple)):
+            self._encode_list(obj, data)
+        elif isinstance(obj, dict):
+            self._encode_dict(obj, data)
+        elif isinstance(obj, BaseException):
+            data.append(self._EXCEPTION)
+            self._encode_exception(obj, data)
+        else:
+            raise CodecError("Unsupported type %s." % type(obj).__name__)
+
+    def _encode_uint(self, value, data):
+        while value > 0x7F:
+            data.append((value & 0x7F) | 0x80)
+            value >>= 7
+        data.append(value)
+
+    def _encode_str(self, value, data):
+        encoded = value.encode("utf-8")
+        self._encode_uint(len(encoded), data)
+        data.extend(encoded)
+
+    def _encode_none(self, _obj, data):
+        data.append(self._NONE)
+
+    def _encode_bool(self, obj, data):
+        data.append(self._TRUE if obj else self._FALSE)
+
+    def _encode_int(self, obj, data):
+        data.append(self._INT)
+        # zigzag encoding for negative numbers
+        self._encode_uint(obj * 2 if obj >= 0 else -obj * 2 - 1, data)
+
+    def _encode_float(self, obj, data):
+        data.append(self._FLOAT)
+        data.extend(self._float.pack(obj))
+
+    def _encode_str_obj(self, obj, data):
+        data.append(self._STR)
+        self._encode_str(obj, data)
+
+    def _encode_bytes(self, obj, data):
+        data.append(self._BYTES)
+        self._encode_uint(len(obj), data)
+        data.extend(obj)
+
+    def _encode_list(self, obj, data):
+        data.append(self._TUPLE if isinstance(obj, tuple) else self._LIST)
+        self._encode_uint(len(obj), data)
+        for item in obj:
+            self._encode(item, data)
+
+    def _encode_dict(self, obj, data):
+        data.append(self._DICT)
+        self._encode_uint(len(obj), data)
+        for key, value in obj.items():
+            self._encode(key, data)
+            self._encode(value, data)
+
+    def _encode_proxyid(self, obj, data):
+        data.append(self._PROXYID)
+        self._encode_uint(obj.id, data)
+        self._encode_uint(obj.epoch, data)
+
+    def _encode_container(self, obj, data):
+        data.append(self._CONTAINER)
+        self._encode_uint(len(obj.kwargs), data)
+        for key, value in obj.kwargs.items():
+            self._encode_str(key, data)
+            self._encode(value, data)
+
+    def _encode_size(self, obj, data):
+        # sizes are (almost) always whole bytes
+        value = int(obj)
+        if value == obj and value >= 0:
+            data.append(self._SIZE)
+            self._encode_uint(value, data)
+        else:
+            data.append(self._SIZE_DECIMAL)
+            self._encode_str(str(decimal.Decimal(obj)), data)
+
+    def _encode_exception(self, exception, data):
+        self._encode_str(type(exception).__module__, data)
+        self._encode_str(type(exception).__qualname__, data)
+        self._encode_str(str(exception), data)
+
+        # arguments and attributes of the exception are optional -- skip
+        # these that can't be encoded
+        for values in (list(exception.args), exception.__dict__):
+            try:
+                encoded = bytearray()
+                self._encode(values, encoded)
+            except CodecError:
+                self._encode(None, data)
+            else:
+                data.extend(encoded)
+
+    # decoding
+
+    def _decode(self, data, offset, depth=0):
+        tag = data[offset]
+        decoder = self._decoders.get(tag)
+        if decoder is None:
+            raise CodecError("Unknown type tag %d." % tag)
+
+        if tag not in self._nested:
+            return decoder(data, offset + 1)
+
+        if depth >= self.max_depth:
+            raise CodecError("Message is nested too deeply.")
+
+        return decoder(data, offset + 1, depth + 1)
+
+    def _decode_uint(self, data, offset):
+        byte = data[offset]
+        if byte < 0x80:
+            return byte, offset + 1
+
+        value = 0
+        shift = 0
+
+        while True:
+            byte = data[offset]
+            offset += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+
+            if not byte & 0x80:
+                return value, offset
+
+    def _decode_raw(self, data, offset):
+        length, offset = self._decode_uint(data, offset)
+
+        if offset + length > len(data):
+            raise CodecError("Message is too short.")
+
+        return data[offset:offset + length], offset + length
+
+    def _decode_int(self, data, offset):
+        value, offset = self._decode_uint(data, offset)
+
+        return (value >> 1 if not value & 1 else -((value + 1) >> 1)), offset
+
+    def _decode_float(self, data, offset):
+        return self._float.unpack_from(data, offset)[0], offset + self._float.size
+
+    def _decode_str(self, data, offset):
+        value, offset = self._decode_raw(data, offset)
+
+        return str(value, "utf-8"), offset
+
+    def _decode_bytes(self, data, offset):
+        value, offset = self._decode_raw(data, offset)
+
+        return value.tobytes(), offset
+
+    def _decode_list(self, data, offset, depth):
+        length, offset = self._decode_uint(data, offset)
+        items = []
+        for _i in range(length):
+            item, offset = self._decode(data, offset, depth)
+            items.append(item)
+
+        return items, offset
+
+    def _decode_tuple(self, data, offset, depth):
+        items, offset = self._decode_list(data, offset, depth)
+
+        return tuple(items), offset
+
+    def _decode_dict(self, data, offset, depth):
+        length, offset = self._decode_uint(data, offset)
+        items = {}
+        for _i in range(length):
+            key, offset = self._decode(data, offset, depth)
+            value, offset = self._decode(data, offset, depth)
+
+            try:
+                items[key] = value
+            except TypeError:
+                raise CodecError("Unhashable dictionary key of type %s." % type(key).__name__)
+
+        return items, offset
+
+    def _decode_proxyid(self, data, offset):
+        proxy_id = ProxyID.__new__(ProxyID)  # do not generate a new id
+        proxy_id.id, offset = self._decode_uint(data, offset)
+        proxy_id.epoch, offset = self._decode_uint(data, offset)
+
+        return proxy_id, offset
+
+    def _decode_container(self, data, offset, depth):
+        length, offset = self._decode_uint(data, offset)
+        kwargs = {}
+        for _i in range(length):
+            key, offset = self._decode_str(data, offset)
+            kwargs[key], offset = self._decode(data, offset, depth)
+
+        return ProxyDataContainer(**kwargs), offset
+
+    def _decode_size(self, data, offset):
+        value, offset = self._decode_uint(data, offset)
+
+        return size.Size(value), offset
+
+    def _decode_size_decimal(self, data, offset):
+        value, offset = self._decode_str(data, offset)
+
+        return size.Size(decimal.Decimal(value)), offset
+
+    def _decode_exception(self, data, offset, depth):
+        module, offset = self._decode_str(data, offset)
+        name, offset = self._decode_str(data, offset)
+        message, offset = self._decode_str(data, offset)
+        args, offset = self._decode(data, offset, depth)
+        attrs, offset = self._decode(data, offset, depth)
+
+        if args is not None and not isinstance(args, (list, tuple)):
+            raise CodecError("Invalid exception arguments of type %s." % type(args).__name__)
+        if attrs is not None and not (isinstance(attrs, dict) and all(isinstance(key, str) for key in attrs.keys())):
+            raise CodecError("Invalid exception attributes.")
+
+        exc_class = getattr(sys.modules.get(module), name, None) if "." not in name else None
+        if not (isinstance(exc_class, type) and issubclass(exc_class, BaseException)):
+            # unknown exception type, keep at least the message
+            exc_class = builtins.Exception
+            args = ["%s.%s: %s" % (module, name, message)]
+            attrs = None
+
+        # do not call __init__ -- we don't know its arguments
+        exception = exc_class.__new__(exc_class)
+        exception.args = tuple(args) if args is not None else (message,)
+        if attrs:
+            exception.__dict__.update(attrs)
+
+        return exception, offset
+
+# ---------------------------------------------------------------------------- #
+
+
+codecs = {PickleCodec.version: PickleCodec,
+          BinaryCodec.version: BinaryCodec}
+
+
+def supported_versions():
+    """ Supported codec versions, preferred first
+    """
+
+    return sorted(codecs.keys(), reverse=True)
+
+
+def negotiate(versions):
+    """ Choose codec from versions supported by the other side
+
+        :param versions: codec versions supported by the other side
+        :type versions: list of int
+        :returns: codec instance
+        :raises CodecError: no common codec version
+
+    """
+
+    common = [version for version in supported_versions() if version in versions]
+    if not common:
+        raise CodecError("No common protocol version (supported: %s, requested: %s)." %
+                         (supported_versions(), versions))
+
+    return codecs[common[0]]()
+
+
+def detect(data):
+    """ Get codec for the first message -- before the codec is negotiated
+        client can use any supported codec
+    """
+
+    if data[:1] == BinaryCodec.header:
+        return BinaryCodec()
+
+    return PickleCodec()
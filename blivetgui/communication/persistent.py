@@ -0,0 +1,120 @@
+# persistent.py
+# Helpers for long-running (persistent) blivet-gui-daemon
+#
+# Copyright (C) 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Red Hat Author(s): Vojtech Trefny <vtrefny@redhat.com>
+#
+# ---------------------------------------------------------------------------- #
+
+import os
+import random
+import socket
+import stat
+import tempfile
+
+# ---------------------------------------------------------------------------- #
+
+RUN_DIR = "/run/blivet-gui"
+
+# socket of the persistent daemon (see data/systemd/blivet-gui-daemon.socket)
+SOCKET_PATH = os.path.join(RUN_DIR, "blivet-gui.sock")
+
+# secret clients use to authenticate; only root can read it, clients get it
+# from 'pkexec blivet-gui-daemon --attach'
+SECRET_PATH = os.path.join(RUN_DIR, "secret")
+
+# first file descriptor passed by systemd socket activation
+SD_LISTEN_FDS_START = 3
+
+
+def activation_socket():
+    """ Get listening socket passed by systemd socket activation
+
+        :returns: listening socket or None if the daemon wasn't socket activated
+        :rtype: socket.socket or None
+
+    """
+
+    if os.environ.get("LISTEN_PID") != str(os.getpid()):
+        return None
+
+    try:
+        num_fds = int(os.environ.get("LISTEN_FDS", "0"))
+    except ValueError:
+        return None
+
+    if num_fds < 1:
+        return None
+
+    # don't pass the sockets to our child processes
+    for variable in ("LISTEN_PID", "LISTEN_FDS", "LISTEN_FDNAMES"):
+        os.environ.pop(variable, None)
+
+    return socket.socket(fileno=SD_LISTEN_FDS_START)
+
+
+def daemon_available(path=SOCKET_PATH):
+    """ Is the persistent daemon running (or waiting for socket activation)
+
+        :param path: socket of the persistent daemon
+        :type path: str
+        :rtype: bool
+
+    """
+
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def get_secret(path=SECRET_PATH):
+    """ Get secret of the persistent daemon; new secret is created if it
+        doesn't exist yet (by the daemon or by the first attaching client)
+
+        :param path: file with the secret
+        :type path: str
+        :returns: secret
+        :rtype: str
+
+    """
+
+    try:
+        with open(path, "r") as secret_file:
+            return secret_file.read().strip()
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path), mode=0o755, exist_ok=True)
+
+    secret = str(random.SystemRandom().getrandbits(64))
+
+    # secret is written to a temporary file and linked to its place, so no
+    # one can read an incomplete file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w") as secret_file:
+            secret_file.write(secret)
+        os.link(tmp_path, path)
+    except FileExistsError:
+        # created by someone else in the meantime
+        return get_secret(path)
+    finally:
+        os.unlink(tmp_path)
+
+    return secret
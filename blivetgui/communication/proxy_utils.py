@@ -58,8 +58,16 @@ class ProxyID(object):
 
     _newid_gen = functools.partial(next, itertools.count())
 
-    def __init__(self):
+    def __init__(self, epoch=0):
         self.id = self._newid_gen()
+        # server epoch this id was created in, all ids from older epochs are
+        # invalid (e.g. after blivet reset)
+        self.epoch = epoch
 
     def __repr__(self):
         return "'Proxy ID, %s'" % self.id
+
+
+class InvalidProxyID(Exception):
+    """ Proxy object with given ID doesn't exist (anymore) on the server
+    """
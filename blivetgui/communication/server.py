@@ -25,15 +25,20 @@ from blivet import size
 
 import traceback
 import inspect
-
-import struct
+import functools
+import threading
+import time
 
 import socketserver
-import pickle
 
-from .proxy_utils import ProxyID, ProxyDataContainer
+from .proxy_utils import ProxyID, ProxyDataContainer, InvalidProxyID
+from . import codec
+from . import socket_utils
+from .stats import RequestStats, request_key
 
 from ..blivet_utils import BlivetUtils
+from ..timings import timeline
+from ..profiling import profiler, request_profiler, memory_report
 
 # ---------------------------------------------------------------------------- #
 
@@ -46,6 +51,33 @@ remove_atexit((log_file,))
 
 picklable_types = (str, int, float, bool, size.Size, BaseException)
 
+# BlivetUtils methods changing the device tree; a diff of the device tree is
+# sent to the client together with the answer for these methods
+devicetree_changing_methods = ("add_device", "add_devices", "delete_device", "edit_partition_device",
+                               "edit_lvmvg_device", "create_disk_label", "blivet_cancel_actions", "reload_device")
+
+# BlivetUtils methods replacing all blivet objects; all proxy objects are
+# invalidated after calling these methods
+devicetree_resetting_methods = ("blivet_reset", "blivet_do_it")
+
+# BlivetUtils methods only reading the device tree; these (and requests for
+# params of proxy objects) run in worker threads concurrently with each other,
+# everything else runs only when no other request is running
+read_only_methods = ("get_disks", "get_group_devices", "get_free_pvs_info", "get_vg_free",
+                     "get_free_disks_regions", "get_removable_pvs_info", "get_group_device",
+                     "get_luks_device", "get_children", "get_disk_children", "get_roots",
+                     "device_resizable", "get_actions", "get_available_disklabels",
+                     "get_available_raid_levels", "get_available_filesystems", "get_mountpoints",
+                     "get_device_by_name", "get_devices_by_type", "get_disk_partitions", "get_snapshots",
+                     "get_container", "get_locked_luks_devices")
+
+# methods of proxy objects that don't change the objects
+read_only_object_methods = ("__len__", "__iter__", "__str__")
+
+# statistics of requests handled by the server (for all clients), times are
+# in microseconds, sizes in bytes (including the message header)
+server_stats = RequestStats(("server_time", "request_size", "reply_size"))
+
 # ---------------------------------------------------------------------------- #
 
 
@@ -56,6 +88,8 @@ class BlivetProxyObject(object):
     def __init__(self, blivet_object, obj_id):
         self.blivet_object = blivet_object
         self.id = obj_id
+        # how many times the id was sent to the client and not released yet
+        self.sent = 0
 
     def __getattr__(self, name):
         if not hasattr(self.blivet_object, name):
@@ -96,7 +130,39 @@ class BlivetProxyObject(object):
 class BlivetUtilsServer(socketserver.BaseRequestHandler):  # pylint: disable=no-init
     blivet_utils = None
     proxy_objects = []
+    # proxy objects are per connection (see 'setup'), these are defaults for
+    # instances created without it
     object_dict = {}
+    # id() of blivet objects -> ProxyID, to send the same id for the same object
+    object_ids = {}
+    # current epoch; increased when all proxy objects are invalidated
+    epoch = 0
+    # codec used to encode messages, negotiated with client in "init"
+    codec = codec.PickleCodec()
+    codec_negotiated = False
+
+    # default locks for instances created without 'setup'; every connection
+    # has its own locks
+    send_lock = threading.Lock()
+    objects_lock = threading.RLock()
+    # request id -> size of answers sent for the request
+    reply_sizes = {}
+
+    def setup(self):
+        self.send_lock = threading.Lock()
+        self.objects_lock = threading.RLock()
+        self.reply_sizes = {}
+
+        # every client has its own proxy objects, ids released by one client
+        # can still be used by other clients
+        self.object_dict = {}
+        self.object_ids = {}
+        self.epoch = 0
+
+        self.server.handlers.append(self)  # pylint: disable=no-member
+
+    def finish(self):
+        self.server.handlers.remove(self)  # pylint: disable=no-member
 
     def handle(self):
         """ Handle request
@@ -106,49 +172,149 @@ class BlivetUtilsServer(socketserver.BaseRequestHandler):  # pylint: disable=no-
             msg = self._recv_msg()
 
             if not msg:
-                self.server.quit = True  # pylint: disable=no-member
+                self._client_disconnected()
                 break
 
-            unpickled_msg = pickle.loads(msg)
+            request_id, data = msg
 
-            if unpickled_msg[0] == self.server.secret:  # pylint: disable=no-member
-                raise RuntimeError("Request from unauthorized client.")
+            # requests run in this thread are profiled here, read-only requests
+            # in '_run_request'
+            with profiler.profiled():
+                unpickled_msg = self._decode_msg(data)
 
-            if unpickled_msg[1] == "quit":
-                self.server.quit = True  # pylint: disable=no-member
-                break
+                if unpickled_msg[0] != self.server.secret:  # pylint: disable=no-member
+                    raise RuntimeError("Request from unauthorized client.")
 
-            elif unpickled_msg[1] == "init":
-                log.debug("RECV: " + str(unpickled_msg[1:]))
-                self._blivet_utils_init(unpickled_msg)
+                if unpickled_msg[1] == "quit":
+                    # persistent server keeps running for other clients
+                    if self.server.persistent:  # pylint: disable=no-member
+                        self._client_disconnected()
+                    else:
+                        self.server.quit = True  # pylint: disable=no-member
+                    break
 
-            elif unpickled_msg[1] == "logs":
-                log.debug("RECV: " + str(unpickled_msg[1:]))
-                self._blivet_utils_logs(unpickled_msg)
-
-            elif unpickled_msg[1] == "call":
-                if unpickled_msg[2] == "luks_decrypt":
+                if unpickled_msg[1] == "call" and unpickled_msg[2] in ("luks_decrypt", "luks_decrypt_all"):
                     # do not log passwords
                     log.debug("RECV: " + str(unpickled_msg[1:2]) + str(unpickled_msg[3][0]) + " ***")
                 else:
                     log.debug("RECV: " + str(unpickled_msg[1:]))
-                self._call_utils_method(unpickled_msg)
 
-            elif unpickled_msg[1] == "param":
-                log.debug("RECV: " + str(unpickled_msg[1:]))
-                self._get_param(unpickled_msg)
+                self._dispatch(request_id, unpickled_msg, len(data) + socket_utils.msg_header.size)
+
+    def _client_disconnected(self):
+        """ Quit after the last client disconnected; persistent server keeps
+            running (with the device tree loaded) for the next client, only
+            actions scheduled by the client are canceled
+        """
+
+        # there is still other client using the device tree
+        if self._other_session():
+            return
+
+        if not self.server.persistent:  # pylint: disable=no-member
+            self.server.quit = True  # pylint: disable=no-member
+            return
+
+        if self.blivet_utils:
+            with self.server.storage_lock.write_locked():  # pylint: disable=no-member
+                self.blivet_utils.blivet_cancel_actions(list(self.blivet_utils.storage.devicetree.actions))
+                # session is over, next client can use the device tree
+                self.blivet_utils = None
+
+    def _other_session(self):
+        """ Is the device tree used by other client
+
+            ..note.: only one client can use the device tree at a time -- all
+                     clients would share (and run) the scheduled actions
+        """
+
+        return any(handler.blivet_utils for handler in self.server.handlers  # pylint: disable=no-member
+                   if handler is not self)
+
+    def _dispatch(self, request_id, data, request_size=0):
+        """ Run the request -- read-only requests are run in a worker thread
+            (their answers can be sent in a different order than the requests
+            were received), other requests are run right away when no other
+            request is running
+        """
+
+        request_functions = {"init": self._blivet_utils_init,
+                             "logs": self._blivet_utils_logs,
+                             "call": self._call_utils_method,
+                             "param": self._get_param,
+                             "method": self._call_method,
+                             "next": self._get_next,
+                             "key": self._get_key,
+                             "multi": self._get_multi,
+                             "release": self._release_objects,
+                             "timings": self._get_timings,
+                             "stats": self._get_stats,
+                             "reset": self._reset_stats,
+                             "profile": self._set_profiled_methods,
+                             "memory": self._get_memory_report}
+
+        if data[1] not in request_functions.keys():
+            log.error("Unknown request: %s", data[1])
+            return
+
+        function = request_functions[data[1]]
+        storage_lock = self.server.storage_lock  # pylint: disable=no-member
+
+        if self._is_read_only(data):
+            # lock is acquired here, not in the worker, so a write request
+            # received later can't run before this one
+            storage_lock.acquire_read()
+            self.server.executor.submit(self._run_request, function, data, request_id,  # pylint: disable=no-member
+                                        storage_lock.release_read, request_size)
+        else:
+            storage_lock.acquire_write()
+            # devices changed by the request are already updated in the device
+            # tree, udev events for them are not needed
+            suppress_udev_events(self.server)  # pylint: disable=no-member
+            self._run_request(function, data, request_id, self._release_write, request_size)
+
+    def _release_write(self):
+        resume_udev_events(self.server)  # pylint: disable=no-member
+        self.server.storage_lock.release_write()  # pylint: disable=no-member
+
+    def _is_read_only(self, data):
+        """ Does the request only read data
+        """
+
+        if data[1] in ("param", "next", "key"):
+            return True
 
-            elif unpickled_msg[1] == "method":
-                log.debug("RECV: " + str(unpickled_msg[1:]))
-                self._call_method(unpickled_msg)
+        elif data[1] == "method":
+            return data[3] in read_only_object_methods
 
-            elif unpickled_msg[1] == "next":
-                log.debug("RECV: " + str(unpickled_msg[1:]))
-                self._get_next(unpickled_msg)
+        elif data[1] == "multi":
+            return all(request[0] != "method" or request[2] in read_only_object_methods for request in data[2])
 
-            elif unpickled_msg[1] == "key":
-                log.debug("RECV: " + str(unpickled_msg[1:]))
-                self._get_key(unpickled_msg)
+        elif data[1] == "call":
+            return data[2] in read_only_methods
+
+        return False
+
+    def _run_request(self, function, data, request_id, release, request_size=0):
+        start = time.monotonic()
+
+        try:
+            with profiler.profiled():
+                function(data, request_id)
+        except Exception as e:  # pylint: disable=broad-except
+            # client is waiting for the answer, send the exception instead
+            log.error("Request %s failed:\n%s", data[1], traceback.format_exc())
+            self._send(self._pickle_answer(e), request_id)
+        finally:
+            release()
+            self._record_stats(data, request_id, request_size, start)
+
+    def _record_stats(self, data, request_id, request_size, start):
+        with self.send_lock:
+            reply_size = self.reply_sizes.pop(request_id, 0)
+
+        server_stats.record(request_key(data[1:]), server_time=(time.monotonic() - start) * 1000000,
+                            request_size=request_size, reply_size=reply_size)
 
     def _recv_msg(self):
         """ Recieve a message from client
@@ -156,77 +322,166 @@ class BlivetUtilsServer(socketserver.BaseRequestHandler):  # pylint: disable=no-
             ..note.: first for bites represents message length
         """
 
-        raw_msglen = self._recv_data(4)
+        return socket_utils.recv_msg(self.request)  # pylint: disable=no-member
 
-        if not raw_msglen:
-            return None
+    def _decode_msg(self, msg):
+        """ Decode message from the client; until the codec is negotiated the
+            message has to use one of the codecs allowed for clients
+        """
 
-        msglen = struct.unpack(">I", raw_msglen)[0]
+        if self.codec_negotiated:
+            return self.codec.decode(msg)
 
-        return self._recv_data(msglen)
+        msg_codec = codec.detect(msg)
 
-    def _recv_data(self, length):
-        """ Recieve 'length' of data from client
+        # data from clients are decoded before the secret is checked, they
+        # can't be unpickled
+        if msg_codec.version not in self._allowed_codecs():
+            raise RuntimeError("Request using unsupported protocol version %d." % msg_codec.version)
 
-            :param length: length of data to receive
-            :type length: int
+        return msg_codec.decode(msg)
 
+    def _allowed_codecs(self):
+        """ Codecs the clients can use -- client and daemon are always shipped
+            together so only the binary codec (which never creates arbitrary
+            objects) is accepted
         """
 
-        data = b""
+        return [codec.BinaryCodec.version]
 
-        while len(data) < length:
-            packet = self.request.recv(length - len(data))  # pylint: disable=no-member
-
-            if not packet:
-                return None
+    def _pickle_answer(self, answer):
+        """ Encode the answer using current codec. If the answer is not picklable, create
+            a BlivetProxyObject and send its ProxyID instead
+        """
 
-            data += packet
+        pickled_answer = self.codec.encode(self._convert_answer(answer))
 
-        return data
+        return pickled_answer
 
-    def _pickle_answer(self, answer):
-        """ Pickle the answer. If the answer is not picklable, create a BlivetProxyObject and
-            send its ProxyID instead
+    def _convert_answer(self, answer):
+        """ Convert the answer to a picklable object -- unpicklable objects are replaced
+            by ProxyID of newly created BlivetProxyObject, lists, dicts and
+            ProxyDataContainers are converted item by item (they are sent by value)
         """
 
-        if answer is None:
+        if answer is None or isinstance(answer, picklable_types):
             picklable_answer = answer
 
         elif isinstance(answer, BlivetProxyObject):
+            with self.objects_lock:
+                answer.sent += 1
             picklable_answer = answer.id
 
+        elif isinstance(answer, ProxyDataContainer):
+            picklable_answer = ProxyDataContainer()
+
+            for item in answer:
+                picklable_answer[item] = self._convert_answer(answer[item])
+
         elif isinstance(answer, (list, tuple)):
             picklable_answer = []
 
             for item in answer:
-                if not isinstance(item, picklable_types):
-                    new_id = ProxyID()
-                    proxy_object = BlivetProxyObject(item, new_id)
-                    self.object_dict[new_id.id] = proxy_object
-                    picklable_answer.append(new_id)
-                else:
-                    picklable_answer.append(item)
+                picklable_answer.append(self._convert_answer(item))
+
+        elif isinstance(answer, dict):
+            picklable_answer = {}
 
-        elif not isinstance(answer, picklable_types):
-            new_id = ProxyID()
-            proxy_object = BlivetProxyObject(answer, new_id)
-            self.object_dict[new_id.id] = proxy_object
-            picklable_answer = new_id
+            for key, item in answer.items():
+                picklable_answer[key] = self._convert_answer(item)
 
         else:
-            picklable_answer = answer
+            picklable_answer = self._get_proxy_id(answer)
 
-        pickled_answer = pickle.dumps(picklable_answer)
+        return picklable_answer
 
-        return pickled_answer
+    def _get_proxy_id(self, blivet_object):
+        """ Get ProxyID for an unpicklable object; objects already sent to the
+            client keep their ids, new BlivetProxyObject is created for others
+        """
+
+        with self.objects_lock:
+            proxy_id = self.object_ids.get(id(blivet_object))
+
+            if proxy_id is None or proxy_id.id not in self.object_dict.keys():
+                proxy_id = ProxyID(epoch=self.epoch)
+                self.object_dict[proxy_id.id] = BlivetProxyObject(blivet_object, proxy_id)
+                self.object_ids[id(blivet_object)] = proxy_id
 
-    def _get_param(self, data):
+            self.object_dict[proxy_id.id].sent += 1
+
+        return proxy_id
+
+    def _get_proxy_object(self, proxy_id):
+        """ Get BlivetProxyObject for given ProxyID
+
+            :raises InvalidProxyID: when the object doesn't exist or it is from
+                                    an older epoch
+
+        """
+
+        if proxy_id.epoch != self.epoch:
+            raise InvalidProxyID("Proxy object %s is from an older epoch (%d, current is %d)." %
+                                 (proxy_id.id, proxy_id.epoch, self.epoch))
+
+        try:
+            return self.object_dict[proxy_id.id]
+        except KeyError:
+            raise InvalidProxyID("Proxy object %s doesn't exist." % proxy_id.id)
+
+    def _release_objects(self, data, request_id=0):  # pylint: disable=unused-argument
+        """ Remove proxy objects no longer used by the client
+
+            Client sends ids of the objects together with the number of times
+            it received them. Object is removed only if the client received
+            all the ids we sent -- answers sent after the client released the
+            object (e.g. for read-only requests running in worker threads)
+            may contain the same id and the client will create a new proxy
+            object for it.
+
+            ..note.: no answer is sent for this message
+        """
+
+        with self.objects_lock:
+            for obj_id, received in data[2]:
+                proxy_object = self.object_dict.get(obj_id)
+                if proxy_object is None:
+                    continue
+
+                proxy_object.sent -= received
+                if proxy_object.sent > 0:
+                    continue
+
+                del self.object_dict[obj_id]
+
+                blivet_object_id = id(proxy_object.blivet_object)
+                if blivet_object_id in self.object_ids.keys() and self.object_ids[blivet_object_id].id == obj_id:
+                    del self.object_ids[blivet_object_id]
+
+    def _invalidate_objects(self):
+        """ Remove all proxy objects and start a new epoch
+        """
+
+        with self.objects_lock:
+            self.object_dict = {}
+            self.object_ids = {}
+            self.epoch += 1
+
+    def _get_param(self, data, request_id=0):
         """ Get param of a object
         """
 
-        proxy_object = self.object_dict[data[2].id]
-        param_name = data[3]
+        try:
+            answer = self._param_answer(data[2], data[3])
+        except InvalidProxyID as e:
+            answer = e
+
+        pickled_answer = self._pickle_answer(answer)
+
+        self._send(pickled_answer, request_id)
+
+    def _param_answer(self, proxy_id, param_name):
+        proxy_object = self._get_proxy_object(proxy_id)
 
         if not hasattr(proxy_object.blivet_object, param_name):
             answer = AttributeError("%s has no attribute %s" % (proxy_object.blivet_object.name, param_name))
@@ -237,15 +492,23 @@ class BlivetUtilsServer(socketserver.BaseRequestHandler):  # pylint: disable=no-
         else:
             answer = getattr(proxy_object, param_name)
 
-        pickled_answer = self._pickle_answer(answer)
-
-        self._send(pickled_answer)
+        return answer
 
-    def _get_next(self, data):
+    def _get_next(self, data, request_id=0):
         """ Get next member of iterable object
         """
 
-        proxy_object = self.object_dict[data[2].id]
+        try:
+            answer = self._next_answer(data[2])
+        except InvalidProxyID as e:
+            answer = e
+
+        pickled_answer = self._pickle_answer(answer)
+
+        self._send(pickled_answer, request_id)
+
+    def _next_answer(self, proxy_id):
+        proxy_object = self._get_proxy_object(proxy_id)
 
         try:
             answer = proxy_object.__next__()
@@ -253,48 +516,96 @@ class BlivetUtilsServer(socketserver.BaseRequestHandler):  # pylint: disable=no-
         except StopIteration as stop:
             answer = stop
 
-        pickled_answer = self._pickle_answer(answer)
+        return answer
 
-        self._send(pickled_answer)
-
-    def _get_key(self, data):
+    def _get_key(self, data, request_id=0):
         """ Get member of iterable object
         """
 
-        proxy_object = self.object_dict[data[2].id]
-        key = data[3]
+        try:
+            answer = self._key_answer(data[2], data[3])
+        except InvalidProxyID as e:
+            answer = e
 
-        answer = proxy_object[key]
         pickled_answer = self._pickle_answer(answer)
 
-        self._send(pickled_answer)
+        self._send(pickled_answer, request_id)
+
+    def _key_answer(self, proxy_id, key):
+        proxy_object = self._get_proxy_object(proxy_id)
+
+        return proxy_object[key]
+
+    def _get_multi(self, data, request_id=0):
+        """ Get answers for a batch of param/method/next/key requests
+
+            ..note.: all answers are sent back in one message as a list
+                     (in the same order as the requests)
+        """
+
+        answer_functions = {"param": self._param_answer,
+                            "method": self._method_answer,
+                            "next": self._next_answer,
+                            "key": self._key_answer}
+
+        answers = []
+
+        for request in data[2]:
+            try:
+                answer = answer_functions[request[0]](*request[1:])
+            except InvalidProxyID as e:
+                answer = e
+            answers.append(self._convert_answer(answer))
+
+        pickled_answer = self.codec.encode(answers)
 
-    def _blivet_utils_init(self, data):
-        """ Create BlivetUtils instance
+        self._send(pickled_answer, request_id)
+
+    def _blivet_utils_init(self, data, request_id=0):
+        """ Create BlivetUtils instance (or use the one created for another client)
         """
 
         if self.blivet_utils:
             raise RuntimeError("Server already received request for initialization.")
 
-        if self.server.other_running:  # pylint: disable=no-member
+        args = self._args_convertTo_objects(data[2])
+        shared_utils = self.server.blivet_utils  # pylint: disable=no-member
+
+        if self.server.other_running or self._other_session():  # pylint: disable=no-member
             answer = ProxyDataContainer(success=False, reason="running")
 
+        elif shared_utils and [shared_utils.kickstart] == list(args):
+            self.blivet_utils = shared_utils
+            answer = ProxyDataContainer(success=True)
+
         else:
-            args = self._args_convertTo_objects(data[2])
+            preloaded = self.server.preloaded  # pylint: disable=no-member
 
             try:
-                self.blivet_utils = BlivetUtils(*args)
+                if preloaded and preloaded[0] == list(args):
+                    # BlivetUtils created while the client was starting
+                    self.blivet_utils = preloaded[1].result()
+                else:
+                    self.blivet_utils = BlivetUtils(*args)
             except Exception as e:  # pylint: disable=broad-except
                 answer = ProxyDataContainer(success=False, reason="exception", exception=e,
                                             traceback=traceback.format_exc())
             else:
+                self.server.blivet_utils = self.blivet_utils  # pylint: disable=no-member
                 answer = ProxyDataContainer(success=True)
 
+        # choose protocol version from versions supported by the client
+        # (clients not sending them support only pickle)
+        client_versions = data[3] if len(data) > 3 else [codec.PickleCodec.version]
+        self.codec = codec.negotiate([version for version in client_versions if version in self._allowed_codecs()])
+        self.codec_negotiated = True
+        answer["codec"] = self.codec.version
+
         pickled_answer = self._pickle_answer(answer)
 
-        self._send(pickled_answer)
+        self._send(pickled_answer, request_id)
 
-    def _blivet_utils_logs(self, data):
+    def _blivet_utils_logs(self, data, request_id=0):
         """ Set server logging
 
             :returns: server log files
@@ -312,46 +623,137 @@ class BlivetUtilsServer(socketserver.BaseRequestHandler):  # pylint: disable=no-
         answer = (self.blivet_utils.blivet_logfile, self.blivet_utils.program_logfile, log_file)
         pickled_answer = self._pickle_answer(answer)
 
-        self._send(pickled_answer)
+        self._send(pickled_answer, request_id)
+
+    def _get_timings(self, data, request_id=0):  # pylint: disable=unused-argument
+        """ Send phases recorded in the daemon timeline (see :mod:`~..timings`)
+
+            :returns: recorded phases (empty if timings are not enabled)
+            :rtype: list of dict
+
+        """
+
+        timeline.log(log)
+
+        pickled_answer = self._pickle_answer(timeline.phases)
+
+        self._send(pickled_answer, request_id)
+
+    def _get_stats(self, data, request_id=0):  # pylint: disable=unused-argument
+        """ Send statistics of requests handled by the server
+
+            :returns: statistics (see :func:`~.stats.RequestStats.snapshot`)
+            :rtype: dict
+
+        """
+
+        pickled_answer = self._pickle_answer(server_stats.snapshot())
+
+        self._send(pickled_answer, request_id)
+
+    def _reset_stats(self, data, request_id=0):  # pylint: disable=unused-argument
+        """ Clear statistics of requests
+        """
+
+        server_stats.reset()
+
+        self._send(self._pickle_answer(True), request_id)
+
+    def _set_profiled_methods(self, data, request_id=0):
+        """ Start or stop profiling of every call of the BlivetUtils methods
+            (see :class:`~..profiling.RequestProfiler`)
+
+            :returns: currently profiled methods and directory with the profiles
+            :rtype: tuple of (list of str, str)
+
+        """
+
+        methods, enabled = data[2]
+
+        unknown = [method for method in methods if not hasattr(BlivetUtils, method)]
+        if unknown:
+            raise ValueError("Unknown BlivetUtils methods: %s" % ", ".join(unknown))
+
+        answer = request_profiler.set_methods(methods, enabled)
+
+        self._send(self._pickle_answer(answer), request_id)
+
+    def _get_memory_report(self, data, request_id=0):
+        """ Send top memory allocators from tracemalloc snapshot (tracing is
+            started by the first request if the daemon doesn't run with
+            '--profile')
+
+            :returns: whether tracing was running, top allocators in all files,
+                      top allocators in blivet and blivet-gui, number of proxy
+                      objects
+            :rtype: dict
+
+        """
+
+        limit = data[2][0] if data[2] else 10
 
-    def _call_method(self, data):
+        tracing, top, top_blivet = memory_report(limit)
+
+        with self.objects_lock:
+            proxy_objects = len(self.object_dict)
+
+        answer = {"tracing": tracing, "top": top, "top_blivet": top_blivet, "proxy_objects": proxy_objects}
+
+        self._send(self._pickle_answer(answer), request_id)
+
+    def _call_method(self, data, request_id=0):
         """ Call blivet method
         """
 
-        proxy_object = self.object_dict[data[2].id]
-        param_name = data[3]
-        args = data[4]
+        try:
+            answer = self._method_answer(data[2], data[3], data[4])
+        except InvalidProxyID as e:
+            answer = e
 
-        method = getattr(proxy_object, param_name)
-        answer = method(*args)
         pickled_answer = self._pickle_answer(answer)
 
-        self._send(pickled_answer)
+        self._send(pickled_answer, request_id)
 
-    def _call_utils_method(self, data):
+    def _method_answer(self, proxy_id, method_name, args):
+        proxy_object = self._get_proxy_object(proxy_id)
+
+        method = getattr(proxy_object, method_name)
+
+        return method(*args)
+
+    def _call_utils_method(self, data, request_id=0):
         """ Call a method from BlivetUtils
         """
 
-        args = self._args_convertTo_objects(data[3])
-
         if data[2] == "blivet_do_it":
-            answer = self.blivet_utils.blivet_do_it(self._progress_report_hook)
+            with request_profiler.profiled(data[2]):
+                answer = self.blivet_utils.blivet_do_it(functools.partial(self._progress_report_hook,
+                                                                          request_id=request_id))
 
         else:
             try:
+                args = self._args_convertTo_objects(data[3])
                 utils_method = getattr(self.blivet_utils, data[2])
-                ret = utils_method(*args)
+                with request_profiler.profiled(data[2]):
+                    ret = utils_method(*args)
                 answer = ProxyDataContainer(success=True, answer=ret)
+                if data[2] in devicetree_changing_methods:
+                    answer["diff"] = self.blivet_utils.get_devicetree_diff()
             except Exception as e:  # pylint: disable=broad-except
                 answer = ProxyDataContainer(success=False, exception=e, traceback=traceback.format_exc())
 
+        if data[2] in devicetree_resetting_methods:
+            # all clients use the same BlivetUtils instance
+            for handler in self.server.handlers:  # pylint: disable=no-member
+                handler._invalidate_objects()
+
         pickled_answer = self._pickle_answer(answer)
 
-        self._send(pickled_answer)
+        self._send(pickled_answer, request_id)
 
-    def _progress_report_hook(self, message):
+    def _progress_report_hook(self, message, request_id=0):
         pickled_msg = self._pickle_answer((False, message))
-        self._send(pickled_msg)
+        self._send(pickled_msg, request_id)
 
     def _args_convertTo_objects(self, args):
         """ All args sent from client to server are either built-in types (int, str...) or
@@ -366,12 +768,12 @@ class BlivetUtilsServer(socketserver.BaseRequestHandler):  # pylint: disable=no-
                     if isinstance(arg[item], ProxyDataContainer):
                         arg[item] = self._args_convertTo_objects([arg[item]])[0]
                     if isinstance(arg[item], ProxyID):
-                        arg[item] = self.object_dict[arg[item].id].blivet_object
+                        arg[item] = self._get_proxy_object(arg[item]).blivet_object
                     elif isinstance(arg[item], (list, tuple)):
                         arg[item] = self._args_convertTo_objects(arg[item])
                 args_obj.append(arg)
             elif isinstance(arg, ProxyID):
-                args_obj.append(self.object_dict[arg.id].blivet_object)
+                args_obj.append(self._get_proxy_object(arg).blivet_object)
 
             elif isinstance(arg, (list, tuple)):
                 args_obj.append(self._args_convertTo_objects(arg))
@@ -381,6 +783,91 @@ class BlivetUtilsServer(socketserver.BaseRequestHandler):  # pylint: disable=no-
 
         return args_obj
 
-    def _send(self, data):
-        data = struct.pack(">I", len(data)) + data
-        self.request.sendall(data)  # pylint: disable=no-member
+    def send_notification(self, notification):
+        """ Send a message the client didn't ask for (with request id 0)
+
+            :param notification: notification data
+            :type notification: :class:`~.proxy_utils.ProxyDataContainer`
+
+        """
+
+        # client hasn't finished initialization, it doesn't know our codec yet
+        if not self.blivet_utils:
+            return
+
+        try:
+            self._send(self._pickle_answer(notification))
+        except OSError:
+            # client disconnected, handler will be removed
+            pass
+
+    def _send(self, data, request_id=0):
+        # answers can be sent from multiple worker threads
+        with self.send_lock:
+            if request_id:
+                self.reply_sizes[request_id] = (self.reply_sizes.get(request_id, 0) + len(data) +
+                                                socket_utils.msg_header.size)
+            socket_utils.sendmsg_all(self.request, socket_utils.msg_buffers(data, request_id))  # pylint: disable=no-member
+
+# ---------------------------------------------------------------------------- #
+
+
+def suppress_udev_events(server):
+    """ Stop reporting udev events (see :func:`handle_udev_events`) until
+        :func:`resume_udev_events` is called
+
+        :param server: blivet-gui server
+        :type server: BlivetGUIServer
+
+    """
+
+    if server.udev_monitor is not None:
+        server.udev_monitor.suppress()
+
+
+def resume_udev_events(server):
+    """ Report udev events again, events caused by changes made while the
+        events were suppressed are dropped
+
+        :param server: blivet-gui server
+        :type server: BlivetGUIServer
+
+    """
+
+    if server.udev_monitor is not None:
+        server.udev_monitor.resume()
+
+
+def handle_udev_events(server, events):
+    """ Update the device tree for udev events and notify all clients about
+        the changes (called from :class:`~..udev_monitor.UdevMonitor` thread)
+
+        :param server: blivet-gui server
+        :type server: BlivetGUIServer
+        :param events: (action, sysfs path) for changed devices
+        :type events: list of tuple
+
+    """
+
+    if server.blivet_utils is None:
+        return
+
+    log.debug("UDEV: " + str(events))
+
+    with server.storage_lock.write_locked():
+        # scanning the devices again can generate new events
+        suppress_udev_events(server)
+        try:
+            changed = server.blivet_utils.apply_udev_events(events)
+        except Exception:  # pylint: disable=broad-except
+            log.error("Failed to apply udev events:\n%s", traceback.format_exc())
+            return
+        finally:
+            resume_udev_events(server)
+
+        if not changed:
+            return
+
+        diff = server.blivet_utils.get_devicetree_diff()
+        for handler in list(server.handlers):
+            handler.send_notification(ProxyDataContainer(event="devicetree-changed", diff=diff))
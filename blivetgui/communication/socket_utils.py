@@ -0,0 +1,113 @@
+# socket_utils.py
+# Sending and receiving of messages between blivet-gui client and server
+#
+# Copyright (C) 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Red Hat Author(s): Vojtech Trefny <vtrefny@redhat.com>
+#
+# ---------------------------------------------------------------------------- #
+
+import struct
+
+# ---------------------------------------------------------------------------- #
+
+# every message is prefixed with its length and id of the request (answers
+# have the same id as the request, messages without answer use 0)
+msg_header = struct.Struct(">II")
+
+
+def recv_exactly(sock, length):
+    """ Receive exactly 'length' bytes from the socket
+
+        Data are received directly to a preallocated buffer, no temporary
+        bytes objects are created and joined.
+
+        :param sock: socket
+        :type sock: socket.socket
+        :param length: length of data to receive
+        :type length: int
+        :returns: received data or None if the connection was closed
+        :rtype: bytearray or None
+
+    """
+
+    data = bytearray(length)
+    view = memoryview(data)
+    received = 0
+
+    while received < length:
+        nbytes = sock.recv_into(view[received:], length - received)
+
+        if not nbytes:
+            return None
+
+        received += nbytes
+
+    return data
+
+
+def recv_msg(sock):
+    """ Receive one message (length prefixed) from the socket
+
+        :returns: request id and received message or None if the connection was closed
+        :rtype: tuple of (int, bytearray) or None
+
+    """
+
+    raw_header = recv_exactly(sock, msg_header.size)
+
+    if not raw_header:
+        return None
+
+    msglen, request_id = msg_header.unpack(raw_header)
+    data = recv_exactly(sock, msglen)
+
+    if data is None:
+        return None
+
+    return (request_id, data)
+
+
+def sendmsg_all(sock, buffers):
+    """ Send all buffers using scatter/gather I/O (buffers are not joined)
+
+        :param sock: socket
+        :type sock: socket.socket
+        :param buffers: data to send
+        :type buffers: list of bytes-like objects
+
+    """
+
+    buffers = [memoryview(buf).cast("B") for buf in buffers if len(buf)]
+
+    while buffers:
+        sent = sock.sendmsg(buffers)
+
+        # remove what was already sent, sendmsg doesn't have to send everything
+        while buffers and sent >= len(buffers[0]):
+            sent -= len(buffers[0])
+            buffers.pop(0)
+
+        if sent:
+            buffers[0] = buffers[0][sent:]
+
+
+def msg_buffers(data, request_id=0):
+    """ Buffers (header and the data) for sending one message
+    """
+
+    return [msg_header.pack(len(data), request_id), data]
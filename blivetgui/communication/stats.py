@@ -0,0 +1,192 @@
+# stats.py
+# Statistics of requests between blivet-gui client and server
+#
+# Copyright (C) 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Red Hat Author(s): Vojtech Trefny <vtrefny@redhat.com>
+#
+# ---------------------------------------------------------------------------- #
+
+import threading
+
+# ---------------------------------------------------------------------------- #
+
+
+def request_key(request):
+    """ Kind of the request and name of the method or attribute it asks for
+
+        :param request: request (without the secret)
+        :type request: tuple
+        :returns: kind ('call', 'param'...) and name ('' if the request
+                  doesn't have one)
+        :rtype: tuple of (str, str)
+
+    """
+
+    kind = request[0]
+
+    if kind == "call":
+        name = request[1]
+    elif kind in ("param", "method") and len(request) > 2:
+        name = request[2]
+    else:
+        name = ""
+
+    return (kind, str(name))
+
+
+class Histogram(object):
+    """ Histogram of non-negative integer values with bounded size
+
+        Values are counted in buckets with logarithmic width (similar to HDR
+        histograms) -- every power of two range is split to the same number
+        of buckets, so the relative error of reported values is the same for
+        small and large values and the number of buckets is bounded.
+    """
+
+    def __init__(self, precision_bits=5, max_value=2 ** 40):
+        """
+
+        :param precision_bits: 2 ** precision_bits buckets for every power
+                               of two range (relative error is at most
+                               2 ** -(precision_bits - 1))
+        :type precision_bits: int
+        :param max_value: larger values are counted as max_value
+        :type max_value: int
+
+        """
+
+        self.precision_bits = precision_bits
+        self.max_value = max_value
+
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+        # lower bound of bucket -> number of values
+        self._buckets = {}
+
+    def _bucket(self, value):
+        shift = max(0, value.bit_length() - self.precision_bits)
+
+        return (value >> shift) << shift, 1 << shift
+
+    def record(self, value):
+        value = min(max(int(value), 0), self.max_value)
+
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        lower, _width = self._bucket(value)
+        self._buckets[lower] = self._buckets.get(lower, 0) + 1
+
+    def percentile(self, percent):
+        """ Value below which 'percent' of recorded values are (upper bound
+            of the bucket, never more than the maximum)
+        """
+
+        if not self.count:
+            return None
+
+        limit = self.count * percent / 100.0
+        seen = 0
+
+        for lower in sorted(self._buckets.keys()):
+            seen += self._buckets[lower]
+            if seen >= limit:
+                _lower, width = self._bucket(lower)
+                return min(lower + width - 1, self.max)
+
+        return self.max
+
+    def to_dict(self):
+        """ Summary of the histogram (picklable)
+        """
+
+        return {"count": self.count,
+                "min": self.min,
+                "max": self.max,
+                "mean": self.total / self.count if self.count else None,
+                "p50": self.percentile(50),
+                "p90": self.percentile(90),
+                "p99": self.percentile(99),
+                "buckets": sorted(self._buckets.items())}
+
+
+class RequestStats(object):
+    """ Counts of requests and histograms of their metrics (times in
+        microseconds, sizes in bytes) for every kind of request and
+        method or attribute name
+    """
+
+    def __init__(self, metrics):
+        """
+
+        :param metrics: names of recorded metrics
+        :type metrics: tuple of str
+
+        """
+
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        # (kind, name) -> metric -> Histogram
+        self._entries = {}
+
+    def record(self, key, **values):
+        """ Record metrics for one request
+
+            :param key: kind and name of the request (see :func:`request_key`)
+            :type key: tuple of (str, str)
+            :param values: values of the metrics
+
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = dict((metric, Histogram()) for metric in self.metrics)
+                self._entries[key] = entry
+
+            for metric, value in values.items():
+                entry[metric].record(value)
+
+    def snapshot(self):
+        """ Current statistics
+
+            :returns: "kind:name" -> metric -> summary of its histogram
+                      ('count' for the number of requests)
+            :rtype: dict
+
+        """
+
+        with self._lock:
+            snapshot = {}
+
+            for (kind, name), entry in self._entries.items():
+                summary = dict((metric, histogram.to_dict()) for metric, histogram in entry.items())
+                summary["count"] = max(histogram.count for histogram in entry.values())
+                snapshot[kind + ":" + name] = summary
+
+            return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}
@@ -0,0 +1,190 @@
+# device_index.py
+# Lookup indexes for devices in the device tree
+#
+# Copyright (C) 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Red Hat Author(s): Vojtech Trefny <vtrefny@redhat.com>
+#
+# ---------------------------------------------------------------------------- #
+
+import threading
+
+from blivet.devices import LVMSnapShotDevice
+
+# ---------------------------------------------------------------------------- #
+
+# types of devices with members (parents) indexed in the 'containers' index
+CONTAINER_TYPES = ("lvmvg", "mdarray", "btrfs volume")
+
+
+class DeviceIndex(object):
+    """ Indexes of devices in the device tree
+
+        Available indexes (all of them map key to list of devices):
+
+          * names -- device name
+          * types -- device type
+          * partitions -- id of disk -> partitions on the disk
+          * snapshots -- id of LV -> its snapshots
+          * containers -- id of member -> container (VG, MD array, btrfs volume)
+
+        Indexes are built from the whole device tree by :func:`rebuild` and
+        then updated only for devices changed by added or removed actions
+        (see :func:`update`).
+    """
+
+    indexes = ("names", "types", "partitions", "snapshots", "containers")
+
+    def __init__(self, storage):
+        """
+
+        :param storage: blivet instance
+        :type storage: blivet.Blivet
+
+        """
+
+        self.storage = storage
+
+        self._lock = threading.Lock()
+        self._indexes = dict((index, {}) for index in self.indexes)
+        # id of device -> (device, keys of the device in the indexes)
+        self._indexed = {}
+
+        self.rebuild()
+
+    def rebuild(self):
+        """ Index all devices in the device tree
+        """
+
+        with self._lock:
+            for index in self._indexes.values():
+                index.clear()
+            self._indexed.clear()
+
+            for device in self.storage.devices:
+                self._add(device)
+
+    def update(self, action, removed=False):
+        """ Update indexes for devices changed by the action
+
+            :param action: added or removed action
+            :type action: blivet.deviceaction.DeviceAction
+            :param removed: whether the action was removed (canceled)
+            :type removed: bool
+
+        """
+
+        # created device is in the tree only when the action is scheduled,
+        # destroyed device only when the action was canceled
+        if action.is_device and action.is_create:
+            present = not removed
+        elif action.is_device and action.is_destroy:
+            present = removed
+        else:
+            present = True
+
+        with self._lock:
+            if present:
+                self._add(action.device)
+            else:
+                self._remove(action.device)
+
+            # members were added to or removed from the container
+            container = getattr(action, "container", None)
+            if container is not None and container.id in self._indexed.keys():
+                self._add(container)
+
+            # adding or removing a partition can change names of other
+            # partitions on the disk
+            if action.device.type == "partition" and action.device.disk is not None:
+                self._refresh_partitions([action.device.disk])
+
+    def refresh_partitions(self, disks=None):
+        """ Update indexes for partitions on the disks (e.g. after partitions
+            were allocated -- new partitions can get new names and disks)
+
+            :param disks: disks (None for all disks)
+            :type disks: list of blivet.devices.DiskDevice or None
+
+        """
+
+        with self._lock:
+            self._refresh_partitions(disks)
+
+    def _refresh_partitions(self, disks):
+        if disks is None:
+            partitions = self._indexes["types"].get("partition", [])
+        else:
+            partitions = [part for disk in disks for part in self._indexes["partitions"].get(disk.id, [])]
+
+            # new partitions have no disk (or can be moved to another disk)
+            # before allocation, re-index them with their final disk and name
+            partitions.extend(part for part in self._indexes["types"].get("partition", [])
+                              if not part.exists and part not in partitions)
+
+        for partition in list(partitions):
+            self._add(partition)
+
+    def get(self, index, key):
+        """ Get devices from the index
+
+            :param index: name of the index (see :attr:`indexes`)
+            :type index: str
+            :param key: key in the index
+            :returns: devices for the key
+            :rtype: list
+
+        """
+
+        with self._lock:
+            return list(self._indexes[index].get(key, []))
+
+    def _device_keys(self, device):
+        keys = [("names", device.name), ("types", device.type)]
+
+        if device.type == "partition" and device.disk is not None:
+            keys.append(("partitions", device.disk.id))
+
+        if isinstance(device, LVMSnapShotDevice) and device.origin is not None:
+            keys.append(("snapshots", device.origin.id))
+
+        if device.type in CONTAINER_TYPES:
+            keys.extend(("containers", parent.id) for parent in device.parents)
+
+        return keys
+
+    def _add(self, device):
+        if device.id in self._indexed.keys():
+            self._remove(device)
+
+        keys = self._device_keys(device)
+        for index, key in keys:
+            self._indexes[index].setdefault(key, []).append(device)
+
+        self._indexed[device.id] = (device, keys)
+
+    def _remove(self, device):
+        if device.id not in self._indexed.keys():
+            return
+
+        _device, keys = self._indexed.pop(device.id)
+        for index, key in keys:
+            devices = self._indexes[index][key]
+            devices.remove(_device)
+
+            if not devices:
+                del self._indexes[index][key]
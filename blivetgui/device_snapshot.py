@@ -0,0 +1,223 @@
+# device_snapshot.py
+# Local copy of information about devices in the device tree
+#
+# Copyright (C) 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Red Hat Author(s): Vojtech Trefny <vtrefny@redhat.com>
+#
+# ---------------------------------------------------------------------------- #
+
+from .communication.proxy_utils import ProxyDataContainer, InvalidProxyID
+
+# ---------------------------------------------------------------------------- #
+
+
+class DeviceSnapshot(object):
+    """ Local copy of information about all devices in the device tree
+
+        Information about devices is received from the server in one message
+        (see :func:`~.blivet_utils.BlivetUtils.get_devicetree_snapshot`) and
+        views can read it without contacting the server. Parents and children
+        of the devices (sent as ids) are replaced by the information about the
+        parent/child devices, so the information about device can be used
+        (for reading) the same way as the device itself.
+
+    """
+
+    def __init__(self, snapshot=None):
+        """
+
+        :param snapshot: snapshot received from the server
+        :type snapshot: :class:`~.communication.proxy_utils.ProxyDataContainer`
+
+        """
+
+        # generation of the snapshot received from the server
+        self.generation = 0
+
+        # device id -> information about the device
+        self.devices = {}
+
+        self.disks = []
+        self.group_devices = {"lvm": [], "raid": [], "btrfs": []}
+
+        # proxy id -> information about the device (or None for devices
+        # that are not in the snapshot, e.g. free space)
+        self._proxy_cache = {}
+        # proxy id -> information about the device for proxies from previous
+        # snapshot (see load)
+        self._stale_cache = {}
+
+        if snapshot:
+            self.load(snapshot)
+
+    def load(self, snapshot):
+        """ Replace current content with a new snapshot
+        """
+
+        self.generation = snapshot.generation
+        self.devices = dict((info.id, info) for info in snapshot.devices)
+
+        old_cache = self._proxy_cache
+        self._proxy_cache = {}
+
+        for info in self.devices.values():
+            self._add_proxy(info)
+
+        # proxy objects we got before are invalid after the server was reset,
+        # but they still can be used to find the "same" (same name) device
+        # until the next load
+        names = dict((info.name, info) for info in self.devices.values())
+        self._stale_cache = {}
+        for proxy_id, old_info in old_cache.items():
+            if old_info is not None and proxy_id not in self._proxy_cache.keys() and old_info.name in names.keys():
+                self._stale_cache[proxy_id] = names[old_info.name]
+
+        for info in self.devices.values():
+            self._link_device(info)
+
+        self._load_toplevel(snapshot)
+
+    def apply_diff(self, diff):
+        """ Apply changes received from the server
+
+            Information about changed devices is updated in place so all
+            references to it (e.g. from parents or children) remain valid.
+
+            :param diff: device tree diff
+            :type diff: :class:`~.communication.proxy_utils.ProxyDataContainer`
+            :returns: ids of affected devices and whether list of disks and
+                      group devices changed or None if the diff can't be applied
+                      (a diff was lost, full snapshot has to be loaded)
+            :rtype: :class:`~.communication.proxy_utils.ProxyDataContainer` or None
+
+        """
+
+        if diff.generation <= self.generation:
+            # older than current snapshot, already included
+            return ProxyDataContainer(ids=set(), toplevel_changed=False)
+
+        if diff.generation != self.generation + 1:
+            return None
+
+        old_toplevel = self._toplevel_ids()
+
+        removed = set(diff.removed)
+        for dev_id in removed:
+            self.devices.pop(dev_id, None)
+
+        # devices previously not found in the snapshot might be there now,
+        # proxies of removed devices are not needed anymore
+        self._proxy_cache = dict((key, value) for key, value in self._proxy_cache.items()
+                                 if value is not None and value.id not in removed)
+        self._stale_cache = dict((key, value) for key, value in self._stale_cache.items()
+                                 if value.id not in removed)
+
+        updated = []
+        for new_info in diff.added + diff.changed:
+            info = self.devices.get(new_info.id)
+            if info is None:
+                info = new_info
+                self.devices[info.id] = info
+            else:
+                info.kwargs.update(new_info.kwargs)
+            self._add_proxy(info)
+            updated.append(info)
+
+        for info in updated:
+            self._link_device(info)
+
+        self._load_toplevel(diff)
+        self.generation = diff.generation
+
+        ids = set(diff.removed) | set(info.id for info in updated)
+
+        return ProxyDataContainer(ids=ids, toplevel_changed=(old_toplevel != self._toplevel_ids()))
+
+    def _load_toplevel(self, data):
+        self.disks = [self.devices[dev_id] for dev_id in data.disks]
+        for group in self.group_devices.keys():
+            self.group_devices[group] = [self.devices[dev_id] for dev_id in data[group]]
+
+    def _toplevel_ids(self):
+        return ([info.id for info in self.disks],
+                dict((group, [info.id for info in devices]) for group, devices in self.group_devices.items()))
+
+    def _add_proxy(self, info):
+        proxy_id = getattr(info.device, "proxy_id", None)
+        if proxy_id is not None:
+            self._proxy_cache[proxy_id.id] = info
+
+    def _link_device(self, info):
+        """ Replace ids of parents/children with information about these devices
+        """
+
+        info["parents"] = [self.devices[dev] for dev in info.parents if dev in self.devices]
+        info["children"] = [self.devices[dev] for dev in info.children if dev in self.devices]
+        if info.disk is not None:
+            info["disk"] = self.devices.get(info.disk)
+
+    def get_related_ids(self, info):
+        """ Get ids of the device, all its ancestors and descendants
+        """
+
+        related = set()
+
+        def _walk(dev, attr):
+            for other in dev[attr]:
+                if other.id not in related:
+                    related.add(other.id)
+                    _walk(other, attr)
+
+        related.add(info.id)
+        _walk(info, "parents")
+        _walk(info, "children")
+
+        return related
+
+    def get(self, device):
+        """ Get information about the device
+
+            :param device: device
+            :type device: :class:`~.communication.client.ClientProxyObject`
+            :returns: information about the device or None if the device is not
+                      part of the snapshot (e.g. free space)
+            :rtype: :class:`~.communication.proxy_utils.ProxyDataContainer` or None
+
+        """
+
+        if device is None:
+            return None
+
+        proxy_id = getattr(device, "proxy_id", None)
+        if proxy_id is not None and proxy_id.id in self._proxy_cache.keys():
+            return self._proxy_cache[proxy_id.id]
+
+        if proxy_id is not None and proxy_id.id in self._stale_cache.keys():
+            return self._stale_cache[proxy_id.id]
+
+        # device from some other reply than the snapshot -- we need to ask
+        # for its id but only once
+        try:
+            info = self.devices.get(device.id)
+        except InvalidProxyID:
+            info = None
+
+        if proxy_id is not None:
+            self._proxy_cache[proxy_id.id] = info
+
+        return info
@@ -359,6 +359,9 @@ class AddDialog(Gtk.Dialog):
          size, fs, label etc.
     """
 
+    # device types that can be created on multiple free regions at once
+    repeat_types = ("partition", "lvmpv")
+
     def __init__(self, parent_window, parent_type, parent_device, free_device, free_pvs,
                  free_disks_regions, supported_raids, supported_fs, mountpoints, kickstart_mode=False):
         """
@@ -419,6 +422,8 @@ class AddDialog(Gtk.Dialog):
         if kickstart_mode:
             self.mountpoint_entry = self.add_mountpoint()
 
+        self.repeat_check = self.add_repeat_chooser()
+
         self.devices_combo = self.add_device_chooser()
         self.devices_combo.connect("changed", self.on_devices_combo_changed)
 
@@ -676,7 +681,15 @@ class AddDialog(Gtk.Dialog):
 
         device_type = self._get_selected_device_type()
 
-        if device_type == "lvmvg":
+        if self._repeat_selected():
+            # one new device in every selected free region
+            for free in self.free_disks_regions:
+                if free.is_free_region:
+                    disk = free.parents[0]
+                    self.parents_store.append([disk, free, False, False, disk.name,
+                                               "disk region", str(free.size)])
+
+        elif device_type == "lvmvg":
             for pv, free in self.free_pvs:
                 self.parents_store.append([pv, free, False, False, pv.name,
                                            "lvmpv", str(free.size)])
@@ -996,6 +1009,29 @@ class AddDialog(Gtk.Dialog):
 
         return mountpoint_entry
 
+    def add_repeat_chooser(self):
+        repeat_label = Gtk.Label(label=_("Create on all selected:"), xalign=1)
+        repeat_label.get_style_context().add_class("dim-label")
+        self.grid.attach(repeat_label, 0, 15, 1, 1)
+
+        repeat_check = Gtk.CheckButton()
+        repeat_check.set_tooltip_text(_("Create the same device in every selected free region"))
+        self.grid.attach(repeat_check, 1, 15, 1, 1)
+
+        self.widgets_dict["repeat"] = [repeat_label, repeat_check]
+
+        repeat_check.connect("toggled", self.on_repeat_check)
+
+        return repeat_check
+
+    def on_repeat_check(self, _toggle):
+        self.update_parent_list()
+        self.size_grid, self.size_scroll = self.add_size_areas()
+        self.update_raid_type_chooser()
+
+    def _repeat_selected(self):
+        return self._get_selected_device_type() in self.repeat_types and self.repeat_check.get_active()
+
     def add_encrypt_chooser(self):
         encrypt_label = Gtk.Label(label=_("Encrypt:"), xalign=1)
         encrypt_label.get_style_context().add_class("dim-label")
@@ -1101,6 +1137,8 @@ class AddDialog(Gtk.Dialog):
 
         device_type = self._get_selected_device_type()
 
+        self.repeat_check.set_active(False)
+
         self.update_parent_list()
         self.add_advanced_options()
         self.encrypt_check.set_active(False)
@@ -1158,6 +1196,11 @@ class AddDialog(Gtk.Dialog):
             self.hide_widgets(["label", "fs", "encrypt", "passphrase", "advanced", "mdraid", "mountpoint"])
             self.update_size_areas_limits(max_multi=Decimal(0.8))
 
+        if device_type in self.repeat_types and self.parent_type == "disk":
+            self.show_widgets(["repeat"])
+        else:
+            self.hide_widgets(["repeat"])
+
         self.update_raid_type_chooser()
 
     def _get_selected_device_type(self):
@@ -1187,6 +1230,32 @@ class AddDialog(Gtk.Dialog):
 
         user_input = self.get_selection()
 
+        if isinstance(user_input, list):
+            if len(user_input) > 1 and user_input[0].mountpoint:
+                msg = _("Mountpoint can't be set when creating multiple devices.")
+                message_dialogs.ErrorDialog(self, msg)
+
+                return False
+
+            user_inputs = user_input
+        else:
+            user_inputs = [user_input]
+
+        # every device has its own size and parents, check all of them
+        if not all(self._validate_device_input(device_input) for device_input in user_inputs):
+            return False
+
+        if self.pass_entry.get_text() != self.pass2_entry.get_text():
+            msg = _("Provided passphrases do not match.")
+            message_dialogs.ErrorDialog(self, msg)
+            return False
+
+        return True
+
+    def _validate_device_input(self, user_input):
+        """ Validate data input for one device
+        """
+
         if not user_input.filesystem and user_input.device_type == "partition" \
            and user_input.advanced["parttype"] != "extended":
             msg = _("Filesystem type must be specified when creating new partition.")
@@ -1234,11 +1303,6 @@ class AddDialog(Gtk.Dialog):
             message_dialogs.ErrorDialog(self, msg)
             return False
 
-        if self.pass_entry.get_text() != self.pass2_entry.get_text():
-            msg = _("Provided passphrases do not match.")
-            message_dialogs.ErrorDialog(self, msg)
-            return False
-
         return True
 
     def on_ok_clicked(self, _event):
@@ -1246,12 +1310,25 @@ class AddDialog(Gtk.Dialog):
             self.run()
 
     def get_selection(self):
+        """ Get user selection
+
+            :returns: selected parameters or list of selected parameters for
+                      every new device in the "create on all selected" mode
+
+        """
+
+        if self._repeat_selected():
+            return [self._get_device_selection([area]) for area in self.size_areas]
+        else:
+            return self._get_device_selection(self.size_areas)
+
+    def _get_device_selection(self, size_areas):
         device_type = self._get_selected_device_type()
 
         parents = []
         total_size = 0
 
-        for size_area, parent in self.size_areas:
+        for size_area, parent in size_areas:
             parents.append([parent, size_area.get_selection()])
             total_size += size_area.get_selection()
 
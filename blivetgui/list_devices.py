@@ -38,6 +38,8 @@ class ListDevices(object):
     """ List of parent devices
     """
 
+    _group_descriptions = {"lvmvg": "LVM2 VG", "mdarray": "MDArray", "btrfs volume": "Btrfs Volume"}
+
     def __init__(self, blivet_gui):
         """
 
@@ -54,6 +56,11 @@ class ListDevices(object):
         # currently selected device
         self.selected_device = None
 
+        # device name -> index of its row in the device list
+        self._device_rows = {}
+        # key (device id or header label) of every row in the device list
+        self._row_keys = []
+
         self.device_list = self.blivet_gui.builder.get_object("liststore_devices")
         num_devices = self.load_devices()
 
@@ -68,66 +75,101 @@ class ListDevices(object):
         selection = self.disks_view.get_selection()
         self.selection_signal = selection.connect("changed", self.on_disk_selection_changed)
 
-    def load_disks(self):
-        """ Load disks
+    def _disk_rows(self):
+        """ Rows for disks
         """
 
         icon_theme = Gtk.IconTheme.get_default()
         icon_disk = Gtk.IconTheme.load_icon(icon_theme, "drive-harddisk", 32, 0)
         icon_disk_usb = Gtk.IconTheme.load_icon(icon_theme, "drive-removable-media", 32, 0)
 
-        disks = self.blivet_gui.client.remote_call("get_disks")
+        disks = self.blivet_gui.device_snapshot.disks
+
+        rows = []
 
         if disks:
-            self.device_list.append([None, None, _("<b>Disks</b>")])
+            rows.append(self._header_row(_("<b>Disks</b>")))
 
         for disk in disks:
             if disk.removable:
-                self.device_list.append([disk, icon_disk_usb, str(disk.name + "\n<i><small>" +
-                                                                  str(disk.model) + "</small></i>")])
+                rows.append(self._device_row(disk, icon_disk_usb))
             else:
-                self.device_list.append([disk, icon_disk, str(disk.name + "\n<i><small>" +
-                                                              str(disk.model) + "</small></i>")])
+                rows.append(self._device_row(disk, icon_disk))
 
-        return len(disks)
+        return rows
 
-    def load_group_devices(self):
-        """ Load LVM2 VGs, Btrfs Volumes and MDArrays
+    def _group_device_rows(self):
+        """ Rows for LVM2 VGs, Btrfs Volumes and MDArrays
         """
 
-        gdevices = self.blivet_gui.client.remote_call("get_group_devices")
+        gdevices = self.blivet_gui.device_snapshot.group_devices
 
         icon_theme = Gtk.IconTheme.get_default()
         icon_group = Gtk.IconTheme.load_icon(icon_theme, "drive-multidisk", 32, 0)
 
-        if gdevices["lvm"]:
-            self.device_list.append([None, None, _("<b>LVM</b>")])
-            for device in gdevices["lvm"]:
-                self.device_list.append([device, icon_group, str(device.name + "\n<i><small>LVM2 VG</small></i>")])
+        rows = []
+
+        for group, header in (("lvm", _("<b>LVM</b>")), ("raid", _("<b>RAID</b>")),
+                              ("btrfs", _("<b>Btrfs Volumes</b>"))):
+            if gdevices[group]:
+                rows.append(self._header_row(header))
+                rows.extend(self._device_row(device, icon_group) for device in gdevices[group])
+
+        return rows
 
-        if gdevices["raid"]:
-            self.device_list.append([None, None, _("<b>RAID</b>")])
-            for device in gdevices["raid"]:
-                self.device_list.append([device, icon_group, str(device.name + "\n<i><small>MDArray</small></i>")])
+    def _header_row(self, label):
+        return (label, None, [None, None, label])
 
-        if gdevices["btrfs"]:
-            self.device_list.append([None, None, _("<b>Btrfs Volumes</b>")])
-            for device in gdevices["btrfs"]:
-                self.device_list.append([device, icon_group, str(device.name + "\n<i><small>Btrfs Volume</small></i>")])
+    def _device_row(self, info, icon):
+        return (info.id, info.name, [info.device, icon, self._device_label(info)])
 
-        return (len(gdevices["lvm"]) + len(gdevices["raid"]) + len(gdevices["btrfs"]))
+    def _device_label(self, info):
+        if info.is_disk:
+            description = str(info.model)
+        else:
+            description = self._group_descriptions.get(info.type, info.type)
+
+        return str(info.name + "\n<i><small>" + description + "</small></i>")
 
     def load_devices(self):
         """ Load all devices
+
+            The device list isn't cleared -- rows of removed devices are
+            removed, rows for new devices are inserted and other rows are
+            updated in place.
+
+            :returns: number of devices in the list
+            :rtype: int
+
         """
-        self.device_list.clear()
 
-        devices = 0
+        rows = self._disk_rows() + self._group_device_rows()
+        keys = set(key for key, _name, _row in rows)
+
+        # remove rows of devices that no longer exist
+        for idx in reversed(range(len(self._row_keys))):
+            if self._row_keys[idx] not in keys:
+                self.device_list.remove(self.device_list.get_iter(idx))
+                del self._row_keys[idx]
 
-        devices += self.load_disks()
-        devices += self.load_group_devices()
+        for idx, (key, _name, row) in enumerate(rows):
+            if idx < len(self._row_keys) and self._row_keys[idx] == key:
+                for column, value in enumerate(row):
+                    self.device_list[idx][column] = value
+                continue
 
-        return devices
+            # row moved to a different position
+            if key in self._row_keys:
+                old_idx = self._row_keys.index(key)
+                self.device_list.remove(self.device_list.get_iter(old_idx))
+                del self._row_keys[old_idx]
+
+            self.device_list.insert(idx, row)
+            self._row_keys.insert(idx, key)
+
+        self._device_rows = dict((name, idx) for idx, (_key, name, _row) in enumerate(rows) if name is not None)
+
+        return len(self._device_rows)
 
     def update_devices_view(self):
         """ Update device view
@@ -136,10 +178,13 @@ class ListDevices(object):
         # remember previously selected device name
         selection = self.disks_view.get_selection()
         model, treeiter = selection.get_selected()
+        selected_device = None
         if treeiter and model:
-            selected_device = model[treeiter][0].name
+            selected_info = self.blivet_gui.device_snapshot.get(model[treeiter][0])
+            if selected_info:
+                selected_device = selected_info.name
 
-        # reload devices
+        # update devices
         # adding new devices into TreeStore causing "changed" signal being
         # emitted, causing pointless reloading partitions views on all existing
         # devices -> block the selection_signal for now to avoid this
@@ -148,23 +193,34 @@ class ListDevices(object):
         selection.handler_unblock(self.selection_signal)
 
         # if the device still exists, select it; else select first device in list
-        i = 0
-        selected = False
+        if selected_device in self._device_rows.keys():
+            self.disks_view.set_cursor(self._device_rows[selected_device])
+        else:
+            self.disks_view.set_cursor(1)
 
-        for device in self.device_list:
-            if device[0] and device[0].name == selected_device:
-                self.disks_view.set_cursor(i)
-                selected = True
+    def update_device_rows(self, device_ids):
+        """ Update rows of changed devices without reloading the whole list
 
-            i += 1
+            :param device_ids: ids of changed devices
+            :type device_ids: set of int
 
-        if not selected:
-            self.disks_view.set_cursor(1)
+        """
+
+        for idx, row in enumerate(self.device_list):
+            if not row[0]:
+                continue
+
+            info = self.blivet_gui.device_snapshot.get(row[0])
+            if info is not None and info.id in device_ids:
+                row[2] = self._device_label(info)
+
+                # device could have been renamed
+                self._device_rows = dict((name, i) for name, i in self._device_rows.items() if i != idx)
+                self._device_rows[info.name] = idx
 
     def select_device_by_name(self, device_name):
-        for idx, device in enumerate(self.device_list):
-            if device[0] and device[0].name == device_name:
-                self.disks_view.set_cursor(idx)
+        if device_name in self._device_rows.keys():
+            self.disks_view.set_cursor(self._device_rows[device_name])
 
     def on_disk_selection_changed(self, selection):
         """ Onselect action for devices
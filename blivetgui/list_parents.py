@@ -22,6 +22,10 @@
 #
 # ---------------------------------------------------------------------------- #
 
+from .communication.proxy_utils import ProxyDataContainer
+
+# ---------------------------------------------------------------------------- #
+
 
 class ListParents(object):
     """ List of parents of selected device
@@ -35,42 +39,59 @@ class ListParents(object):
         self.parents_list.clear()
 
         # no physical view for disks, empty list and return
-        if selected_device.is_disk:
+        if self._device_info(selected_device).is_disk:
             return
 
-        parent_devices = self._get_parent_devices(selected_device)
+        parent_names = [parent.name for parent in self._get_parent_devices(selected_device)]
         root_devices = self.blivet_gui.client.remote_call("get_roots", selected_device)
 
         for root in root_devices:
+            root_info = self._device_info(root)
             root_iter = self.parents_list.append(None, [root, False])
-            if root.is_disk:
+            if root_info.is_disk:
                 childs = self.blivet_gui.client.remote_call("get_disk_children", root).partitions
-            elif root.type == "mdarray":
+            elif root_info.type == "mdarray":
                 childs = [root]
             else:
                 childs = self.blivet_gui.client.remote_call("get_children", root)
 
             for child in childs:
-                if child.type == "btrfs volume" and root.is_disk and root.format.type == "btrfs":
+                child_info = self._device_info(child)
+                if child_info.type == "btrfs volume" and root_info.is_disk and root_info.format.type == "btrfs":
                     self.parents_list.append(root_iter, [root, True])
-                elif child.type == "partition" and child.is_extended:
-                    for parent in parent_devices:
-                        if parent.type == "partition" and parent.is_logical and parent.disk.name == child.disk.name:
-                            self.parents_list.append(root_iter, [parent, True])
-                elif child.name in [d.name for d in parent_devices]:
+                elif child_info.type == "partition" and child_info.is_extended:
+                    for parent in self._get_parent_devices(selected_device):
+                        if parent.type == "partition" and parent.is_logical and parent.disk.name == child_info.disk.name:
+                            self.parents_list.append(root_iter, [self._info_device(parent), True])
+                elif child_info.name in parent_names:
                     self.parents_list.append(root_iter, [child, True])
                 else:
                     self.parents_list.append(root_iter, [child, False])
 
+    def _device_info(self, device):
+        info = self.blivet_gui.device_snapshot.get(device)
+
+        return info if info is not None else device
+
+    def _info_device(self, info):
+        # information from the device snapshot has the device itself stored
+        # as 'device'; devices not in the snapshot are used directly
+        if isinstance(info, ProxyDataContainer):
+            return info.device
+
+        return info
+
     def _get_parent_devices(self, device):
+        info = self._device_info(device)
+
         parents = []
-        if device.type == "lvmvg":
-            for pv in device.pvs:
+        if info.type == "lvmvg":
+            for pv in info.parents:
                 if pv.type == "luks/dm-crypt":
-                    parents.append(pv.slave)
+                    parents.append(pv.parents[0])
                 else:
                     parents.append(pv)
-        elif device.type in ("btrfs volume", "mdarray"):
-            return device.members
+        elif info.type in ("btrfs volume", "mdarray"):
+            return info.parents
 
         return parents
@@ -22,11 +22,29 @@
 #
 # ---------------------------------------------------------------------------- #
 
+import gi
+gi.require_version("GLib", "2.0")
+
+from gi.repository import GLib
+
+from contextlib import contextmanager
+
+from .communication.proxy_utils import ProxyDataContainer
+
+# ---------------------------------------------------------------------------- #
+
 
 class ListPartitions(object):
     """ List of childs of selected device
     """
 
+    # params of devices shown in the view fetched from the server at once
+    _prefetch_params = ("name", "type", "size", "children", "format.type", "format.mountable",
+                        "format.mountpoint", "format.system_mountpoint")
+
+    # show the spinner only when loading children takes longer than this (ms)
+    _spinner_delay = 200
+
     def __init__(self, blivet_gui):
 
         self.blivet_gui = blivet_gui
@@ -43,88 +61,286 @@ class ListPartitions(object):
 
         self.selected_partition = None
 
-    def update_partitions_list(self, selected_device):
+        self.spinner = self.blivet_gui.builder.get_object("spinner_logical")
+
+        # currently loaded device (changed when other device is selected)
+        # and requests being loaded for it
+        self._loading = None
+        self._calls = None
+
+    def update_partitions_list(self, selected_device, callback=None):
         """ Update partition view with selected disc children (partitions)
 
+            Children of the device (and all devices shown under them) are
+            loaded in background, spinner is shown if it takes too long.
+
             :param selected_device: selected device from list (eg. disk or VG)
             :type device_name: blivet.Device
+            :param callback: function to call when the view is updated
+            :type callback: func
 
         """
 
         self.partitions_list.clear()
 
-        def _add_chilren(childs, parent_iter=None):
-            for child in childs:
-                if self._is_group_device(child):
-                    new_child = self.blivet_gui.client.remote_call("get_group_device", child)
-                    self._add_to_store(new_child, parent_iter)
+        # children of previously selected device are no longer needed
+        if self._calls is not None:
+            self._calls.cancel()
 
-                elif child.format and child.format.type == "luks" and child.format.status:
-                    new_child = self.blivet_gui.client.remote_call("get_luks_device", child)
-                    self._add_to_store(new_child, None)
+        selected_info = self._device_info(selected_device)
 
-                elif child.children:
-                    child_iter = self._add_to_store(child, parent_iter)
-                    _add_chilren(self.blivet_gui.client.remote_call("get_children", child), child_iter)
+        loading = object()
+        self._loading = loading
 
-                else:
-                    self._add_to_store(child, parent_iter)
+        def _loaded(answers):
+            self._load_children(selected_device, selected_info, answers[0], callback)
+
+        if selected_info.is_disk:
+            self._remote_calls([("get_disk_children", (selected_device,))], _loaded)
+        else:
+            self._remote_calls([("get_children", (selected_device,))], _loaded)
+
+        GLib.timeout_add(self._spinner_delay, self._start_spinner, loading)
+
+    def _start_spinner(self, loading):
+        if loading is self._loading:
+            self.spinner.show()
+            self.spinner.start()
+
+        return False
+
+    def _stop_spinner(self):
+        self.spinner.stop()
+        self.spinner.hide()
+
+    def _remote_calls(self, calls, callback):
+        """ Call the methods in background, callback is called with their
+            return values in the main loop (only if the view wasn't updated
+            for other device in the meantime)
+        """
+
+        loading = self._loading
+
+        def _done(future):
+            if loading is self._loading:
+                self._calls = None
+                callback(future.result())
+
+        if not calls:
+            callback([])
+        else:
+            self._calls = self.blivet_gui.client.calls_async(calls, callback=_done)
+
+    def _load_children(self, selected_device, selected_info, childs, callback=None):
+        """ Load devices shown for the children of the selected device in
+            background and add them to the view
+        """
+
+        def _loaded(nodes):
+            self._loading = None
+            self._stop_spinner()
+
+            self._add_children(selected_device, selected_info, childs, nodes)
+
+            if callback:
+                callback()
+
+        if selected_info.is_disk:
+            self._load_level(childs.partitions + (childs.logicals or []), False, _loaded)
+        else:
+            self._load_tree(childs, _loaded)
+
+    def _load_level(self, devices, load_children, callback):
+        """ Load group devices and LUKS devices shown instead of the devices
+            and (optionally) children of the devices -- all devices are loaded
+            using two batches of requests
+
+            :param devices: devices to load
+            :type devices: list of blivet.Device
+            :param load_children: load children of the devices
+            :type load_children: bool
+            :param callback: function called with list of nodes
+                             (:class:`~.communication.proxy_utils.ProxyDataContainer`)
+                             for the devices
+            :type callback: func
+
+        """
+
+        with self._prefetched(devices):
+            nodes = [self._new_node(device) for device in devices]
+
+        # group device on a LUKS device can be found only after the LUKS
+        # device is loaded
+        luks_nodes = [node for node in nodes if node.is_luks and (node.luks_open or node.has_children)]
+
+        def _luks_loaded(luks_devices):
+            for node, luks_device in zip(luks_nodes, luks_devices):
+                node["luks"] = luks_device
+                if node.luks_open:
+                    node["is_group"] = self._is_luks_group_device(luks_device)
+
+            group_nodes = [node for node in nodes if node.is_group]
+            parent_nodes = [node for node in nodes if load_children and node.has_children
+                            and not node.is_group and not node.luks_open]
+
+            calls = [("get_group_device", (node.device,)) for node in group_nodes]
+            calls.extend(("get_children", (node.device,)) for node in parent_nodes)
+
+            def _loaded(answers):
+                for node, group_device in zip(group_nodes, answers):
+                    node["group"] = group_device
+                for node, children in zip(parent_nodes, answers[len(group_nodes):]):
+                    node["children"] = children
 
-        if selected_device.is_disk:
-            childs = self.blivet_gui.client.remote_call("get_disk_children", selected_device)
+                callback(nodes)
 
-            for child in childs.partitions:
-                if self._is_group_device(child):
-                    new_child = self.blivet_gui.client.remote_call("get_group_device", child)
-                    self._add_to_store(new_child, None)
+            self._remote_calls(calls, _loaded)
 
-                elif child.format and child.format.type == "luks" and child.children:
-                    new_child = self.blivet_gui.client.remote_call("get_luks_device", child)
-                    self._add_to_store(new_child, None)
+        self._remote_calls([("get_luks_device", (node.device,)) for node in luks_nodes], _luks_loaded)
 
+    def _load_tree(self, devices, callback):
+        """ Load the devices and all devices under them (see :func:`_load_level`),
+            devices on one level of the tree are loaded together
+
+            :param devices: devices to load
+            :type devices: list of blivet.Device
+            :param callback: function called with list of nodes for the devices,
+                             nodes for children of the devices are in their
+                             'nodes' lists
+            :type callback: func
+
+        """
+
+        root = ProxyDataContainer(nodes=[])
+
+        def _load(level_devices, parents):
+            def _loaded(nodes):
+                for node, parent in zip(nodes, parents):
+                    parent.nodes.append(node)
+
+                children = [(child, node) for node in nodes for child in node.children or []]
+                if children:
+                    _load([child for child, _node in children], [node for _child, node in children])
                 else:
-                    child_iter = self._add_to_store(child)
-                    if hasattr(child, "is_extended") and child.is_extended:
-                        for logical in childs.logicals:
-                            if self._is_group_device(logical):
-                                logical = self.blivet_gui.client.remote_call("get_group_device", logical)
-                            self._add_to_store(logical, child_iter)
+                    callback(root.nodes)
+
+            self._load_level(level_devices, True, _loaded)
+
+        _load(list(devices), [root] * len(devices))
+
+    def _new_node(self, device):
+        info = self._device_info(device)
+
+        is_luks = bool(info.format and info.format.type == "luks")
+
+        return ProxyDataContainer(device=device, nodes=[], luks=None, group=None, children=None,
+                                  is_group=self._is_group_device(device),
+                                  is_luks=is_luks, luks_open=is_luks and bool(info.format.status),
+                                  has_children=bool(info.children))
+
+    def _add_children(self, selected_device, selected_info, childs, nodes):
+        """ Add loaded children of the selected device to the view
+        """
+
+        def _add_nodes(nodes, parent_iter=None):
+            with self._prefetched([node.device for node in nodes]):
+                for node in nodes:
+                    if node.is_group:
+                        self._add_to_store(node.group, parent_iter)
+
+                    elif node.luks_open:
+                        self._add_to_store(node.luks, None)
+
+                    elif node.has_children:
+                        child_iter = self._add_to_store(node.device, parent_iter)
+                        _add_nodes(node.nodes, child_iter)
+
+                    else:
+                        self._add_to_store(node.device, parent_iter)
+
+        if selected_info.is_disk:
+            partitions = nodes[:len(childs.partitions)]
+            logicals = nodes[len(childs.partitions):]
+
+            with self._prefetched([node.device for node in nodes], ("is_extended",)):
+                for node in partitions:
+                    info = self._device_info(node.device)
+                    if node.is_group:
+                        self._add_to_store(node.group, None)
+
+                    elif node.is_luks and node.has_children:
+                        self._add_to_store(node.luks, None)
+
+                    else:
+                        child_iter = self._add_to_store(node.device)
+                        if hasattr(info, "is_extended") and info.is_extended:
+                            for logical in logicals:
+                                self._add_to_store(logical.group if logical.is_group else logical.device, child_iter)
 
         # lvmvg always has some children, at least a free space
-        elif selected_device.type == "lvmvg":
-            childs = self.blivet_gui.client.remote_call("get_children", selected_device)
-            _add_chilren(childs, None)
+        elif selected_info.type == "lvmvg":
+            _add_nodes(nodes, None)
 
         # for btrfs volumes and mdarrays its necessary to add the device itself to the view
         # because these devices don't need to have children (only btrfs volume or only mdarray
         # is a valid, usable device)
-        elif selected_device.type == "btrfs volume" or (selected_device.type == "mdarray" and not selected_device.children):
+        elif selected_info.type == "btrfs volume" or (selected_info.type == "mdarray" and not selected_info.children):
             parent_iter = self._add_to_store(selected_device)
-            childs = self.blivet_gui.client.remote_call("get_children", selected_device)
-            _add_chilren(childs, parent_iter)
+            _add_nodes(nodes, parent_iter)
 
         else:
-            childs = self.blivet_gui.client.remote_call("get_children", selected_device)
-            _add_chilren(childs, None)
+            _add_nodes(nodes, None)
 
         # select first line in partitions view
         self.select.select_path("0")
         # expand all expanders
         self.partitions_view.expand_all()
 
+    def _device_info(self, device):
+        """ Get local information about the device from the device snapshot
+            (or the device itself if it isn't part of the snapshot)
+        """
+
+        info = self.blivet_gui.device_snapshot.get(device)
+
+        return info if info is not None else device
+
+    @contextmanager
+    def _prefetched(self, devices, extra_params=()):
+        """ Prefetch params of devices that are not part of the device snapshot
+        """
+
+        missing = [device for device in devices if self.blivet_gui.device_snapshot.get(device) is None]
+
+        with self.blivet_gui.client.prefetch(missing, self._prefetch_params + extra_params):
+            yield
+
     def _is_group_device(self, blivet_device):
+        """ Is the device a member of a group device (shown instead of it)
+
+            ..note.: open LUKS devices are checked when the LUKS device is
+                     loaded (see :func:`_is_luks_group_device`)
+        """
+
+        info = self._device_info(blivet_device)
+
         # btrfs volume on raw disk
-        if blivet_device.type in ("btrfs volume", "lvmvg"):
+        if info.type in ("btrfs volume", "lvmvg"):
             return True
 
-        if blivet_device.format and blivet_device.format.type in ("lvmpv", "btrfs", "mdmember"):
-            return (len(blivet_device.children) > 0)
+        if info.format and info.format.type in ("lvmpv", "btrfs", "mdmember"):
+            return (len(info.children) > 0)
 
-        # encrypted group device
-        if blivet_device.format and blivet_device.format.type == "luks" and blivet_device.format.status:
-            luks_device = self.blivet_gui.client.remote_call("get_luks_device", blivet_device)
-            if luks_device.format and luks_device.format.type in ("lvmpv", "btrfs", "mdmember"):
-                return (len(luks_device.children) > 0)
+        return False
+
+    def _is_luks_group_device(self, luks_device):
+        """ Is the LUKS device (of an encrypted device) a member of a group device
+        """
+
+        luks_info = self._device_info(luks_device)
+
+        if luks_info.format and luks_info.format.type in ("lvmpv", "btrfs", "mdmember"):
+            return (len(luks_info.children) > 0)
 
         return False
 
@@ -137,15 +353,17 @@ class ListPartitions(object):
             :type parent_iter: Gtk.TreeIter or None
         """
 
-        devtype = "lvm" if device.type == "lvmvg" else "raid" if device.type == "mdarray" else device.type
-        name = device.name if len(device.name) < 18 else device.name[:15] + "..."  # FIXME
-        fmt = device.format.type if device.format else None
+        info = self._device_info(device)
+
+        devtype = "lvm" if info.type == "lvmvg" else "raid" if info.type == "mdarray" else info.type
+        name = info.name if len(info.name) < 18 else info.name[:15] + "..."  # FIXME
+        fmt = info.format.type if info.format else None
         if self.kickstart_mode:
-            mnt = device.format.mountpoint if (device.format and device.format.mountable) else None
+            mnt = info.format.mountpoint if (info.format and info.format.mountable) else None
         else:
-            mnt = device.format.system_mountpoint if (device.format and device.format.mountable) else None
+            mnt = info.format.system_mountpoint if (info.format and info.format.mountable) else None
 
-        device_iter = self.partitions_list.append(parent_iter, [device, name, devtype, fmt, str(device.size), mnt])
+        device_iter = self.partitions_list.append(parent_iter, [device, name, devtype, fmt, str(info.size), mnt])
 
         return device_iter
 
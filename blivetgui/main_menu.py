@@ -42,6 +42,12 @@ class MainMenu(object):
         menuitem_reload = self.blivet_gui.builder.get_object("menuitem_reload")
         menuitem_reload.connect("activate", self.blivet_gui.reload)
 
+        menuitem_reload_device = self.blivet_gui.builder.get_object("menuitem_reload_device")
+        menuitem_reload_device.connect("activate", self.blivet_gui.reload_device)
+
+        menuitem_decrypt_all = self.blivet_gui.builder.get_object("menuitem_decrypt_all")
+        menuitem_decrypt_all.connect("activate", self.blivet_gui.decrypt_all_devices)
+
         menuitem_actions = self.blivet_gui.builder.get_object("menuitem_actions")
         menuitem_actions.connect("activate", self.blivet_gui.show_actions)
 
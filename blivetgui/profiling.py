@@ -0,0 +1,317 @@
+# profiling.py
+# cProfile and tracemalloc support for blivet-gui and blivet-gui-daemon
+#
+# Copyright (C) 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Red Hat Author(s): Vojtech Trefny <vtrefny@redhat.com>
+#
+# ---------------------------------------------------------------------------- #
+
+import cProfile
+import itertools
+import os
+import pstats
+import threading
+import tempfile
+import time
+import tracemalloc
+
+from contextlib import contextmanager
+
+# ---------------------------------------------------------------------------- #
+
+
+class Profiler(object):
+    """ cProfile profiler for code running in multiple threads
+
+        Every thread has its own profile (profiles can be enabled and disabled
+        only in their thread), statistics from them are periodically merged
+        and written to '<directory>/<name>.pstats' (the file can be read using
+        the 'pstats' module while the program is running). Nothing is
+        profiled until the profiler is enabled.
+    """
+
+    # how often (in seconds) to write the statistics
+    interval = 60
+
+    def __init__(self):
+        self.directory = None
+        self.name = None
+        self.enabled = False
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # profiles of all threads, profiles enabled right now and statistics
+        # merged from them
+        self._profiles = []
+        self._running = set()
+        self._stats = None
+        self._last_dump = time.monotonic()
+
+    def enable(self, directory, name):
+        """ Start profiling
+
+            :param directory: directory for pstats files
+            :type directory: str
+            :param name: name of the program (e.g. 'blivet-gui')
+            :type name: str
+
+        """
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.name = name
+        self.enabled = True
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, self.name + ".pstats")
+
+    def _thread_profile(self):
+        profile = getattr(self._local, "profile", None)
+
+        if profile is None:
+            profile = cProfile.Profile()
+            self._local.profile = profile
+            self._local.last_collect = time.monotonic()
+
+            with self._lock:
+                self._profiles.append(profile)
+
+        return profile
+
+    @contextmanager
+    def profiled(self):
+        """ Profile the 'with' block (blocks can be nested)
+        """
+
+        if not self.enabled or getattr(self._local, "running", False):
+            yield
+            return
+
+        profile = self._thread_profile()
+
+        self._set_running(profile, True)
+        profile.enable()
+
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._set_running(profile, False)
+
+            if time.monotonic() - self._local.last_collect >= self.interval:
+                self._collect(profile)
+                self._local.last_collect = time.monotonic()
+
+    def _set_running(self, profile, running):
+        self._local.running = running
+
+        with self._lock:
+            if running:
+                self._running.add(profile)
+            else:
+                self._running.discard(profile)
+
+    @contextmanager
+    def paused(self):
+        """ Don't profile the 'with' block (only one profile can be enabled
+            in a thread at the same time)
+        """
+
+        running = getattr(self._local, "running", False)
+
+        if not running:
+            yield
+            return
+
+        profile = self._thread_profile()
+
+        profile.disable()
+        try:
+            yield
+        finally:
+            profile.enable()
+
+    def checkpoint(self):
+        """ Collect statistics of the current thread (even if it is being
+            profiled right now) and write the statistics if it is the time
+
+            ..note.: needed for blocks running for a long time (main loop)
+
+        """
+
+        if not self.enabled:
+            return
+
+        profile = self._thread_profile()
+        running = getattr(self._local, "running", False)
+
+        if running:
+            profile.disable()
+
+        self._collect(profile)
+
+        if running:
+            profile.enable()
+
+    def _collect(self, profile):
+        """ Merge statistics from the (disabled) profile and write them if
+            'interval' passed since the last write
+        """
+
+        with self._lock:
+            profile.create_stats()
+            if profile.stats:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+            profile.clear()
+
+            if time.monotonic() - self._last_dump >= self.interval:
+                self._dump()
+
+    def _dump(self):
+        if self._stats is None:
+            return
+
+        # write to a temporary file first, readers never see a partial file
+        tmp_path = self.path + ".tmp"
+        self._stats.dump_stats(tmp_path)
+        os.replace(tmp_path, self.path)
+
+        self._last_dump = time.monotonic()
+
+    def close(self):
+        """ Collect statistics from all threads and write them
+
+            ..note.: profiles still running in other threads are skipped
+
+        """
+
+        if not self.enabled:
+            return
+
+        with self._lock:
+            profiles = [profile for profile in self._profiles if profile not in self._running]
+
+        for profile in profiles:
+            self._collect(profile)
+
+        with self._lock:
+            self._dump()
+
+
+class RequestProfiler(object):
+    """ Profiles of single calls of selected methods (e.g. BlivetUtils
+        methods called by the client), every call is written to its own
+        '<directory>/<method>-<number>.pstats' file
+    """
+
+    def __init__(self, thread_profiler):
+        """
+
+        :param thread_profiler: profiler paused while the methods are profiled
+        :type thread_profiler: :class:`Profiler`
+
+        """
+
+        self.thread_profiler = thread_profiler
+
+        # temporary directory is created if no directory is set
+        self.directory = None
+        self.methods = set()
+
+        self._counter = itertools.count(1)
+
+    def set_methods(self, methods, enabled):
+        """ Start or stop profiling of the methods
+
+            :param methods: names of the methods
+            :type methods: list of str
+            :param enabled: start (True) or stop (False) profiling
+            :type enabled: bool
+            :returns: currently profiled methods and directory for the profiles
+            :rtype: tuple of (list of str, str)
+
+        """
+
+        if enabled:
+            self.methods |= set(methods)
+            if self.directory is None:
+                self.directory = tempfile.mkdtemp(prefix="blivet-gui-profile-")
+        else:
+            self.methods -= set(methods)
+
+        return (sorted(self.methods), self.directory)
+
+    @contextmanager
+    def profiled(self, method):
+        """ Profile the 'with' block if the method is profiled
+        """
+
+        if method not in self.methods:
+            yield
+            return
+
+        with self.thread_profiler.paused():
+            profile = cProfile.Profile()
+            profile.enable()
+
+            try:
+                yield
+            finally:
+                profile.disable()
+                profile.dump_stats(os.path.join(self.directory, "%s-%d.pstats" % (method, next(self._counter))))
+
+
+def memory_report(limit=10, include=("*/blivet/*", "*/blivetgui/*")):
+    """ Top allocators from tracemalloc snapshot
+
+        Tracing is started if it isn't running already (then the report
+        contains only allocations since now).
+
+        :param limit: number of allocators to report
+        :type limit: int
+        :param include: patterns of files for the second (filtered) report
+        :type include: tuple of str
+        :returns: whether tracing was already running, top allocators in all
+                  files and top allocators in files matching 'include'
+        :rtype: tuple of (bool, list of str, list of str)
+
+    """
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        return (False, [], [])
+
+    snapshot = tracemalloc.take_snapshot()
+    filtered = snapshot.filter_traces([tracemalloc.Filter(True, pattern) for pattern in include])
+
+    top = [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+    top_filtered = [str(stat) for stat in filtered.statistics("lineno")[:limit]]
+
+    return (True, top, top_filtered)
+
+# ---------------------------------------------------------------------------- #
+
+
+# profiler and profiler of selected methods of the current process
+profiler = Profiler()
+request_profiler = RequestProfiler(profiler)
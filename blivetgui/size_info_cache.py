@@ -0,0 +1,219 @@
+# size_info_cache.py
+# Persistent cache of filesystem size information
+#
+# Copyright (C) 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Red Hat Author(s): Vojtech Trefny <vtrefny@redhat.com>
+#
+# ---------------------------------------------------------------------------- #
+
+import json
+import os
+import struct
+import tempfile
+import threading
+
+from collections import OrderedDict
+
+from blivet.size import Size
+
+# ---------------------------------------------------------------------------- #
+
+CACHE_DIR = "/var/cache/blivet-gui"
+
+# ext2/3/4 superblock (at offset 1024): free blocks, free inodes, last mount
+# time, last write time, mount count, magic and state
+EXT_SUPERBLOCK = struct.Struct("<12xII24xIIH2xHH")
+EXT_MAGIC = 0xEF53
+
+
+def ext_marker(fmt):
+    """ Values from ext superblock changed by every mount or write of the fs
+    """
+
+    with open(fmt.device, "rb") as dev:
+        dev.seek(1024)
+        data = dev.read(EXT_SUPERBLOCK.size)
+
+    if len(data) < EXT_SUPERBLOCK.size:
+        return None
+
+    free_blocks, free_inodes, mtime, wtime, mnt_count, magic, state = EXT_SUPERBLOCK.unpack(data)
+
+    if magic != EXT_MAGIC:
+        return None
+
+    return [free_blocks, free_inodes, mtime, wtime, mnt_count, state]
+
+
+# format type -> function returning "marker" of the filesystem; marker must
+# change whenever the filesystem is changed, formats without it aren't cached
+MARKERS = {"ext2": ext_marker,
+           "ext3": ext_marker,
+           "ext4": ext_marker}
+
+
+class SizeInfoCache(object):
+    """ Cache of results of 'update_size_info' for filesystems
+
+        Results are stored on disk (so they are available after restart) for
+        filesystem UUID and validated using the filesystem size and marker
+        read directly from the filesystem (see :data:`MARKERS`). Only the
+        least recently used 'max_entries' entries are kept.
+
+        Only formats with a marker (see :func:`supported`) are cached, there
+        is no safe way to tell whether other filesystems were changed.
+
+        ..note.: mounted filesystems are never cached -- they can change at
+                 any time
+    """
+
+    # attributes of the format set by update_size_info
+    attrs = ("_min_instance_size", "_resizable")
+
+    def __init__(self, path=None, max_entries=256):
+        """
+
+        :param path: cache file (None to use the default one)
+        :type path: str
+        :param max_entries: maximum number of cached filesystems
+        :type max_entries: int
+
+        """
+
+        self.path = path or os.path.join(CACHE_DIR, "size_info.json")
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as cache_file:
+                return OrderedDict(json.load(cache_file, object_pairs_hook=OrderedDict))
+        except (OSError, ValueError):
+            return OrderedDict()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(self._entries, tmp_file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def supported(fmt):
+        """ Can size information of the format be cached
+
+            :param fmt: format
+            :type fmt: blivet.formats.DeviceFormat
+            :rtype: bool
+
+        """
+
+        return fmt.type in MARKERS.keys()
+
+    def _entry_key(self, fmt):
+        """ Key and validation data for the format or (None, None) if the format
+            can't be cached
+        """
+
+        uuid = getattr(fmt, "uuid", None)
+        if not uuid or not self.supported(fmt) or fmt.status:
+            return (None, None)
+
+        try:
+            marker = MARKERS[fmt.type](fmt)
+        except OSError:
+            return (None, None)
+
+        if marker is None:
+            return (None, None)
+
+        return (fmt.type + ":" + uuid, [int(fmt.size), marker])
+
+    def apply(self, fmt):
+        """ Set size information of the format from the cache
+
+            :returns: whether the information was found in the cache
+            :rtype: bool
+
+        """
+
+        key, validation = self._entry_key(fmt)
+        if key is None:
+            return False
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry["validation"] != validation:
+                return False
+
+            # recently used entries are kept when the cache is full, the
+            # order has to survive restart too
+            if next(reversed(self._entries)) != key:
+                self._entries.move_to_end(key)
+                self._save()
+
+        for attr in self.attrs:
+            if attr in entry["values"].keys():
+                value = entry["values"][attr]
+                setattr(fmt, attr, Size(value) if attr == "_min_instance_size" else value)
+
+        return True
+
+    def store(self, fmt):
+        """ Save size information of the format to the cache
+        """
+
+        key, validation = self._entry_key(fmt)
+        if key is None:
+            return
+
+        values = {}
+        for attr in self.attrs:
+            if hasattr(fmt, attr):
+                value = getattr(fmt, attr)
+                values[attr] = int(value) if attr == "_min_instance_size" else value
+
+        with self._lock:
+            self._entries[key] = {"validation": validation, "values": values}
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            self._save()
+
+    def invalidate(self, uuids):
+        """ Remove cached information for filesystems with given UUIDs
+        """
+
+        uuids = set(uuid for uuid in uuids if uuid)
+
+        with self._lock:
+            keys = [key for key in self._entries.keys() if key.split(":", 1)[1] in uuids]
+            for key in keys:
+                del self._entries[key]
+
+            if keys:
+                self._save()
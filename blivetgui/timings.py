@@ -0,0 +1,135 @@
+# timings.py
+# Timestamps of startup phases
+#
+# Copyright (C) 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Red Hat Author(s): Vojtech Trefny <vtrefny@redhat.com>
+#
+# ---------------------------------------------------------------------------- #
+
+import json
+import threading
+import time
+
+from contextlib import contextmanager
+
+# ---------------------------------------------------------------------------- #
+
+
+class Timeline(object):
+    """ Start and end times of named phases (e.g. 'storage.reset()')
+
+        Times are taken from the monotonic clock, so timelines from
+        blivet-gui and blivet-gui-daemon running on the same host can be
+        compared. Nothing is recorded until the timeline is enabled.
+    """
+
+    def __init__(self):
+        self.component = None
+        self.enabled = False
+
+        self._lock = threading.Lock()
+        self._phases = []
+
+    def enable(self, component):
+        """ Start recording phases
+
+            :param component: name of the program (e.g. 'blivet-gui')
+            :type component: str
+
+        """
+
+        self.component = component
+        self.enabled = True
+
+    def add(self, name, start, end=None):
+        """ Record a phase
+
+            :param name: name of the phase
+            :type name: str
+            :param start: start of the phase (time.monotonic)
+            :type start: float
+            :param end: end of the phase (None for phases without duration)
+            :type end: float
+
+        """
+
+        if not self.enabled:
+            return
+
+        if end is None:
+            end = start
+
+        with self._lock:
+            self._phases.append({"component": self.component, "phase": name, "start": start, "end": end,
+                                 "duration": end - start})
+
+    def mark(self, name):
+        """ Record an event without duration (e.g. 'first paint')
+        """
+
+        self.add(name, time.monotonic())
+
+    @contextmanager
+    def phase(self, name):
+        """ Record the 'with' block as a phase
+        """
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.monotonic())
+
+    @property
+    def phases(self):
+        """ Recorded phases
+
+            :rtype: list of dict
+
+        """
+
+        with self._lock:
+            return [dict(phase) for phase in self._phases]
+
+    def log(self, logger):
+        """ Write recorded phases to the log
+        """
+
+        for phase in self.phases:
+            logger.info("timing: %s: %s %.3f s (%.3f - %.3f)", phase["component"], phase["phase"],
+                        phase["duration"], phase["start"], phase["end"])
+
+    def to_json(self, other_phases=None):
+        """ Recorded phases (together with phases from other timeline, e.g.
+            received from the daemon) as JSON sorted by their start
+
+            :param other_phases: phases from other timeline
+            :type other_phases: list of dict
+            :rtype: str
+
+        """
+
+        phases = sorted(self.phases + list(other_phases or []), key=lambda phase: phase["start"])
+
+        return json.dumps({"clock": "monotonic", "timeline": phases}, indent=2, sort_keys=True)
+
+# ---------------------------------------------------------------------------- #
+
+
+# timeline of the current process
+timeline = Timeline()
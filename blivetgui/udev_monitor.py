@@ -0,0 +1,196 @@
+# udev_monitor.py
+# Monitoring of udev events for block devices
+#
+# Copyright (C) 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+# Red Hat Author(s): Vojtech Trefny <vtrefny@redhat.com>
+#
+# ---------------------------------------------------------------------------- #
+
+import threading
+import time
+
+from collections import OrderedDict
+
+# ---------------------------------------------------------------------------- #
+
+
+class UdevMonitor(object):
+    """ Thread receiving udev events for block devices
+
+        Events are not reported one by one -- they are collected until no new
+        event arrives for 'debounce' seconds (or until 'max_delay' seconds
+        passed since the first one) and the callback is then called with the
+        whole batch. Only the last event for every device is reported, so
+        a burst of events (e.g. multipath bringing up hundreds of paths)
+        results in one update of the device tree.
+
+        Events can be suppressed (see :func:`suppress`) while the daemon
+        itself changes the devices -- these changes are already in the device
+        tree and reporting them would only cause another rescan.
+    """
+
+    # seconds without new events before the batch is reported
+    debounce = 0.5
+
+    # maximum seconds between the first event and reporting the batch
+    max_delay = 5
+
+    # how often (in seconds) to check whether the monitor was stopped
+    poll_interval = 1
+
+    def __init__(self, callback, monitor=None):
+        """
+
+        :param callback: function called with list of (action, sysfs path)
+                         tuples for every batch of events
+        :type callback: func
+        :param monitor: udev monitor (None to create netlink monitor for
+                        block devices)
+        :type monitor: pyudev.Monitor
+        :raises ImportError: pyudev is not available
+        :raises OSError: failed to create the netlink monitor
+
+        """
+
+        self.callback = callback
+
+        if monitor is None:
+            # pyudev is optional -- daemon works without it, only the device
+            # tree isn't updated automatically
+            import pyudev
+
+            monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+            monitor.filter_by("block")
+        self.monitor = monitor
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._lock = threading.Lock()
+        # number of running operations with suppressed events
+        self._suppressed = 0
+        # suppressed operations finished since the events were last checked
+        self._resumed = False
+
+    def start(self):
+        """ Start receiving events
+        """
+
+        self.monitor.start()
+
+        self._thread = threading.Thread(target=self._run, name="blivet-gui-udev-monitor")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """ Stop receiving events and wait for the thread to finish
+        """
+
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def suppress(self):
+        """ Ignore all events until :func:`resume` is called
+
+            ..note.: calls can be nested, events are reported again after
+                     the last :func:`resume`
+        """
+
+        with self._lock:
+            self._suppressed += 1
+
+    def resume(self):
+        """ Report events again, events received (but not yet read) before
+            this call are dropped
+        """
+
+        with self._lock:
+            self._suppressed -= 1
+            if self._suppressed == 0:
+                self._resumed = True
+
+    def _drop_suppressed(self):
+        """ Drop events caused by suppressed operations
+
+            :returns: whether the last received event should be dropped
+            :rtype: bool
+
+        """
+
+        with self._lock:
+            if self._suppressed:
+                return True
+
+            if not self._resumed:
+                return False
+
+            self._resumed = False
+
+        # events generated during the operation can still wait in the queue
+        while self.monitor.poll(0) is not None:
+            pass
+
+        return True
+
+    def _run(self):
+        while not self._stopped.is_set():
+            events = self._collect_events()
+
+            if events:
+                self.callback(events)
+
+    def _collect_events(self):
+        """ Wait for a batch of events
+
+            :returns: (action, sysfs path) for every device with an event
+            :rtype: list of tuple
+
+        """
+
+        # sysfs path -> last action
+        events = OrderedDict()
+        first_event = None
+
+        while not self._stopped.is_set():
+            if first_event is None:
+                timeout = self.poll_interval
+            else:
+                timeout = min(self.debounce, first_event + self.max_delay - time.monotonic())
+                if timeout <= 0:
+                    break
+
+            device = self.monitor.poll(timeout)
+
+            if self._drop_suppressed():
+                continue
+
+            if device is None:
+                if first_event is None:
+                    continue
+                break
+
+            if first_event is None:
+                first_event = time.monotonic()
+
+            events.pop(device.sys_path, None)
+            events[device.sys_path] = device.action
+
+        return [(action, sys_path) for sys_path, action in events.items()]
@@ -34,6 +34,10 @@ from .rectangle import Rectangle
 
 RECT_MIN_SIZE = 100
 
+# device params used by rectangles, fetched from the server at once
+RECT_DEVICE_PARAMS = ("name", "size", "type", "children", "parents", "protected",
+                      "format.type", "format.exists")
+
 # ---------------------------------------------------------------------------- #
 
 
@@ -55,16 +59,24 @@ class LogicalView(object):
     def visualize_devices(self, devices_list):
         self._devices_list = devices_list
 
-        self._view_width = self.hbox.get_parent().get_allocation().width
-        rect_widths = self._compute_rect_widths()
+        devices = []
+        devices_list.foreach(lambda model, _path, treeiter, devs: devs.append(model[treeiter][0]), devices)
 
-        self._clear()
-        root_iter = devices_list.get_iter_first()
+        # only devices missing in the device snapshot (e.g. free space) need
+        # to be fetched from the server
+        missing = [device for device in devices if self.blivet_gui.device_snapshot.get(device) is None]
 
-        if not root_iter:
-            return
+        with self.blivet_gui.client.prefetch(missing, RECT_DEVICE_PARAMS):
+            self._view_width = self.hbox.get_parent().get_allocation().width
+            rect_widths = self._compute_rect_widths()
+
+            self._clear()
+            root_iter = devices_list.get_iter_first()
 
-        self._visualization_loop(rect_widths, root_iter, self.hbox)
+            if not root_iter:
+                return
+
+            self._visualization_loop(rect_widths, root_iter, self.hbox)
 
         self.select_rectanlge(devices_list[root_iter][0])
         self.hbox.show_all()
@@ -191,7 +203,7 @@ class LogicalView(object):
 
         while treeiter:
             device = self._devices_list[treeiter][0]
-            extra_space = int(remaining_space * (device.size.convert_to() / total_size))
+            extra_space = int(remaining_space * (self._device_info(device).size.convert_to() / total_size))
             width_dict[device] += extra_space
             allocated_width += extra_space
 
@@ -215,15 +227,21 @@ class LogicalView(object):
 
         total_size = 0
         while treeiter:
-            total_size += self._devices_list[treeiter][0].size.convert_to()
+            total_size += self._device_info(self._devices_list[treeiter][0]).size.convert_to()
             treeiter = self._devices_list.iter_next(treeiter)
 
         return total_size
 
+    def _device_info(self, device):
+        info = self.blivet_gui.device_snapshot.get(device)
+
+        return info if info is not None else device
+
     def _new_rectangle(self, device, rtype="", width=-1, height=-1):
         button_group = self.rectangles[0] if self.rectangles else None
 
-        rect = Rectangle(rtype, button_group, width, height, device)
+        rect = Rectangle(rtype, button_group, width, height, device,
+                         info=self.blivet_gui.device_snapshot.get(device))
         rect.connect("toggled", self._on_rectangle_toggle)
         rect.connect("button-release-event", self._on_button_release)
         rect.connect("button-press-event", self._on_button_press)
@@ -262,5 +280,5 @@ class LogicalView(object):
 
     def _on_button_press(self, button, event):
         if event.type == Gdk.EventType._2BUTTON_PRESS:
-            if button.device.is_disk or button.device.type in ("lvmvg", "btrfs volume", "mdarray"):
+            if button.info.is_disk or button.info.type in ("lvmvg", "btrfs volume", "mdarray"):
                 self.blivet_gui.switch_device_view(button.device)
@@ -142,7 +142,7 @@ class PhysicalView(object):
 
         while treeiter:
             device = self._devices_list[treeiter][0]
-            extra_space = int(remaining_space * (device.size.convert_to() / total_size))
+            extra_space = int(remaining_space * (self._device_info(device).size.convert_to() / total_size))
             width_dict[device] += extra_space
             allocated_width += extra_space
 
@@ -164,7 +164,7 @@ class PhysicalView(object):
 
         total_size = 0
         while treeiter:
-            total_size += self._devices_list[treeiter][0].size.convert_to()
+            total_size += self._device_info(self._devices_list[treeiter][0]).size.convert_to()
             treeiter = self._devices_list.iter_next(treeiter)
 
         return total_size
@@ -180,11 +180,17 @@ class PhysicalView(object):
             box.destroy()
         self.boxes = []
 
+    def _device_info(self, device):
+        info = self.blivet_gui.device_snapshot.get(device)
+
+        return info if info is not None else device
+
     def _new_rectangle(self, device, rtype="", width=90, height=90):
         # no labels for 'invalid rectangles' in physical view
         label = not rtype.startswith("child-invalid-")
 
-        rect = Rectangle(rtype, None, width, height, device, label)
+        rect = Rectangle(rtype, None, width, height, device, label,
+                         info=self.blivet_gui.device_snapshot.get(device))
         rect.connect("button-press-event", self._on_button_press)
         self.rectangles.append(rect)
 
@@ -203,5 +209,5 @@ class PhysicalView(object):
 
     def _on_button_press(self, button, event):
         if event.type == Gdk.EventType._2BUTTON_PRESS:
-            if button.device.is_disk or button.device.type in ("lvmvg", "btrfs volume", "mdarray"):
+            if button.info.is_disk or button.info.type in ("lvmvg", "btrfs volume", "mdarray"):
                 self.blivet_gui.switch_device_view(button.device)
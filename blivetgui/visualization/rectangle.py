@@ -33,11 +33,14 @@ class Rectangle(Gtk.RadioButton):
 
     __gtype_name__ = "Rectangle"
 
-    def __init__(self, rtype, group, width, height, device, label=True):
+    def __init__(self, rtype, group, width, height, device, label=True, info=None):
         self.width = width
         self.height = height
 
         self.device = device
+        # local information about the device used for the label and icons,
+        # see :class:`~.device_snapshot.DeviceSnapshot`
+        self.info = info if info is not None else device
 
         Gtk.RadioButton.__init__(self, group=group, width_request=width, height_request=height)
 
@@ -49,7 +52,7 @@ class Rectangle(Gtk.RadioButton):
 
         if label:
             label_device = Gtk.Label(justify=Gtk.Justification.CENTER,
-                                     label="<small>%s\n%s</small>" % (self.device.name, str(self.device.size)),
+                                     label="<small>%s\n%s</small>" % (self.info.name, str(self.info.size)),
                                      use_markup=True, name="dark")
 
             hbox.pack_start(child=label_device, expand=True, fill=True, padding=0)
@@ -80,26 +83,26 @@ class Rectangle(Gtk.RadioButton):
 
     def _get_device_properties(self):
         properties = []
-        if self.device.type in ("lvmvg", "btrfs volume", "mdarray"):
+        if self.info.type in ("lvmvg", "btrfs volume", "mdarray"):
             properties.append("group")
-        if self.device.format and self.device.format.type in ("iso9660", "udf"):
+        if self.info.format and self.info.format.type in ("iso9660", "udf"):
             properties.append("livecd")
-        if self.device.type == "partition" and self.device.format.type == "luks":
-            if self.device.children:
+        if self.info.type == "partition" and self.info.format.type == "luks":
+            if self.info.children:
                 properties.append("decrypted")
             else:
                 properties.append("encrypted")
-        if self.device.type == "luks/dm-crypt" or any(parent.type == "luks/dm-crypt" for parent in self.device.parents):
+        if self.info.type == "luks/dm-crypt" or any(parent.type == "luks/dm-crypt" for parent in self.info.parents):
             properties.append("decrypted")
-        if self.device.type in ("lvmsnapshot", "btrfs snapshot"):
+        if self.info.type in ("lvmsnapshot", "btrfs snapshot"):
             properties.append("snapshot")
-        if self.device.type == "free space" or (self.device.format and self.device.format.type == "lvmpv"
-                                                and not self.device.children):
+        if self.info.type == "free space" or (self.info.format and self.info.format.type == "lvmpv"
+                                              and not self.info.children):
             properties.append("empty")
-        if self.device.type == "free space" and self.device.is_uninitialized_disk:
+        if self.info.type == "free space" and self.info.is_uninitialized_disk:
             properties.append("nodisklabel")
 
-        if self.device.format.exists and self.device.protected:
+        if self.info.format.exists and self.info.protected:
             properties.append("protected")
 
         return properties
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+""" Compare encode/decode throughput of the message codecs
+
+    Run with 'make benchmark' or 'PYTHONPATH=. python3 tests/benchmarks/codec_benchmark.py'.
+"""
+
+import timeit
+
+from blivetgui.communication.codec import PickleCodec, BinaryCodec
+from blivetgui.communication.proxy_utils import ProxyID, ProxyDataContainer
+
+from blivet.size import Size
+
+
+def _device_info(dev_id):
+    fmt = ProxyDataContainer(type="ext4", exists=True, status=False, mountable=True,
+                             mountpoint=None, system_mountpoint="/mnt/data%d" % dev_id, label=None)
+    return ProxyDataContainer(device=ProxyID(), id=dev_id, name="sda%d" % dev_id, type="partition",
+                              size=Size("10 GiB"), exists=True, protected=False, isleaf=True,
+                              is_disk=False, removable=False, model=None, format=fmt,
+                              parents=[0], children=[], disk=0, start=2048, end=20973567,
+                              is_extended=False, is_logical=False, is_primary=True)
+
+
+MESSAGES = {"param request": ("secret", "param", ProxyID(), "name"),
+            "param answer": "sda1",
+            "call answer": ProxyDataContainer(success=True, answer=[ProxyID() for _i in range(10)]),
+            "multi answer (100)": ["sda%d" % i for i in range(50)] + [Size("%d MiB" % i) for i in range(50)],
+            "snapshot (500 devices)": ProxyDataContainer(devices=[_device_info(i) for i in range(500)],
+                                                         disks=[0], lvm=[], raid=[], btrfs=[])}
+
+
+def _bench(func, arg, min_time=0.2):
+    number = 1
+    while True:
+        elapsed = timeit.timeit(lambda: func(arg), number=number)
+        if elapsed >= min_time:
+            return number / elapsed
+        number *= 2
+
+
+def main():
+    codecs = (PickleCodec(), BinaryCodec())
+
+    print("%-24s %-12s %8s %14s %14s" % ("message", "codec", "bytes", "encode [op/s]", "decode [op/s]"))
+
+    for name, msg in MESSAGES.items():
+        for codec in codecs:
+            data = codec.encode(msg)
+            print("%-24s %-12s %8d %14.0f %14.0f" % (name, type(codec).__name__, len(data),
+                                                     _bench(codec.encode, msg),
+                                                     _bench(codec.decode, data)))
+
+
+if __name__ == "__main__":
+    main()
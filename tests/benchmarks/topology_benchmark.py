@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+""" Measure how BlivetUtils and the views scale with the size of the device
+    tree (synthetic device trees, see tests/blivetgui_tests/topology.py)
+
+    Run with 'make benchmark' or 'PYTHONPATH=.:tests/ python3 tests/benchmarks/topology_benchmark.py'.
+"""
+
+import time
+
+from unittest.mock import MagicMock, patch
+
+from blivetgui.device_snapshot import DeviceSnapshot
+from blivetgui.list_partitions import ListPartitions
+from blivetgui.visualization.logical_view import LogicalView
+
+from blivetgui_tests.topology import StubBlivetUtils, generate_topology, stub_blivet_gui
+
+SCALES = (10, 100, 1000, 10000)
+
+
+def _timed(func):
+    start = time.monotonic()
+    func()
+    return (time.monotonic() - start) * 1000
+
+
+def _load_views(storage, utils):
+    blivet_gui = stub_blivet_gui(utils)
+    list_partitions = ListPartitions(blivet_gui)
+
+    with patch("blivetgui.visualization.logical_view.Gtk", MagicMock()):
+        logical_view = LogicalView(blivet_gui)
+    logical_view._view_width = 1920
+
+    # the same as selecting every disk and group device in the device list
+    for device in storage.disks + storage.vgs + storage.mdarrays + storage.btrfs_volumes:
+        if device.is_disk:
+            children = utils.get_disk_children(device)
+        else:
+            children = utils.get_children(device)
+
+        list_partitions.partitions_list.clear()
+        list_partitions._load_children(device, device, children)
+
+        logical_view._devices_list = list_partitions.partitions_list
+        logical_view._compute_rect_widths()
+
+
+def main():
+    print("%8s %8s %10s %14s %14s %10s %12s %10s" % ("devices", "disks", "build [ms]", "snapshot [ms]",
+                                                     "disk ch. [ms]", "roots [ms]", "views [ms]", "LVs/VG"))
+
+    for scale in SCALES:
+        build_time = _timed(lambda: generate_topology(scale))
+        storage = generate_topology(scale)
+        utils = StubBlivetUtils(storage)
+        groups = storage.vgs + storage.mdarrays + storage.btrfs_volumes + storage.luks_devices
+
+        snapshot_time = _timed(lambda: DeviceSnapshot(utils.get_devicetree_snapshot()))
+        children_time = _timed(lambda: [utils.get_disk_children(disk) for disk in storage.disks])
+        roots_time = _timed(lambda: [utils.get_roots(device) for device in groups])
+        views_time = _timed(lambda: _load_views(storage, utils))
+
+        print("%8d %8d %10.1f %14.1f %14.1f %10.1f %12.1f %10d" % (len(storage.devices), len(storage.disks),
+                                                                   build_time, snapshot_time, children_time,
+                                                                   roots_time, views_time,
+                                                                   len(storage.vgs[0].lvs)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+""" Compare the old (recv + concatenation, sendall of joined data) and the new
+    (recv_into preallocated buffer, sendmsg) way of transferring messages
+
+    Run with 'make benchmark' or 'PYTHONPATH=. python3 tests/benchmarks/transport_benchmark.py'.
+"""
+
+import socket
+import struct
+import threading
+import time
+
+from blivetgui.communication import socket_utils
+
+SIZES = (1024, 64 * 1024, 1024 * 1024, 10 * 1024 * 1024, 50 * 1024 * 1024)
+
+
+def _old_send(sock, data):
+    sock.sendall(struct.pack(">I", len(data)) + data)
+
+
+def _old_recv_data(sock, length):
+    data = b""
+    while len(data) < length:
+        packet = sock.recv(length - len(data))
+        if not packet:
+            return None
+        data += packet
+    return data
+
+
+def _old_recv(sock):
+    raw_msglen = _old_recv_data(sock, 4)
+    return _old_recv_data(sock, struct.unpack(">I", raw_msglen)[0])
+
+
+def _new_send(sock, data):
+    socket_utils.sendmsg_all(sock, socket_utils.msg_buffers(data))
+
+
+def _new_recv(sock):
+    return socket_utils.recv_msg(sock)
+
+
+def _bench(send, recv, data, min_time=0.5):
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    count = 0
+    start = time.perf_counter()
+
+    try:
+        while time.perf_counter() - start < min_time:
+            thread = threading.Thread(target=send, args=(sender, data))
+            thread.start()
+            recv(receiver)
+            thread.join()
+            count += 1
+    finally:
+        sender.close()
+        receiver.close()
+
+    elapsed = time.perf_counter() - start
+    return count / elapsed, len(data) * count / elapsed / 1024**2
+
+
+def main():
+    print("%-10s %-6s %12s %12s" % ("size", "path", "msg/s", "MiB/s"))
+
+    for size in SIZES:
+        data = b"x" * size
+        for name, send, recv in (("old", _old_send, _old_recv), ("new", _new_send, _new_recv)):
+            msgs, mib = _bench(send, recv, data)
+            print("%-10d %-6s %12.1f %12.1f" % (size, name, msgs, mib))
+
+
+if __name__ == "__main__":
+    main()
@@ -885,6 +885,63 @@ class AddDialogTest(unittest.TestCase):
         self.assertIsNone(selection.btrfs_type)
         self.assertIsNone(selection.raid_level)
 
+    @patch("blivetgui.dialogs.add_dialog.AddDialog.set_transient_for", lambda dialog, window: True)
+    def test_repeat_selection(self):
+        parent_device1 = self._get_parent_device()
+        parent_device2 = self._get_parent_device(name="vdb")
+        free_device1 = self._get_free_device(parent=parent_device1)
+        free_device2 = self._get_free_device(parent=parent_device2)
+
+        add_dialog = AddDialog(self.parent_window, "disk", parent_device1, free_device1, [],
+                               [free_device1, free_device2], self.supported_raids, self.supported_fs, [])
+
+        add_dialog.devices_combo.set_active_id("partition")
+        self.assertTrue(add_dialog.repeat_check.get_visible())
+        self.assertEqual(len(add_dialog.parents_store), 1)
+
+        # all free regions are available, selected one is selected
+        add_dialog.repeat_check.set_active(True)
+        self.assertEqual(len(add_dialog.parents_store), 2)
+        self.assertTrue(add_dialog.parents_store[0][3])
+        self.assertFalse(add_dialog.parents_store[1][3])
+
+        add_dialog.on_cell_toggled(None, 1)
+        self.assertEqual(len(add_dialog.size_areas), 2)
+
+        size1 = Size("1 GiB")
+        size2 = Size("2 GiB")
+        add_dialog.filesystems_combo.set_active_id("xfs")
+        add_dialog.size_areas[0][0].selected_size = size1
+        add_dialog.size_areas[1][0].selected_size = size2
+
+        # one selection for every free region
+        selection = add_dialog.get_selection()
+        self.assertEqual(len(selection), 2)
+        self.assertEqual(selection[0].device_type, "partition")
+        self.assertEqual(selection[0].filesystem, "xfs")
+        self.assertEqual(selection[0].size, size1)
+        self.assertEqual(selection[0].parents, [[parent_device1, size1]])
+        self.assertEqual(selection[1].filesystem, "xfs")
+        self.assertEqual(selection[1].size, size2)
+        self.assertEqual(selection[1].parents, [[parent_device2, size2]])
+
+        # every selection is validated, not only the first one
+        with patch("blivetgui.dialogs.message_dialogs.ErrorDialog", self.error_dialog):
+            self.assertTrue(add_dialog.validate_user_input())
+            self.assertFalse(self.error_dialog.called)
+
+            selection[1].encrypt = True
+            selection[1].passphrase = None
+            with patch.object(add_dialog, "get_selection", return_value=selection):
+                self.assertFalse(add_dialog.validate_user_input())
+            self.error_dialog.assert_any_call(add_dialog, _("Passphrase not specified."))
+            self.error_dialog.reset_mock()
+
+        # repeat mode is not available for other device types
+        add_dialog.devices_combo.set_active_id("lvm")
+        self.assertFalse(add_dialog.repeat_check.get_visible())
+        self.assertFalse(add_dialog.repeat_check.get_active())
+
     @patch("blivetgui.dialogs.add_dialog.AddDialog.set_transient_for", lambda dialog, window: True)
     def test_lvm_selection(self):
         parent_device1 = self._get_parent_device()
@@ -3,32 +3,81 @@
 import unittest
 from unittest.mock import MagicMock, patch
 
-from blivetgui.communication.client import BlivetGUIClient, ClientProxyObject
+import gc
+import socket
+import threading
+
+from blivetgui.communication.client import BlivetGUIClient, ClientProxyObject, client_stats
 from blivetgui.communication.proxy_utils import ProxyID, ProxyDataContainer
+from blivetgui.communication import socket_utils
 
 from blivet.size import Size
 
 
 class BlivetGUIClientTest(unittest.TestCase):
 
+    def _client(self):
+        # the client is not connected, tests replace the socket if needed
+        with patch("blivetgui.communication.client.socket.socket"):
+            client = BlivetGUIClient(MagicMock(), "blivet-gui.sock", "secret")
+
+        return client
+
     def test_convert_answer(self):
+        client = self._client()
+
         # string (shouldn't be converted at all)
         msg = "abcdef"
-        converted_answer = BlivetGUIClient._answer_convertTo_object(MagicMock(), msg)
+        converted_answer = client._answer_convertTo_object(msg)
         self.assertEqual(msg, converted_answer)
 
         # blivet.size.Size (is picklable too)
         msg = Size("8 GiB")
-        converted_answer = BlivetGUIClient._answer_convertTo_object(MagicMock(), msg)
+        converted_answer = client._answer_convertTo_object(msg)
         self.assertEqual(msg, converted_answer)
 
         # ProxyID object
-        test_dict = {}
         msg = ProxyID()
-        converted_answer = BlivetGUIClient._answer_convertTo_object(MagicMock(id_dict=test_dict), msg)
+        converted_answer = client._answer_convertTo_object(msg)
         self.assertTrue(isinstance(converted_answer, ClientProxyObject))
         self.assertEqual(converted_answer.proxy_id, msg)  # pylint: disable=no-member
 
+        # same id -- same proxy object
+        self.assertIs(client._answer_convertTo_object(msg), converted_answer)
+
+    def test_release(self):
+        client = self._client()
+        client.release_batch_size = 2
+
+        proxy_ids = [ProxyID(), ProxyID()]
+        proxy_objects = [client._answer_convertTo_object(proxy_id) for proxy_id in proxy_ids]
+
+        # nothing to release yet
+        self.assertEqual(client._release_msg(), [])
+
+        del proxy_objects[0]
+        gc.collect()
+        self.assertEqual(client._released_ids, [proxy_ids[0].id])
+        # not enough released objects to send them
+        self.assertEqual(client._release_msg(), [])
+
+        # released id received again before telling the server
+        proxy_object = client._answer_convertTo_object(proxy_ids[0])
+        self.assertEqual(client._released_ids, [])
+
+        del proxy_object
+        del proxy_objects[0]
+        gc.collect()
+
+        header, msg = client._release_msg()
+        # released objects are sent without request id, server doesn't answer
+        self.assertEqual(socket_utils.msg_header.unpack(header), (len(msg), 0))
+        # with number of times the ids were received
+        self.assertEqual(client.codec.decode(msg), ("secret", "release", [(proxy_ids[0].id, 2),
+                                                                          (proxy_ids[1].id, 1)]))
+        self.assertEqual(client._received_ids, {})
+        self.assertEqual(client._released_ids, [])
+
     @patch("blivetgui.communication.client.BlivetGUIClient.__init__", lambda a, b, c, d: None)
     def test_convert_args(self):
         client = BlivetGUIClient(MagicMock(), MagicMock(), MagicMock())
@@ -62,5 +111,260 @@ class BlivetGUIClientTest(unittest.TestCase):
         self.assertTrue(isinstance(converted_args[0].data3.dataB, ProxyID))
         self.assertEqual(converted_args[0].data3.dataB, args[0].data3.dataB.proxy_id)
 
+    def test_batch(self):
+        client = self._client()
+        client.remote_multi = MagicMock(return_value=["sda", AttributeError(), "disk"])
+
+        device = ClientProxyObject(client, ProxyID())
+
+        with client.batch() as batch:
+            name = batch.param(device, "name")
+            missing = batch.param(device, "missing")
+            dev_type = batch.key(device, "type")
+
+            # nothing is sent before leaving the block
+            self.assertFalse(client.remote_multi.called)
+            with self.assertRaises(RuntimeError):
+                name.value  # pylint: disable=W0104
+
+        # all requests are sent in one message
+        client.remote_multi.assert_called_once_with([("param", device.proxy_id, "name"),
+                                                     ("param", device.proxy_id, "missing"),
+                                                     ("key", device.proxy_id, "type")])
+        self.assertEqual(name.value, "sda")
+        self.assertEqual(dev_type.value, "disk")
+        with self.assertRaises(AttributeError):
+            missing.value  # pylint: disable=W0104
+
+    def test_prefetch(self):
+        client = self._client()
+        client.remote_param = MagicMock(return_value="remote")
+
+        device = ClientProxyObject(client, ProxyID())
+        fmt = ClientProxyObject(client, ProxyID())
+
+        answers = [["sda", fmt], ["ext4"]]
+        client.remote_multi = MagicMock(side_effect=lambda requests: answers.pop(0))
+
+        with client.prefetch([device, "not a proxy object"], ("name", "format.type")):
+            # params of nested objects are fetched in a second message
+            self.assertEqual(client.remote_multi.call_count, 2)
+
+            self.assertEqual(device.name, "sda")
+            self.assertEqual(device.format, fmt)
+            self.assertEqual(device.format.type, "ext4")
+            self.assertFalse(client.remote_param.called)
+
+        # prefetched values are dropped after leaving the block
+        self.assertEqual(client.prefetched_params, {})
+        self.assertEqual(device.name, "remote")
+
+    def test_concurrent_requests(self):
+        client = self._client()
+        client_stats.reset()
+        client.sock, server_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        def _server():
+            # answer two requests in reverse order
+            requests = [socket_utils.recv_msg(server_sock) for _i in range(2)]
+            for request_id, data in reversed(requests):
+                msg = client.codec.decode(data)
+                socket_utils.sendmsg_all(server_sock, socket_utils.msg_buffers(client.codec.encode(msg[3]), request_id))
+
+        server = threading.Thread(target=_server)
+        server.start()
+
+        answers = {}
+
+        def _param(param_name):
+            answers[param_name] = client.remote_param(ProxyID(), param_name)
+
+        clients = [threading.Thread(target=_param, args=(param_name,)) for param_name in ("name", "size")]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        server.join()
+
+        # every thread got answer for its own request
+        self.assertEqual(answers, {"name": "name", "size": "size"})
+        self.assertEqual(client._pending, {})
+
+        # round trip is recorded for every request
+        stats = client_stats.snapshot()
+        self.assertEqual(stats["param:name"]["count"], 1)
+        self.assertGreater(stats["param:size"]["round_trip"]["max"], 0)
+        self.assertGreater(stats["param:size"]["reply_size"]["max"], socket_utils.msg_header.size)
+
+        client.sock.close()
+        server_sock.close()
+
+    def test_remote_calls(self):
+        client = self._client()
+        client.sock, server_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        def _server():
+            # all requests are received before the first answer is sent
+            requests = [socket_utils.recv_msg(server_sock) for _i in range(3)]
+            for request_id, data in reversed(requests):
+                msg = client.codec.decode(data)
+                if msg[2] == "fail":
+                    answer = ProxyDataContainer(success=False, exception=ValueError("error"), traceback="")
+                else:
+                    answer = ProxyDataContainer(success=True, answer=msg[2] + str(msg[3]))
+                socket_utils.sendmsg_all(server_sock, socket_utils.msg_buffers(client.codec.encode(answer), request_id))
+
+        server = threading.Thread(target=_server)
+        server.start()
+        answers = client.remote_calls(("get_available_raid_levels", ("mdraid",)), ("get_available_filesystems", ()),
+                                      ("get_available_disklabels", (True,)))
+        server.join()
+
+        self.assertEqual(answers, ["get_available_raid_levels['mdraid']", "get_available_filesystems[]",
+                                   "get_available_disklabels[True]"])
+
+        # exception is raised after all answers were received
+        server = threading.Thread(target=_server)
+        server.start()
+        with self.assertRaises(ValueError):
+            client.remote_calls(("fail", ()), ("get_mountpoints", ()), ("get_disks", ()))
+        server.join()
+        self.assertEqual(client._pending, {})
+
+        client.sock.close()
+        server_sock.close()
+
+    @patch("blivetgui.communication.client.GLib")
+    def test_call_async(self, glib):
+        # run idle callbacks right away
+        glib.idle_add.side_effect = lambda func, *args: func(*args)
+
+        client = self._client()
+        client.sock, server_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        def _answer(answer):
+            request_id, _data = socket_utils.recv_msg(server_sock)
+            socket_utils.sendmsg_all(server_sock, socket_utils.msg_buffers(client.codec.encode(answer), request_id))
+
+        callback = MagicMock()
+        future = client.call_async("get_mountpoints", callback=callback)
+
+        # socket is watched in the main loop, nothing is received before the answer
+        self.assertEqual(glib.io_add_watch.call_count, 1)
+        self.assertFalse(future.done())
+
+        _answer(ProxyDataContainer(success=True, answer=["/", "/home"]))
+        self.assertFalse(client._on_socket_ready(None, None))  # no more async calls -- watch removed
+        self.assertEqual(future.result(), ["/", "/home"])
+        callback.assert_called_once_with(future)
+
+        # failed call -- exception is set
+        future = client.call_async("get_mountpoints")
+        _answer(ProxyDataContainer(success=False, exception=ValueError("error"), traceback="traceback"))
+        client._on_socket_ready(None, None)
+        self.assertTrue(isinstance(future.exception(), ValueError))
+
+        # cancelled call -- callback isn't called
+        callback = MagicMock()
+        future = client.call_async("get_mountpoints", callback=callback)
+        future.cancel()
+        _answer(ProxyDataContainer(success=True, answer=[]))
+        client._on_socket_ready(None, None)
+        callback.assert_not_called()
+        self.assertEqual(client._pending, {})
+
+        client.sock.close()
+        server_sock.close()
+
+    @patch("blivetgui.communication.client.GLib")
+    def test_calls_async(self, glib):
+        # run idle callbacks right away
+        glib.idle_add.side_effect = lambda func, *args: func(*args)
+
+        client = self._client()
+        client.sock, server_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        def _answer(answers):
+            # answers are sent in the reversed order
+            request_ids = [socket_utils.recv_msg(server_sock)[0] for _answer in answers]
+            for request_id, answer in reversed(list(zip(request_ids, answers))):
+                socket_utils.sendmsg_all(server_sock, socket_utils.msg_buffers(client.codec.encode(answer), request_id))
+
+        callback = MagicMock()
+        future = client.calls_async([("get_mountpoints", ()), ("get_free_info", ())], callback=callback)
+
+        _answer([ProxyDataContainer(success=True, answer=["/"]), ProxyDataContainer(success=True, answer=[])])
+        client._on_socket_ready(None, None)
+        self.assertFalse(future.done())
+        client._on_socket_ready(None, None)
+        self.assertEqual(future.result(), [["/"], []])
+        callback.assert_called_once_with(future)
+
+        # one call failed -- exception is set
+        future = client.calls_async([("get_mountpoints", ()), ("get_free_info", ())])
+        _answer([ProxyDataContainer(success=True, answer=["/"]),
+                 ProxyDataContainer(success=False, exception=ValueError("error"), traceback="traceback")])
+        client._on_socket_ready(None, None)
+        client._on_socket_ready(None, None)
+        self.assertTrue(isinstance(future.exception(), ValueError))
+
+        # cancelled -- all calls are cancelled
+        callback = MagicMock()
+        future = client.calls_async([("get_mountpoints", ()), ("get_free_info", ())], callback=callback)
+        future.cancel()
+        _answer([ProxyDataContainer(success=True, answer=["/"]), ProxyDataContainer(success=True, answer=[])])
+        client._on_socket_ready(None, None)
+        client._on_socket_ready(None, None)
+        callback.assert_not_called()
+        self.assertEqual(client._pending, {})
+
+        # nothing to call
+        callback = MagicMock()
+        future = client.calls_async([], callback=callback)
+        self.assertEqual(future.result(), [])
+        callback.assert_called_once_with(future)
+
+        client.sock.close()
+        server_sock.close()
+
+    @patch("blivetgui.communication.client.GLib")
+    def test_notifications(self, glib):
+        # run idle callbacks right away
+        glib.idle_add.side_effect = lambda func, *args: func(*args)
+
+        client = self._client()
+        client.sock, server_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        def _notify(notification):
+            socket_utils.sendmsg_all(server_sock, socket_utils.msg_buffers(client.codec.encode(notification)))
+
+        callback = MagicMock()
+        client.watch_notifications(callback)
+        self.assertEqual(glib.io_add_watch.call_count, 1)
+
+        # socket is still watched after the notification is received
+        _notify(ProxyDataContainer(event="devicetree-changed", diff=ProxyDataContainer(generation=2)))
+        self.assertTrue(client._on_socket_ready(None, None))
+        self.assertEqual(callback.call_args[0][0].event, "devicetree-changed")
+        self.assertEqual([diff.generation for diff in client.devicetree_diffs], [2])
+
+        # notification received while waiting for an answer
+        _notify(ProxyDataContainer(event="devicetree-changed", diff=ProxyDataContainer(generation=3)))
+
+        def _server():
+            request_id, _data = socket_utils.recv_msg(server_sock)
+            socket_utils.sendmsg_all(server_sock, socket_utils.msg_buffers(client.codec.encode("name"), request_id))
+
+        server = threading.Thread(target=_server)
+        server.start()
+        self.assertEqual(client.remote_param(ProxyID(), "name"), "name")
+        server.join()
+
+        self.assertEqual(callback.call_count, 2)
+        self.assertEqual([diff.generation for diff in client.devicetree_diffs], [2, 3])
+
+        client.sock.close()
+        server_sock.close()
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import pickle
+
+from blivetgui.communication.codec import BinaryCodec, PickleCodec, CodecError, negotiate, detect
+from blivetgui.communication.proxy_utils import ProxyID, ProxyDataContainer
+
+from blivet.size import Size
+
+
+class BinaryCodecTest(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = BinaryCodec()
+
+    def _roundtrip(self, msg):
+        return self.codec.decode(self.codec.encode(msg))
+
+    def test_primitives(self):
+        for msg in (None, True, False, 0, 1, -1, 127, 128, -300, 2**70, -2**70, 1.01, -0.5,
+                    "", "abcdef", "žluťoučký kůň", b"\x00\xff", Size("8 GiB")):
+            decoded = self._roundtrip(msg)
+            self.assertEqual(decoded, msg)
+            self.assertEqual(type(decoded), type(msg))
+
+    def test_collections(self):
+        msg = ("secret", "call", "add_device", [1, [2, 3], {"a": (None, True)}])
+        self.assertEqual(self._roundtrip(msg), msg)
+        self.assertTrue(isinstance(self._roundtrip([1, 2]), list))
+        self.assertTrue(isinstance(self._roundtrip((1, 2)), tuple))
+
+    def test_proxy_types(self):
+        proxy_id = ProxyID(epoch=3)
+        decoded = self._roundtrip(proxy_id)
+        self.assertTrue(isinstance(decoded, ProxyID))
+        self.assertEqual(decoded.id, proxy_id.id)
+        self.assertEqual(decoded.epoch, 3)
+
+        container = ProxyDataContainer(success=True, size=Size("1 MiB"), device=proxy_id,
+                                       info=ProxyDataContainer(name="sda"))
+        decoded = self._roundtrip(container)
+        self.assertTrue(isinstance(decoded, ProxyDataContainer))
+        self.assertEqual(decoded.size, Size("1 MiB"))
+        self.assertEqual(decoded.device.id, proxy_id.id)
+        self.assertEqual(decoded.info.name, "sda")
+
+    def test_exceptions(self):
+        decoded = self._roundtrip(AttributeError("no attribute"))
+        self.assertTrue(isinstance(decoded, AttributeError))
+        self.assertEqual(str(decoded), "no attribute")
+
+        # exceptions with unsupported arguments
+        decoded = self._roundtrip(ValueError(object()))
+        self.assertTrue(isinstance(decoded, ValueError))
+
+        # exception from a module that isn't imported -- generic exception
+        class CustomError(Exception):
+            pass
+        CustomError.__module__ = "not.imported.module"
+        CustomError.__qualname__ = "CustomError"
+        decoded = self._roundtrip(CustomError("custom"))
+        self.assertEqual(type(decoded), Exception)
+        self.assertIn("custom", str(decoded))
+
+    def test_invalid(self):
+        with self.assertRaises(CodecError):
+            self.codec.encode(object())
+
+        with self.assertRaises(CodecError):
+            self.codec.decode(pickle.dumps("abcdef"))
+
+        # truncated message
+        with self.assertRaises(CodecError):
+            self.codec.decode(self.codec.encode("abcdef")[:-1])
+
+        # unhashable dictionary key (list)
+        with self.assertRaises(CodecError):
+            self.codec.decode(bytes([BinaryCodec.header[0], BinaryCodec._DICT, 1, BinaryCodec._LIST, 0, BinaryCodec._NONE]))
+
+        # exception arguments and attributes of wrong types
+        exception = self.codec.encode(ValueError("error"))
+        args = self.codec.encode(["error"])[1:]
+        attrs = self.codec.encode({})[1:]
+        self.assertTrue(exception.endswith(args + attrs))
+        with self.assertRaises(CodecError):
+            self.codec.decode(exception.replace(args, self.codec.encode(42)[1:]))
+        with self.assertRaises(CodecError):
+            self.codec.decode(exception.replace(attrs, self.codec.encode([])[1:]))
+        with self.assertRaises(CodecError):
+            self.codec.decode(exception.replace(attrs, self.codec.encode({1: 2})[1:]))
+
+        # too deeply nested message
+        nested = bytes([BinaryCodec._LIST, 1]) * 100000 + bytes([BinaryCodec._NONE])
+        with self.assertRaises(CodecError):
+            self.codec.decode(BinaryCodec.header + nested)
+
+        # nesting below the limit is fine
+        nested = bytes([BinaryCodec._LIST, 1]) * BinaryCodec.max_depth + bytes([BinaryCodec._NONE])
+        self.codec.decode(BinaryCodec.header + nested)
+
+    def test_negotiate(self):
+        self.assertTrue(isinstance(negotiate([0, 1]), BinaryCodec))
+        self.assertTrue(isinstance(negotiate([0]), PickleCodec))
+        with self.assertRaises(CodecError):
+            negotiate([42])
+
+        self.assertTrue(isinstance(detect(BinaryCodec().encode("abcdef")), BinaryCodec))
+        self.assertTrue(isinstance(detect(PickleCodec().encode("abcdef")), PickleCodec))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from blivetgui.device_index import DeviceIndex
+
+
+class SnapShotDevice(object):
+    pass
+
+
+@patch("blivetgui.device_index.LVMSnapShotDevice", SnapShotDevice)
+class DeviceIndexTest(unittest.TestCase):
+
+    def _device(self, dev_id, name, dtype, parents=None, disk=None, spec=None):
+        device = MagicMock(spec=spec)
+        device.configure_mock(id=dev_id, name=name, type=dtype, parents=parents or [], disk=disk)
+        return device
+
+    def _storage(self):
+        disk1 = self._device(1, "sda", "disk")
+        disk2 = self._device(2, "sdb", "disk")
+        part1 = self._device(3, "sda1", "partition", parents=[disk1], disk=disk1)
+        part2 = self._device(4, "sdb1", "partition", parents=[disk2], disk=disk2)
+        vg = self._device(5, "vg", "lvmvg", parents=[part1, part2])
+        lv = self._device(6, "lv", "lvmlv", parents=[vg])
+        snap = self._device(7, "snap", "lvmsnapshot", parents=[vg], spec=SnapShotDevice)
+        snap.origin = lv
+
+        return MagicMock(devices=[disk1, disk2, part1, part2, vg, lv, snap])
+
+    def test_rebuild(self):
+        storage = self._storage()
+        disk1, disk2, part1, part2, vg, lv, snap = storage.devices
+
+        index = DeviceIndex(storage)
+
+        self.assertEqual(index.get("names", "sda1"), [part1])
+        self.assertEqual(index.get("names", "sdc"), [])
+        self.assertEqual(index.get("types", "disk"), [disk1, disk2])
+        self.assertEqual(index.get("partitions", disk1.id), [part1])
+        self.assertEqual(index.get("snapshots", lv.id), [snap])
+        self.assertEqual(index.get("snapshots", vg.id), [])
+        self.assertEqual(index.get("containers", part2.id), [vg])
+
+    def test_update(self):
+        storage = self._storage()
+        disk1, disk2, part1, part2, vg, lv, _snap = storage.devices
+
+        index = DeviceIndex(storage)
+
+        # new partition -- no disk before allocation
+        part3 = self._device(8, "req8", "partition")
+        part3.exists = False
+        create = MagicMock(is_device=True, is_create=True, is_destroy=False, device=part3, container=None)
+        index.update(create)
+        self.assertEqual(index.get("partitions", disk1.id), [part1])
+        self.assertEqual(index.get("names", "req8"), [part3])
+
+        # partition was allocated -- new disk and name
+        part3.configure_mock(name="sda2", disk=disk1, parents=[disk1])
+        index.refresh_partitions([disk1])
+        self.assertEqual(index.get("partitions", disk1.id), [part1, part3])
+        self.assertEqual(index.get("names", "sda2"), [part3])
+        self.assertEqual(index.get("names", "req8"), [])
+
+        # canceled
+        index.update(create, removed=True)
+        self.assertEqual(index.get("partitions", disk1.id), [part1])
+        self.assertEqual(index.get("names", "sda2"), [])
+
+        # removed LV
+        destroy = MagicMock(is_device=True, is_create=False, is_destroy=True, device=lv, container=None)
+        index.update(destroy)
+        self.assertEqual(index.get("types", "lvmlv"), [])
+        index.update(destroy, removed=True)
+        self.assertEqual(index.get("types", "lvmlv"), [lv])
+
+        # member removed from the VG
+        vg.parents = [part1]
+        remove_member = MagicMock(is_device=False, is_create=False, is_destroy=False, device=part2, container=vg)
+        index.update(remove_member)
+        self.assertEqual(index.get("containers", part2.id), [])
+        self.assertEqual(index.get("containers", part1.id), [vg])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest.mock import MagicMock
+
+from blivetgui.device_snapshot import DeviceSnapshot
+from blivetgui.communication.proxy_utils import ProxyDataContainer, ProxyID
+
+
+class DeviceSnapshotTest(unittest.TestCase):
+
+    def _device_info(self, dev_id, name, parents=None, children=None, disk=None):
+        device = MagicMock(proxy_id=ProxyID(), id=dev_id)
+        return ProxyDataContainer(device=device, id=dev_id, name=name,
+                                  parents=parents or [], children=children or [],
+                                  disk=disk)
+
+    def _snapshot(self):
+        sda = self._device_info(1, "sda", children=[2])
+        sda1 = self._device_info(2, "sda1", parents=[1], children=[3], disk=1)
+        vg = self._device_info(3, "vg", parents=[2])
+
+        return ProxyDataContainer(generation=1, devices=[sda, sda1, vg], disks=[1], lvm=[3], raid=[], btrfs=[])
+
+    def test_load(self):
+        snapshot = DeviceSnapshot(self._snapshot())
+
+        self.assertEqual([d.name for d in snapshot.disks], ["sda"])
+        self.assertEqual([d.name for d in snapshot.group_devices["lvm"]], ["vg"])
+        self.assertEqual(snapshot.group_devices["raid"], [])
+
+        # ids are replaced with the device information
+        sda1 = snapshot.devices[2]
+        self.assertEqual(sda1.parents[0].name, "sda")
+        self.assertEqual(sda1.children[0].name, "vg")
+        self.assertEqual(sda1.disk.name, "sda")
+
+        # reload replaces old content
+        snapshot.load(ProxyDataContainer(generation=2, devices=[], disks=[], lvm=[], raid=[], btrfs=[]))
+        self.assertEqual(snapshot.disks, [])
+        self.assertEqual(snapshot.devices, {})
+
+    def test_get(self):
+        data = self._snapshot()
+        snapshot = DeviceSnapshot(data)
+
+        # device from the snapshot
+        self.assertEqual(snapshot.get(data.devices[1].device).name, "sda1")
+
+        # same device received in some other message -- found by its id
+        other = MagicMock(proxy_id=ProxyID(), id=3)
+        self.assertEqual(snapshot.get(other).name, "vg")
+
+        # device not in the snapshot (e.g. free space)
+        free = MagicMock(proxy_id=ProxyID(), id=42)
+        self.assertIsNone(snapshot.get(free))
+        self.assertIsNone(snapshot.get(None))
+
+    def test_apply_diff(self):
+        data = self._snapshot()
+        snapshot = DeviceSnapshot(data)
+        sda1 = snapshot.devices[2]
+        vg_device = data.devices[2].device
+
+        # same vg received in other message
+        other_vg = MagicMock(proxy_id=ProxyID(), id=3)
+        self.assertEqual(snapshot.get(other_vg).name, "vg")
+
+        # remove the vg, add new partition and update the disk and the old partition
+        diff = ProxyDataContainer(generation=2, removed=[3],
+                                  added=[self._device_info(4, "sda2", parents=[1], disk=1)],
+                                  changed=[self._device_info(1, "sda", children=[2, 4]),
+                                           self._device_info(2, "sda1", parents=[1], disk=1)],
+                                  disks=[1], lvm=[], raid=[], btrfs=[])
+        changes = snapshot.apply_diff(diff)
+
+        self.assertEqual(changes.ids, set([1, 2, 3, 4]))
+        self.assertTrue(changes.toplevel_changed)
+        self.assertEqual(snapshot.generation, 2)
+        self.assertEqual(snapshot.group_devices["lvm"], [])
+        self.assertIsNone(snapshot.get(vg_device))
+
+        # proxies of the removed vg are dropped
+        self.assertNotIn(other_vg.proxy_id.id, snapshot._proxy_cache.keys())
+        self.assertNotIn(3, [info.id for info in snapshot._proxy_cache.values() if info is not None])
+
+        # information is updated in place
+        self.assertIs(snapshot.devices[2], sda1)
+        self.assertEqual(sda1.children, [])
+        self.assertEqual([d.name for d in snapshot.disks[0].children], ["sda1", "sda2"])
+        self.assertEqual(snapshot.get_related_ids(snapshot.devices[4]), set([1, 4]))
+
+        # already applied diff is ignored
+        changes = snapshot.apply_diff(diff)
+        self.assertEqual(changes.ids, set())
+
+        # proxies from previous snapshot for removed devices are dropped too
+        old_sda2 = snapshot.devices[4].device
+        snapshot.load(ProxyDataContainer(generation=3, devices=[self._device_info(4, "sda2")],
+                                         disks=[], lvm=[], raid=[], btrfs=[]))
+        self.assertEqual(snapshot.get(old_sda2).name, "sda2")
+        snapshot.apply_diff(ProxyDataContainer(generation=4, removed=[4], added=[], changed=[],
+                                               disks=[], lvm=[], raid=[], btrfs=[]))
+        self.assertEqual(snapshot._stale_cache, {})
+
+        # lost diff -- can't be applied
+        diff = ProxyDataContainer(generation=6, removed=[], added=[], changed=[],
+                                  disks=[1], lvm=[], raid=[], btrfs=[])
+        self.assertIsNone(snapshot.apply_diff(diff))
+
+
+if __name__ == "__main__":
+    unittest.main()
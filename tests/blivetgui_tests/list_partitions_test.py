@@ -22,6 +22,7 @@ class ListPartitionsTest(unittest.TestCase):
         _builder.add_from_file(locate_ui_file("blivet-gui.ui"))
 
         self.blivet_gui = MagicMock(kickstart_mode=False, builder=_builder)
+        self.blivet_gui.device_snapshot.get.return_value = None
 
         self.list_partitions = ListPartitions(self.blivet_gui)
 
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest.mock import patch
+
+import os
+import socket
+import tempfile
+
+from blivetgui.communication import persistent
+
+
+class PersistentDaemonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_secret(self):
+        path = os.path.join(self.tmpdir.name, "run", "secret")
+
+        # secret is created by the first caller, others get the same one
+        secret = persistent.get_secret(path)
+        self.assertTrue(secret)
+        self.assertEqual(persistent.get_secret(path), secret)
+
+        # only root can read it
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["secret"])
+
+    def test_daemon_available(self):
+        path = os.path.join(self.tmpdir.name, "blivet-gui.sock")
+        self.assertFalse(persistent.daemon_available(path))
+
+        # regular file isn't a socket
+        open(path, "w").close()
+        self.assertFalse(persistent.daemon_available(path))
+        os.unlink(path)
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        self.assertTrue(persistent.daemon_available(path))
+        sock.close()
+
+    def test_activation_socket(self):
+        # not socket activated
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(persistent.activation_socket())
+
+        # sockets for a different process
+        with patch.dict(os.environ, {"LISTEN_PID": str(os.getpid() + 1), "LISTEN_FDS": "1"}):
+            self.assertIsNone(persistent.activation_socket())
+
+        path = os.path.join(self.tmpdir.name, "blivet-gui.sock")
+        listening = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listening.bind(path)
+        listening.listen(1)
+
+        with patch.dict(os.environ, {"LISTEN_PID": str(os.getpid()), "LISTEN_FDS": "1"}), \
+                patch("blivetgui.communication.persistent.SD_LISTEN_FDS_START", listening.fileno()):
+            sock = persistent.activation_socket()
+
+            # variables are not passed to child processes
+            self.assertNotIn("LISTEN_PID", os.environ)
+            self.assertNotIn("LISTEN_FDS", os.environ)
+
+        self.assertEqual(sock.getsockname(), path)
+        sock.detach()
+        listening.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import tracemalloc
+
+from blivetgui.profiling import Profiler, RequestProfiler, memory_report
+
+
+def _work():
+    return sum(i for i in range(1000))
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def _functions(self, path):
+        return set(function for (_file, _line, function) in pstats.Stats(path).stats.keys())
+
+    def test_disabled(self):
+        profiler = Profiler()
+
+        with profiler.profiled():
+            _work()
+        profiler.checkpoint()
+        profiler.close()
+
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_threads(self):
+        profiler = Profiler()
+        profiler.enable(self.directory, "blivet-gui-daemon")
+
+        def _thread_work():
+            with profiler.profiled():
+                _work()
+
+        # statistics from all threads are merged
+        thread = threading.Thread(target=_thread_work)
+        thread.start()
+        thread.join()
+
+        with profiler.profiled():
+            # nested blocks are part of the outer block
+            with profiler.profiled():
+                _work()
+
+        profiler.close()
+
+        self.assertEqual(os.listdir(self.directory), ["blivet-gui-daemon.pstats"])
+        stats = pstats.Stats(profiler.path)
+        work_stats = [value for key, value in stats.stats.items() if key[2] == "_work"]
+        self.assertEqual(work_stats[0][1], 2)  # number of calls
+
+    def test_checkpoint(self):
+        profiler = Profiler()
+        profiler.interval = 0
+        profiler.enable(self.directory, "blivet-gui")
+
+        # statistics are written while the main block is still running
+        with profiler.profiled():
+            _work()
+            profiler.checkpoint()
+            self.assertIn("_work", self._functions(profiler.path))
+
+    def test_request_profiler(self):
+        thread_profiler = Profiler()
+        thread_profiler.enable(self.directory, "blivet-gui-daemon")
+
+        request_profiler = RequestProfiler(thread_profiler)
+        request_profiler.directory = self.directory
+
+        methods, directory = request_profiler.set_methods(["get_disk_children", "add_device"], True)
+        self.assertEqual(methods, ["add_device", "get_disk_children"])
+        self.assertEqual(directory, self.directory)
+
+        # only profiled methods are written, every call to its own file
+        with thread_profiler.profiled():
+            with request_profiler.profiled("get_disk_children"):
+                _work()
+            with request_profiler.profiled("get_roots"):
+                _work()
+
+        self.assertIn("_work", self._functions(os.path.join(self.directory, "get_disk_children-1.pstats")))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "get_roots-2.pstats")))
+
+        methods, _directory = request_profiler.set_methods(["add_device"], False)
+        self.assertEqual(methods, ["get_disk_children"])
+
+    def test_request_profiler_tempdir(self):
+        request_profiler = RequestProfiler(Profiler())
+
+        _methods, directory = request_profiler.set_methods(["device_resizable"], True)
+        self.addCleanup(shutil.rmtree, directory)
+        self.assertTrue(os.path.isdir(directory))
+
+
+class MemoryReportTest(unittest.TestCase):
+
+    def test_memory_report(self):
+        self.addCleanup(tracemalloc.stop)
+        tracemalloc.stop()
+
+        # first report only starts tracing
+        self.assertEqual(memory_report(), (False, [], []))
+        self.assertTrue(tracemalloc.is_tracing())
+
+        # allocated here -- has to be alive when the snapshot is taken
+        data = [str(i) * 100 for i in range(1000)]
+
+        tracing, top, top_blivet = memory_report(limit=5, include=("*/profiling_test.py",))
+        self.assertTrue(tracing)
+        self.assertTrue(0 < len(top) <= 5)
+        self.assertTrue(top_blivet)
+        self.assertTrue(all("profiling_test.py" in line for line in top_blivet))
+        self.assertEqual(len(data), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import threading
+
+from blivetgui.communication.rwlock import RWLock
+
+
+class RWLockTest(unittest.TestCase):
+
+    def test_readers(self):
+        lock = RWLock()
+
+        # multiple readers at the same time
+        lock.acquire_read()
+        lock.acquire_read()
+
+        # writer has to wait for both of them
+        written = threading.Event()
+
+        def _write():
+            with lock.write_locked():
+                written.set()
+
+        writer = threading.Thread(target=_write)
+        writer.start()
+
+        self.assertFalse(written.wait(0.1))
+        lock.release_read()
+        self.assertFalse(written.wait(0.1))
+        lock.release_read()
+        self.assertTrue(written.wait(5))
+
+        writer.join()
+
+    def test_writer(self):
+        lock = RWLock()
+        lock.acquire_write()
+
+        read = threading.Event()
+
+        def _read():
+            with lock.read_locked():
+                read.set()
+
+        # lock can be released in a different thread
+        reader = threading.Thread(target=_read)
+        reader.start()
+        self.assertFalse(read.wait(0.1))
+
+        releaser = threading.Thread(target=lock.release_write)
+        releaser.start()
+        self.assertTrue(read.wait(5))
+
+        reader.join()
+        releaser.join()
+
+        with self.assertRaises(RuntimeError):
+            lock.release_write()
+
+        with self.assertRaises(RuntimeError):
+            lock.release_read()
+
+    def test_writer_priority(self):
+        lock = RWLock()
+        lock.acquire_read()
+
+        order = []
+
+        def _write():
+            with lock.write_locked():
+                order.append("write")
+
+        def _read():
+            with lock.read_locked():
+                order.append("read")
+
+        writer = threading.Thread(target=_write)
+        writer.start()
+
+        # wait for the writer to start waiting for the lock
+        while not lock._waiting_writers:
+            writer.join(0.01)
+
+        # new reader can't get the lock before the waiting writer
+        reader = threading.Thread(target=_read)
+        reader.start()
+        reader.join(0.1)
+        self.assertEqual(order, [])
+
+        lock.release_read()
+        writer.join()
+        reader.join()
+
+        self.assertEqual(order, ["write", "read"])
+
+
+if __name__ == "__main__":
+    unittest.main()
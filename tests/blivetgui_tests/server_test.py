@@ -1,51 +1,61 @@
 # -*- coding: utf-8 -*-
 
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pickle
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from blivetgui.communication.server import BlivetUtilsServer, BlivetProxyObject
-from blivetgui.communication.proxy_utils import ProxyID, ProxyDataContainer
+from blivetgui.communication.server import BlivetUtilsServer, BlivetProxyObject, handle_udev_events
+from blivetgui.communication.proxy_utils import ProxyID, ProxyDataContainer, InvalidProxyID
+from blivetgui.communication.rwlock import RWLock
+from blivetgui.communication import codec
+from blivetgui.communication import socket_utils
+from blivetgui.communication import server as server_module
 
 from blivet.size import Size
 
 
 class BlivetUtilsServerTest(unittest.TestCase):
 
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
     def test_pickle_answer(self):
+        server = BlivetUtilsServer()
+
         # string
         msg = "abcdef"
-        pickled_msg = BlivetUtilsServer._pickle_answer(MagicMock(), msg)
+        pickled_msg = server._pickle_answer(msg)
         self.assertEqual(msg, pickle.loads(pickled_msg))
 
         # None
         msg = None
-        pickled_msg = BlivetUtilsServer._pickle_answer(MagicMock(), msg)
+        pickled_msg = server._pickle_answer(msg)
         self.assertEqual(msg, pickle.loads(pickled_msg))
 
         # blivet.size.Size
         msg = Size("8 GiB")
-        pickled_msg = BlivetUtilsServer._pickle_answer(MagicMock(), msg)
+        pickled_msg = server._pickle_answer(msg)
         self.assertEqual(msg, pickle.loads(pickled_msg))
 
         # list of multiple types
         msg = ["abcdef", 1, 1.01, True]
-        pickled_msg = BlivetUtilsServer._pickle_answer(MagicMock(), msg)
+        pickled_msg = server._pickle_answer(msg)
         self.assertEqual(msg, pickle.loads(pickled_msg))
 
         # BlivetProxyObject
         msg = BlivetProxyObject(MagicMock(), ProxyID())
-        pickled_msg = BlivetUtilsServer._pickle_answer(MagicMock(), msg)
+        pickled_msg = server._pickle_answer(msg)
         # BlivetProxyObject is not pickled, instead of it we pickle its id (ProxyID object)
         # we compare the id (int) of this id (ProxyID) with id of unpickled object
         self.assertEqual(msg.id.id, pickle.loads(pickled_msg).id)
 
         # unpicklable object
         test_dict = {}
+        server.object_dict = test_dict
 
         msg = MagicMock()  # MagicMock is definitely not in picklable_types
-        pickled_msg = BlivetUtilsServer._pickle_answer(MagicMock(object_dict=test_dict), msg)
+        pickled_msg = server._pickle_answer(msg)
         unpickled_msg = pickle.loads(pickled_msg)
         # unpicklable objects are not pickled, instead a BlivetProxyObject is created
         # and its ProxyID is pickled; test we really have a ProxyID object and test
@@ -55,19 +65,96 @@ class BlivetUtilsServerTest(unittest.TestCase):
 
         # unpicklable objects in list
         test_dict = {}
+        server.object_dict = test_dict
 
         msg = [MagicMock(), "abcdef"]
-        pickled_msg = BlivetUtilsServer._pickle_answer(MagicMock(object_dict=test_dict), msg)
+        pickled_msg = server._pickle_answer(msg)
         unpickled_msg = pickle.loads(pickled_msg)
         self.assertTrue(isinstance(unpickled_msg, list))
         self.assertTrue(isinstance(unpickled_msg[0], ProxyID))
         self.assertEqual(test_dict[unpickled_msg[0].id].blivet_object, msg[0])
         self.assertEqual(unpickled_msg[1], msg[1])
 
+        # ProxyDataContainer and dicts are sent by value, only unpicklable
+        # objects inside them are replaced by ProxyIDs
+        test_dict = {}
+        server.object_dict = test_dict
+
+        blivet_device = MagicMock()
+        msg = ProxyDataContainer(name="sda", children=[1, 2], device=blivet_device,
+                                 format=ProxyDataContainer(type="ext4"))
+        unpickled_msg = pickle.loads(server._pickle_answer(msg))
+        self.assertTrue(isinstance(unpickled_msg, ProxyDataContainer))
+        self.assertEqual(unpickled_msg.name, "sda")
+        self.assertEqual(unpickled_msg.children, [1, 2])
+        self.assertEqual(unpickled_msg.format.type, "ext4")
+        self.assertTrue(isinstance(unpickled_msg.device, ProxyID))
+        self.assertEqual(test_dict[unpickled_msg.device.id].blivet_object, blivet_device)
+
+        msg = {"lvm": [blivet_device], "raid": []}
+        unpickled_msg = pickle.loads(server._pickle_answer(msg))
+        self.assertEqual(unpickled_msg["raid"], [])
+        self.assertTrue(isinstance(unpickled_msg["lvm"][0], ProxyID))
+
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_multi(self):
+        server = BlivetUtilsServer()
+        server._send = MagicMock()
+
+        blivet_object = MagicMock(name_attr="sda", children=[MagicMock(), "abcdef"])
+        del blivet_object.non_existing
+        obj_id = ProxyID()
+        server.object_dict = {obj_id.id: BlivetProxyObject(blivet_object, obj_id)}
+
+        requests = [("param", obj_id, "name_attr"),
+                    ("param", obj_id, "non_existing"),
+                    ("param", obj_id, "children"),
+                    ("key", obj_id, "key"),
+                    ("method", obj_id, "__str__", ())]
+        server._get_multi(("secret", "multi", requests))
+
+        # all answers are sent back in one message
+        self.assertEqual(server._send.call_count, 1)
+        answers = pickle.loads(server._send.call_args[0][0])
+        self.assertEqual(len(answers), len(requests))
+
+        self.assertEqual(answers[0], "sda")
+        self.assertTrue(isinstance(answers[1], AttributeError))
+        # lists are converted the same way as for a single 'param' request
+        self.assertTrue(isinstance(answers[2], list))
+        self.assertTrue(isinstance(answers[2][0], ProxyID))
+        self.assertEqual(answers[2][1], "abcdef")
+        self.assertTrue(isinstance(answers[3], ProxyID))
+        self.assertEqual(server.object_dict[answers[3].id].blivet_object, blivet_object["key"])
+        self.assertEqual(answers[4], str(blivet_object))
+
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_call_utils_diff(self):
+        server = BlivetUtilsServer()
+        server._send = MagicMock()
+        server.object_dict = {}
+        server.blivet_utils = MagicMock()
+        server.blivet_utils.get_devicetree_diff.return_value = ProxyDataContainer(generation=2)
+
+        # device tree diff is sent with answers for methods changing the device tree
+        server._call_utils_method(("secret", "call", "add_device", []))
+        answer = pickle.loads(server._send.call_args[0][0])
+        self.assertTrue(answer.success)
+        self.assertEqual(answer.diff.generation, 2)
+
+        # but not for other methods
+        server._call_utils_method(("secret", "call", "get_mountpoints", []))
+        answer = pickle.loads(server._send.call_args[0][0])
+        self.assertTrue(answer.success)
+        self.assertNotIn("diff", answer)
+
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
     def test_convert_args(self):
+        server = BlivetUtilsServer()
+
         # 'normal' arguments
         args = ["abcdef", 1, 1.01, True, None]
-        converted_args = BlivetUtilsServer._args_convertTo_objects(MagicMock(), args)
+        converted_args = server._args_convertTo_objects(args)
         self.assertEqual(converted_args, args)
 
         # ProxyID arguments
@@ -80,7 +167,8 @@ class BlivetUtilsServerTest(unittest.TestCase):
         arg2_obj = MagicMock(blivet_object=MagicMock())
         test_dict[arg2.id] = arg2_obj
 
-        converted_args = BlivetUtilsServer._args_convertTo_objects(MagicMock(object_dict=test_dict), [arg1, arg2])
+        server.object_dict = test_dict
+        converted_args = server._args_convertTo_objects([arg1, arg2])
         self.assertEqual(converted_args, [arg1_obj.blivet_object, arg2_obj.blivet_object])
 
         # ProxyDataContainer as an argument
@@ -91,11 +179,379 @@ class BlivetUtilsServerTest(unittest.TestCase):
         test_dict[arg3.id] = arg3_obj
 
         args = [ProxyDataContainer(data1="abcdef", data2=1, data3=arg3)]
-        converted_args = BlivetUtilsServer._args_convertTo_objects(MagicMock(object_dict=test_dict), args)
+        server.object_dict = test_dict
+        converted_args = server._args_convertTo_objects(args)
         self.assertEqual(converted_args[0]["data1"], "abcdef")
         self.assertEqual(converted_args[0]["data2"], 1)
         self.assertEqual(converted_args[0]["data3"], arg3_obj.blivet_object)
 
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_proxy_lifetime(self):
+        server = BlivetUtilsServer()
+        server._send = MagicMock()
+        server.object_dict = {}
+        server.object_ids = {}
+        server.epoch = 0
+
+        # same object -- same id
+        blivet_object = MagicMock()
+        proxy_id = server._convert_answer(blivet_object)
+        self.assertEqual(server._convert_answer([blivet_object])[0].id, proxy_id.id)
+        self.assertEqual(len(server.object_dict), 1)
+
+        # object isn't removed until the client received all ids we sent (an
+        # answer with the id can be sent after the client released it)
+        server._release_objects(("secret", "release", [(proxy_id.id, 1)]))
+        self.assertEqual(len(server.object_dict), 1)
+        self.assertEqual(server._convert_answer(blivet_object).id, proxy_id.id)
+
+        # released objects are removed, nothing is sent back
+        server._release_objects(("secret", "release", [(proxy_id.id, 2), (12345, 1)]))
+        self.assertEqual(server.object_dict, {})
+        self.assertEqual(server.object_ids, {})
+        server._send.assert_not_called()
+
+        # released object gets a new id
+        new_id = server._convert_answer(blivet_object)
+        self.assertNotEqual(new_id.id, proxy_id.id)
+
+        # released id is not valid anymore
+        server._get_param(("secret", "param", proxy_id, "name"))
+        answer = pickle.loads(server._send.call_args[0][0])
+        self.assertTrue(isinstance(answer, InvalidProxyID))
+
+        # reset invalidates all objects
+        server.server = MagicMock(handlers=[server])
+        server.blivet_utils = MagicMock()
+        server.blivet_utils.blivet_reset.return_value = None
+        server._call_utils_method(("secret", "call", "blivet_reset", []))
+        self.assertEqual(server.epoch, 1)
+        self.assertEqual(server.object_dict, {})
+
+        with self.assertRaises(InvalidProxyID):
+            server._get_proxy_object(new_id)
+
+        self.assertEqual(server._convert_answer(blivet_object).epoch, 1)
+
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_proxy_objects_per_client(self):
+        server = MagicMock(handlers=[])
+        handler1 = BlivetUtilsServer()
+        handler1.server = server
+        handler1.setup()
+        handler2 = BlivetUtilsServer()
+        handler2.server = server
+        handler2.setup()
+
+        # release from one client doesn't affect the other one
+        blivet_object = MagicMock()
+        proxy_id1 = handler1._convert_answer(blivet_object)
+        proxy_id2 = handler2._convert_answer(blivet_object)
+        self.assertNotEqual(proxy_id1.id, proxy_id2.id)
+
+        handler1._release_objects(("secret", "release", [(proxy_id1.id, 1)]))
+        self.assertEqual(handler1.object_dict, {})
+        self.assertEqual(handler2._get_proxy_object(proxy_id2).blivet_object, blivet_object)
+
+        # class defaults are not used
+        self.assertEqual(BlivetUtilsServer.object_dict, {})
+
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_dispatch(self):
+        server = BlivetUtilsServer()
+        server.object_dict = {}
+        server.object_ids = {}
+        server.epoch = 0
+        server.server = MagicMock(storage_lock=RWLock(), executor=ThreadPoolExecutor(max_workers=2),
+                                  handlers=[server])
+        server.blivet_utils = MagicMock()
+        server.blivet_utils.set_bootloader_device.return_value = None
+
+        # udev events are suppressed while the write request runs
+        udev_monitor = server.server.udev_monitor
+        server.blivet_utils.set_bootloader_device.side_effect = \
+            lambda _device: self.assertEqual((udev_monitor.suppress.call_count, udev_monitor.resume.call_count), (1, 0))
+
+        answers = []
+        server._send = MagicMock(side_effect=lambda data, request_id=0: answers.append((request_id, pickle.loads(data))))
+
+        release = threading.Event()
+
+        class BlivetObject(object):
+            fast = "fast"
+
+            @property
+            def slow(self):
+                release.wait(5)
+                return "slow"
+
+        obj_id = ProxyID()
+        server.object_dict[obj_id.id] = BlivetProxyObject(BlivetObject(), obj_id)
+
+        self.assertTrue(server._is_read_only(("secret", "param", obj_id, "slow")))
+        self.assertTrue(server._is_read_only(("secret", "call", "device_resizable", [])))
+        self.assertTrue(server._is_read_only(("secret", "multi", [("param", obj_id, "fast"),
+                                                                  ("method", obj_id, "__str__", ())])))
+        self.assertFalse(server._is_read_only(("secret", "call", "add_device", [])))
+        self.assertFalse(server._is_read_only(("secret", "method", obj_id, "setup", ())))
+        self.assertFalse(server._is_read_only(("secret", "release", [])))
+
+        # read-only requests run at the same time, faster one is answered first
+        server._dispatch(1, ("secret", "param", obj_id, "slow"))
+        server._dispatch(2, ("secret", "param", obj_id, "fast"))
+
+        for _i in range(500):
+            if answers:
+                break
+            release.wait(0.01)
+        self.assertEqual(answers, [(2, "fast")])
+
+        # other requests wait for running read-only requests
+        writer = threading.Thread(target=server._dispatch,
+                                  args=(3, ("secret", "call", "set_bootloader_device", ["sda"])))
+        writer.start()
+        writer.join(0.1)
+        self.assertTrue(writer.is_alive())
+        server.blivet_utils.set_bootloader_device.assert_not_called()
+
+        release.set()
+        writer.join()
+        server.server.executor.shutdown(wait=True)
+
+        self.assertEqual([request_id for request_id, _answer in answers], [2, 1, 3])
+        self.assertEqual(answers[1][1], "slow")
+        self.assertTrue(answers[2][1].success)
+
+        server.blivet_utils.set_bootloader_device.assert_called_once_with("sda")
+        udev_monitor.suppress.assert_called_once_with()
+        udev_monitor.resume.assert_called_once_with()
+
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_handle_udev_events(self):
+        handler = BlivetUtilsServer()
+        handler.object_dict = {}
+        handler.object_ids = {}
+        handler.blivet_utils = MagicMock()
+        handler._send = MagicMock()
+
+        server = MagicMock(storage_lock=RWLock(), handlers=[handler], blivet_utils=handler.blivet_utils)
+        server.blivet_utils.get_devicetree_diff.return_value = ProxyDataContainer(generation=3)
+
+        # device tree changed -- diff is sent to the clients
+        server.blivet_utils.apply_udev_events.return_value = True
+        handle_udev_events(server, [("add", "/sys/block/sdb")])
+        server.blivet_utils.apply_udev_events.assert_called_once_with([("add", "/sys/block/sdb")])
+
+        # notifications are sent without request id
+        self.assertEqual(len(handler._send.call_args[0]), 1)
+        notification = pickle.loads(handler._send.call_args[0][0])
+        self.assertEqual(notification.event, "devicetree-changed")
+        self.assertEqual(notification.diff.generation, 3)
+
+        # nothing changed -- no notification
+        handler._send.reset_mock()
+        server.blivet_utils.apply_udev_events.return_value = False
+        handle_udev_events(server, [("change", "/sys/block/sdb")])
+        handler._send.assert_not_called()
+
+        # failure -- lock is released
+        server.blivet_utils.apply_udev_events.side_effect = RuntimeError("failed")
+        handle_udev_events(server, [("change", "/sys/block/sdb")])
+        handler._send.assert_not_called()
+        with server.storage_lock.write_locked():
+            pass
+
+        # events caused by the rescan are suppressed
+        self.assertEqual(server.udev_monitor.suppress.call_count, 3)
+        self.assertEqual(server.udev_monitor.resume.call_count, 3)
+
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_client_disconnected(self):
+        server = BlivetUtilsServer()
+        server.blivet_utils = MagicMock()
+        server.blivet_utils.storage.devicetree.actions = ["action1", "action2"]
+        server.server = MagicMock(storage_lock=RWLock(), handlers=[server, MagicMock()], persistent=False, quit=False)
+
+        # other client is still connected
+        server._client_disconnected()
+        self.assertFalse(server.server.quit)
+
+        # last client -- server quits
+        server.server.handlers = [server]
+        server._client_disconnected()
+        self.assertTrue(server.server.quit)
+        server.blivet_utils.blivet_cancel_actions.assert_not_called()
+
+        # persistent server keeps running, actions of the client are canceled
+        server.server.quit = False
+        server.server.persistent = True
+        blivet_utils = server.blivet_utils
+        server._client_disconnected()
+        self.assertFalse(server.server.quit)
+        blivet_utils.blivet_cancel_actions.assert_called_once_with(["action1", "action2"])
+        self.assertIsNone(server.blivet_utils)
+
+    @patch("blivetgui.communication.server.BlivetUtils")
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_init_preloaded(self, blivet_utils_class):
+        preloaded_utils = MagicMock()
+        future = Future()
+        future.set_result(preloaded_utils)
+
+        def _server(preloaded):
+            server = BlivetUtilsServer()
+            server.blivet_utils = None
+            server.object_dict = {}
+            server._send = MagicMock()
+            server.server = MagicMock(other_running=False, blivet_utils=None, persistent=False, preloaded=preloaded)
+            return server
+
+        # BlivetUtils created before the client connected is used
+        server = _server(([False], future))
+        server._blivet_utils_init(("secret", "init", [False], [0, 1]))
+        self.assertEqual(server.blivet_utils, preloaded_utils)
+        self.assertEqual(server.server.blivet_utils, preloaded_utils)
+        blivet_utils_class.assert_not_called()
+
+        # created with different arguments -- new one is created
+        server = _server(([False], future))
+        server._blivet_utils_init(("secret", "init", [True], [0, 1]))
+        blivet_utils_class.assert_called_once_with(True)
+        self.assertEqual(server.blivet_utils, blivet_utils_class.return_value)
+
+    @patch("blivetgui.communication.server.BlivetUtils")
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_init_session(self, blivet_utils_class):
+        shared_utils = MagicMock(kickstart=False)
+        shared_utils.storage.devicetree.actions = []
+        daemon = MagicMock(other_running=False, blivet_utils=shared_utils, persistent=True, preloaded=None,
+                           storage_lock=RWLock(), handlers=[])
+
+        def _server():
+            server = BlivetUtilsServer()
+            server.blivet_utils = None
+            server.object_dict = {}
+            server._send = MagicMock()
+            server.server = daemon
+            daemon.handlers.append(server)
+            return server
+
+        # device tree loaded by the persistent server is used
+        first = _server()
+        first._blivet_utils_init(("secret", "init", [False], [0, 1]))
+        self.assertEqual(first.blivet_utils, shared_utils)
+
+        # only one client can use it at a time
+        second = _server()
+        second._blivet_utils_init(("secret", "init", [False], [0, 1]))
+        self.assertIsNone(second.blivet_utils)
+        answer = codec.BinaryCodec().decode(second._send.call_args[0][0])
+        self.assertFalse(answer.success)
+        self.assertEqual(answer.reason, "running")
+
+        # first client disconnected -- next client can use it
+        first._client_disconnected()
+        daemon.handlers.remove(first)
+        third = _server()
+        third._blivet_utils_init(("secret", "init", [False], [0, 1]))
+        self.assertEqual(third.blivet_utils, shared_utils)
+        third._client_disconnected()
+        daemon.handlers.remove(third)
+
+        # kickstart client doesn't get the device tree loaded without kickstart
+        fourth = _server()
+        fourth._blivet_utils_init(("secret", "init", [True], [0, 1]))
+        blivet_utils_class.assert_called_once_with(True)
+        self.assertEqual(fourth.blivet_utils, blivet_utils_class.return_value)
+
+    @patch("blivetgui.communication.server.timeline")
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_timings(self, timeline):
+        server = BlivetUtilsServer()
+        server._send = MagicMock()
+        timeline.phases = [{"component": "blivet-gui-daemon", "phase": "storage.reset()", "start": 1.0, "end": 2.0,
+                            "duration": 1.0}]
+
+        server._get_timings(("secret", "timings", ()))
+        self.assertEqual(pickle.loads(server._send.call_args[0][0]), timeline.phases)
+        timeline.log.assert_called_once_with(server_module.log)
+
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_stats(self):
+        server = BlivetUtilsServer()
+        server.object_dict = {}
+        server.object_ids = {}
+        server.epoch = 0
+        server.request = MagicMock()
+        server.request.sendmsg.side_effect = lambda buffers: sum(len(buf) for buf in buffers)
+        server.send_lock = threading.Lock()
+        server.reply_sizes = {}
+        server.blivet_utils = MagicMock()
+        server_module.server_stats.reset()
+
+        # time and sizes are recorded for every method
+        for _i in range(3):
+            server._run_request(server._call_utils_method, ("secret", "call", "get_mountpoints", []), 5,
+                                MagicMock(), request_size=100)
+
+        stats = server_module.server_stats.snapshot()["call:get_mountpoints"]
+        self.assertEqual(stats["count"], 3)
+        self.assertEqual(stats["request_size"]["max"], 100)
+        self.assertGreater(stats["reply_size"]["min"], socket_utils.msg_header.size)
+        self.assertEqual(server.reply_sizes, {})
+
+        # "stats" sends the statistics, "reset" clears them
+        server._send = MagicMock()
+        server._get_stats(("secret", "stats", ()))
+        self.assertIn("call:get_mountpoints", pickle.loads(server._send.call_args[0][0]).keys())
+
+        server._reset_stats(("secret", "reset", ()))
+        self.assertEqual(server_module.server_stats.snapshot(), {})
+
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_profile(self):
+        server = BlivetUtilsServer()
+        server._send = MagicMock()
+        server.object_dict = {}
+        server.blivet_utils = MagicMock()
+
+        request_profiler = MagicMock()
+        request_profiler.set_methods.return_value = (["get_disk_children"], "/tmp/profile")
+
+        with patch("blivetgui.communication.server.request_profiler", request_profiler):
+            server._set_profiled_methods(("secret", "profile", (["get_disk_children"], True)))
+            request_profiler.set_methods.assert_called_once_with(["get_disk_children"], True)
+            self.assertEqual(pickle.loads(server._send.call_args[0][0]), [["get_disk_children"], "/tmp/profile"])
+
+            # only BlivetUtils methods can be profiled
+            with self.assertRaises(ValueError):
+                server._set_profiled_methods(("secret", "profile", (["get_disk_childre"], True)))
+
+            # calls of BlivetUtils methods are profiled by name
+            server._call_utils_method(("secret", "call", "get_disk_children", [None]))
+            request_profiler.profiled.assert_called_once_with("get_disk_children")
+
+        with patch("blivetgui.communication.server.memory_report", return_value=(True, ["a"], ["b"])):
+            server._get_memory_report(("secret", "memory", (5,)))
+            self.assertEqual(pickle.loads(server._send.call_args[0][0]),
+                             {"tracing": True, "top": ["a"], "top_blivet": ["b"],
+                              "proxy_objects": len(server.object_dict)})
+
+    @patch("blivetgui.communication.server.BlivetUtilsServer.__init__", lambda a: None)
+    def test_persistent_codecs(self):
+        server = BlivetUtilsServer()
+        server.codec_negotiated = False
+        server.server = MagicMock(persistent=False)
+
+        msg = ("secret", "init", [], [0, 1])
+
+        # pickled messages are never accepted (persistent or not)
+        for persistent in (False, True):
+            server.server.persistent = persistent
+            with self.assertRaises(RuntimeError):
+                server._decode_msg(codec.PickleCodec().encode(msg))
+            self.assertEqual(server._decode_msg(codec.BinaryCodec().encode(msg)), msg)
+
 
 class BlivetProxyObjectTest(unittest.TestCase):
 
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest.mock import MagicMock
+
+import os
+import tempfile
+import shutil
+
+from blivetgui.size_info_cache import SizeInfoCache, EXT_SUPERBLOCK, EXT_MAGIC
+
+from blivet.size import Size
+
+
+class SizeInfoCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmpdir, "cache", "size_info.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _ext_format(self, uuid, wtime=1000, magic=EXT_MAGIC):
+        """ Format with a fake device containing only ext superblock
+        """
+
+        device = os.path.join(self.tmpdir, uuid)
+        with open(device, "wb") as dev:
+            dev.write(b"\0" * 1024 + EXT_SUPERBLOCK.pack(100, 200, 1000, wtime, 5, magic, 1))
+
+        return MagicMock(type="ext4", uuid=uuid, device=device, status=False, size=Size("1 GiB"),
+                         _min_instance_size=Size("100 MiB"), _resizable=True)
+
+    def _set_wtime(self, fmt, wtime):
+        with open(fmt.device, "r+b") as dev:
+            dev.seek(1024)
+            dev.write(EXT_SUPERBLOCK.pack(100, 200, 1000, wtime, 5, EXT_MAGIC, 1))
+
+    def test_store_apply(self):
+        cache = SizeInfoCache(self.cache_path)
+
+        fmt = self._ext_format("uuid1")
+        self.assertFalse(cache.apply(fmt))
+        cache.store(fmt)
+
+        # cache is saved on disk and loaded by a new instance
+        cache = SizeInfoCache(self.cache_path)
+        new_fmt = self._ext_format("uuid1")
+        new_fmt.configure_mock(_min_instance_size=Size(0), _resizable=False)
+        self.assertTrue(cache.apply(new_fmt))
+        self.assertEqual(new_fmt._min_instance_size, Size("100 MiB"))
+        self.assertTrue(new_fmt._resizable)
+
+        # filesystem changed -- cached information is not valid
+        self._set_wtime(new_fmt, 2000)
+        self.assertFalse(cache.apply(new_fmt))
+
+        # different size
+        self._set_wtime(new_fmt, 1000)
+        new_fmt.size = Size("2 GiB")
+        self.assertFalse(cache.apply(new_fmt))
+
+    def test_not_cached(self):
+        cache = SizeInfoCache(self.cache_path)
+
+        # mounted filesystem
+        fmt = self._ext_format("uuid1")
+        fmt.status = True
+        cache.store(fmt)
+        self.assertFalse(cache.apply(fmt))
+
+        # unsupported filesystem -- no marker to validate the cached information
+        fmt = self._ext_format("uuid2")
+        fmt.type = "ntfs"
+        self.assertFalse(cache.supported(fmt))
+        cache.store(fmt)
+        self.assertFalse(cache.apply(fmt))
+
+        # not an ext superblock
+        fmt = self._ext_format("uuid3", magic=0)
+        cache.store(fmt)
+        self.assertFalse(cache.apply(fmt))
+
+        self.assertFalse(os.path.exists(self.cache_path))
+
+    def test_lru(self):
+        cache = SizeInfoCache(self.cache_path, max_entries=2)
+
+        formats = [self._ext_format("uuid%d" % i) for i in range(3)]
+        cache.store(formats[0])
+        cache.store(formats[1])
+
+        # uuid0 is now more recently used than uuid1
+        self.assertTrue(cache.apply(formats[0]))
+
+        # order is saved too
+        cache = SizeInfoCache(self.cache_path, max_entries=2)
+        cache.store(formats[2])
+
+        self.assertTrue(cache.apply(formats[0]))
+        self.assertFalse(cache.apply(formats[1]))
+        self.assertTrue(cache.apply(formats[2]))
+
+    def test_invalidate(self):
+        cache = SizeInfoCache(self.cache_path)
+
+        formats = [self._ext_format("uuid%d" % i) for i in range(2)]
+        for fmt in formats:
+            cache.store(fmt)
+
+        cache.invalidate(["uuid0", None])
+        self.assertFalse(cache.apply(formats[0]))
+        self.assertTrue(cache.apply(formats[1]))
+
+        cache = SizeInfoCache(self.cache_path)
+        self.assertFalse(cache.apply(formats[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest.mock import MagicMock
+
+import socket
+import threading
+
+from blivetgui.communication import socket_utils
+
+
+class SocketUtilsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sock1, self.sock2 = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    def tearDown(self):
+        self.sock1.close()
+        self.sock2.close()
+
+    def test_send_recv(self):
+        for msg in (b"", b"abcdef", bytes(range(256)) * 4096):
+            # send from other thread, big messages don't fit into socket buffer
+            thread = threading.Thread(target=socket_utils.sendmsg_all,
+                                      args=(self.sock1, socket_utils.msg_buffers(msg, 42)))
+            thread.start()
+            received = socket_utils.recv_msg(self.sock2)
+            thread.join()
+
+            self.assertEqual(received, (42, msg))
+
+        # closed connection
+        self.sock1.close()
+        self.assertIsNone(socket_utils.recv_msg(self.sock2))
+
+    def test_partial_send(self):
+        # sendmsg sending only few bytes at a time
+        sent = bytearray()
+
+        def _sendmsg(buffers):
+            data = b"".join(bytes(buf) for buf in buffers)[:3]
+            sent.extend(data)
+            return len(data)
+
+        sock = MagicMock(sendmsg=_sendmsg)
+        socket_utils.sendmsg_all(sock, [b"ab", b"", b"cdefgh", b"i"])
+
+        self.assertEqual(sent, b"abcdefghi")
+
+    def test_partial_recv(self):
+        # recv_into receiving only one byte at a time
+        data = iter(socket_utils.msg_header.pack(3, 1) + b"xyz")
+
+        def _recv_into(view, _nbytes):
+            view[0] = next(data)
+            return 1
+
+        sock = MagicMock(recv_into=_recv_into)
+        self.assertEqual(socket_utils.recv_msg(sock), (1, b"xyz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
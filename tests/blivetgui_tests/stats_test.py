@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import random
+
+from blivetgui.communication.stats import Histogram, RequestStats, request_key
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_precision(self):
+        histogram = Histogram(precision_bits=5)
+
+        values = [random.randint(0, 10 ** 9) for _i in range(10000)]
+        for value in values:
+            histogram.record(value)
+
+        self.assertEqual(histogram.count, len(values))
+        self.assertEqual(histogram.min, min(values))
+        self.assertEqual(histogram.max, max(values))
+
+        # percentiles are within the relative error
+        values.sort()
+        for percent in (50, 90, 99):
+            exact = values[int(len(values) * percent / 100.0) - 1]
+            self.assertAlmostEqual(histogram.percentile(percent) / exact, 1, delta=2 ** -4)
+
+        # number of buckets is bounded
+        self.assertLessEqual(len(histogram.to_dict()["buckets"]), 32 * 30)
+
+    def test_small_values(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+
+        # small values are exact
+        for value in (0, 1, 2, 3, 3):
+            histogram.record(value)
+
+        self.assertEqual(histogram.percentile(50), 2)
+        self.assertEqual(histogram.percentile(100), 3)
+        self.assertEqual(histogram.to_dict()["buckets"], [(0, 1), (1, 1), (2, 1), (3, 2)])
+        self.assertEqual(histogram.to_dict()["mean"], 9 / 5)
+
+    def test_max_value(self):
+        histogram = Histogram(max_value=1000)
+        histogram.record(10 ** 12)
+        histogram.record(-1)
+
+        self.assertEqual(histogram.max, 1000)
+        self.assertEqual(histogram.min, 0)
+
+
+class RequestStatsTest(unittest.TestCase):
+
+    def test_request_key(self):
+        self.assertEqual(request_key(("call", "get_disk_children", [])), ("call", "get_disk_children"))
+        self.assertEqual(request_key(("param", "proxy_id", "name")), ("param", "name"))
+        self.assertEqual(request_key(("method", "proxy_id", "__str__", ())), ("method", "__str__"))
+        self.assertEqual(request_key(("next", "proxy_id")), ("next", ""))
+        self.assertEqual(request_key(("key", "proxy_id", 1)), ("key", ""))
+
+    def test_stats(self):
+        stats = RequestStats(("server_time", "reply_size"))
+
+        stats.record(("call", "get_disks"), server_time=100, reply_size=10)
+        stats.record(("call", "get_disks"), server_time=300, reply_size=20)
+        stats.record(("param", "name"), server_time=5, reply_size=1)
+
+        snapshot = stats.snapshot()
+        self.assertEqual(set(snapshot.keys()), {"call:get_disks", "param:name"})
+        self.assertEqual(snapshot["call:get_disks"]["count"], 2)
+        self.assertEqual(snapshot["call:get_disks"]["server_time"]["max"], 300)
+        self.assertEqual(snapshot["call:get_disks"]["reply_size"]["min"], 10)
+
+        stats.reset()
+        self.assertEqual(stats.snapshot(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest.mock import MagicMock
+
+import json
+
+from blivetgui.timings import Timeline
+
+
+class TimelineTest(unittest.TestCase):
+
+    def test_disabled(self):
+        timeline = Timeline()
+
+        with timeline.phase("storage.reset()"):
+            pass
+        timeline.mark("first paint")
+
+        self.assertEqual(timeline.phases, [])
+
+    def test_phases(self):
+        timeline = Timeline()
+        timeline.enable("blivet-gui")
+
+        timeline.add("pkexec spawn", 1.0, 3.0)
+        with timeline.phase("load UI"):
+            pass
+        timeline.mark("first paint")
+
+        phases = timeline.phases
+        self.assertEqual([phase["phase"] for phase in phases], ["pkexec spawn", "load UI", "first paint"])
+        self.assertEqual(phases[0], {"component": "blivet-gui", "phase": "pkexec spawn", "start": 1.0, "end": 3.0,
+                                     "duration": 2.0})
+        self.assertGreaterEqual(phases[1]["duration"], 0)
+        self.assertEqual(phases[2]["duration"], 0)
+
+        # phase is recorded even if the block fails
+        with self.assertRaises(RuntimeError):
+            with timeline.phase("init"):
+                raise RuntimeError()
+        self.assertEqual(timeline.phases[-1]["phase"], "init")
+
+        logger = MagicMock()
+        timeline.log(logger)
+        self.assertEqual(logger.info.call_count, 4)
+
+    def test_json(self):
+        timeline = Timeline()
+        timeline.enable("blivet-gui")
+        timeline.add("load UI", 2.0, 2.5)
+
+        daemon_phases = [{"component": "blivet-gui-daemon", "phase": "storage.reset()", "start": 1.5, "end": 4.0,
+                          "duration": 2.5}]
+
+        # phases from both programs sorted by start
+        data = json.loads(timeline.to_json(daemon_phases))
+        self.assertEqual(data["clock"], "monotonic")
+        self.assertEqual([phase["phase"] for phase in data["timeline"]], ["storage.reset()", "load UI"])
+
+
+if __name__ == "__main__":
+    unittest.main()
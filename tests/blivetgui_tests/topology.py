@@ -0,0 +1,628 @@
+# -*- coding: utf-8 -*-
+
+""" Synthetic storage topologies for tests and benchmarks
+
+    Devices built here have the attributes of blivet devices used by
+    blivet-gui (type, format, parents, children, partition geometry...), so
+    :class:`StubBlivetUtils` (BlivetUtils working with the fake device tree
+    instead of blivet.Blivet) and the views can be run against device trees
+    of any size without real hardware:
+
+        storage = generate_topology(1000)
+        utils = StubBlivetUtils(storage)
+        utils.get_disk_children(storage.disks[0])
+
+"""
+
+import itertools
+import threading
+
+from concurrent.futures import Future
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+from blivet.size import Size
+
+from blivetgui.blivet_utils import BlivetUtils
+
+# ---------------------------------------------------------------------------- #
+
+SECTOR_SIZE = 512
+
+# space left before the first partition (in sectors)
+LABEL_OFFSET = 2048
+
+
+def _sectors(size):
+    return int(size) // SECTOR_SIZE
+
+
+def disk_name(index):
+    """ Name of the index-th disk ('sda', ..., 'sdz', 'sdaa'...)
+    """
+
+    name = ""
+    index += 1
+
+    while index:
+        index, rest = divmod(index - 1, 26)
+        name = chr(ord("a") + rest) + name
+
+    return "sd" + name
+
+
+class FakeGeometry(object):
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+    @property
+    def length(self):
+        return self.end - self.start + 1
+
+
+class FakePartedPartition(object):
+
+    def __init__(self, start, end):
+        self.geometry = FakeGeometry(start, end)
+
+
+class FakeFormat(object):
+    """ Format of a fake device
+    """
+
+    def __init__(self, fmt_type=None, exists=True, status=False, mountable=False, mountpoint=None,
+                 label=None, **attrs):
+        self.type = fmt_type
+        self.exists = exists
+        self.status = status
+        self.mountable = mountable
+        self.mountpoint = mountpoint
+        self.system_mountpoint = mountpoint if status else None
+        self.label = label
+
+        self.__dict__.update(attrs)
+
+    def __repr__(self):
+        return "FakeFormat(%s)" % self.type
+
+
+def filesystem(fmt_type="ext4", mountpoint=None, mounted=False):
+    return FakeFormat(fmt_type, status=mounted, mountable=True, mountpoint=mountpoint)
+
+
+class FakeDevice(object):
+    """ Device in the fake device tree
+    """
+
+    def __init__(self, dev_id, name, dev_type, size, parents=None, fmt=None, **attrs):
+        self.id = dev_id
+        self.name = name
+        self.type = dev_type
+        self.size = Size(size)
+        self.current_size = self.size
+        self.exists = True
+        self.protected = False
+        self.removable = False
+        self.model = None
+        self.format = fmt or FakeFormat()
+
+        self.is_disk = dev_type == "disk"
+        self.disk = None
+
+        # partitions only
+        self.is_extended = False
+        self.is_logical = False
+        self.is_primary = False
+        self.parted_partition = None
+
+        self.parents = list(parents or [])
+        self._children = []
+        for parent in self.parents:
+            parent._children.append(self)
+
+        self.__dict__.update(attrs)
+
+    @property
+    def children(self):
+        # blivet returns a new list every time
+        return list(self._children)
+
+    @property
+    def isleaf(self):
+        return not self._children
+
+    @property
+    def disks(self):
+        if self.is_disk:
+            return [self]
+
+        disks = []
+        for parent in self.parents:
+            disks.extend(disk for disk in parent.disks if disk not in disks)
+
+        return disks
+
+    @property
+    def path(self):
+        return "/dev/" + self.name
+
+    def __repr__(self):
+        return "FakeDevice(%d, %s, %s)" % (self.id, self.name, self.type)
+
+
+class FakeDeviceTree(object):
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.actions = []
+
+    def get_device_by_name(self, name):
+        return next((device for device in self.storage.devices if device.name == name), None)
+
+    def get_device_by_id(self, dev_id):
+        return next((device for device in self.storage.devices if device.id == dev_id), None)
+
+
+class FakeStorage(object):
+    """ Fake blivet.Blivet with the device tree
+    """
+
+    def __init__(self):
+        self.devices = []
+        self.devicetree = FakeDeviceTree(self)
+
+        self._ids = itertools.count()
+
+    @property
+    def next_id(self):
+        return next(self._ids)
+
+    def _devices_of_type(self, *types):
+        return [device for device in self.devices if device.type in types]
+
+    @property
+    def disks(self):
+        return self._devices_of_type("disk")
+
+    @property
+    def partitions(self):
+        return self._devices_of_type("partition")
+
+    @property
+    def vgs(self):
+        return self._devices_of_type("lvmvg")
+
+    @property
+    def lvs(self):
+        return self._devices_of_type("lvmlv", "lvmthinpool", "lvmthinlv", "lvmsnapshot")
+
+    @property
+    def mdarrays(self):
+        return self._devices_of_type("mdarray")
+
+    @property
+    def btrfs_volumes(self):
+        return self._devices_of_type("btrfs volume")
+
+    @property
+    def luks_devices(self):
+        return self._devices_of_type("luks/dm-crypt")
+
+# ---------------------------------------------------------------------------- #
+
+
+class TopologyBuilder(object):
+    """ Build fake device tree device by device
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage or FakeStorage()
+
+        self._disks = itertools.count()
+        self._names = {}
+
+    def _device(self, name, dev_type, size, parents=None, fmt=None, **attrs):
+        device = FakeDevice(self.storage.next_id, name, dev_type, size, parents, fmt, **attrs)
+        self.storage.devices.append(device)
+
+        return device
+
+    def _name(self, prefix):
+        """ Unique name with the prefix ('lv' -> 'lv0', 'lv1'...)
+        """
+
+        number = self._names.get(prefix, 0)
+        self._names[prefix] = number + 1
+
+        return "%s%d" % (prefix, number)
+
+    def _set_format(self, device, fmt):
+        # format of a parent can change when new device is created on it
+        device.format = fmt
+
+    def disk(self, size=Size("1 TiB"), label="gpt", fmt=None):
+        """ New disk with an empty disklabel ('msdos' or 'gpt'), no disklabel
+            (None) or with the format
+        """
+
+        if fmt is None and label is not None:
+            end = _sectors(size) - 1
+            fmt = FakeFormat("disklabel", label_type=label, extended_partition=None,
+                             free_regions=[(LABEL_OFFSET, end, Size((end - LABEL_OFFSET + 1) * SECTOR_SIZE))],
+                             next_start=LABEL_OFFSET, next_logical=None, primaries=0, logicals=0)
+
+        return self._device(disk_name(next(self._disks)), "disk", size, fmt=fmt, model="Fake Disk")
+
+    def partition(self, disk, size, fmt=None, kind="primary"):
+        """ New partition allocated after the last partition on the disk (or
+            in the extended partition for logical partitions)
+
+            :param kind: 'primary', 'extended' or 'logical'
+            :type kind: str
+
+        """
+
+        label = disk.format
+
+        if kind == "logical":
+            extended = label.extended_partition
+            start = label.next_logical + 1
+            parent_region = extended.geometry
+        else:
+            start = label.next_start
+            parent_region = FakeGeometry(LABEL_OFFSET, _sectors(disk.size) - 1)
+
+        end = start + _sectors(size) - 1
+        if end > parent_region.end:
+            raise ValueError("Not enough space for partition on %s" % disk.name)
+
+        if kind == "logical":
+            # logical partitions are numbered from 5
+            label.logicals += 1
+            number = 4 + label.logicals
+        else:
+            label.primaries += 1
+            number = label.primaries
+
+        partition = self._device("%s%d" % (disk.name, number), "partition", size, parents=[disk],
+                                 fmt=fmt or FakeFormat(), disk=disk, is_extended=(kind == "extended"),
+                                 is_logical=(kind == "logical"), is_primary=(kind == "primary"),
+                                 parted_partition=FakePartedPartition(start, end))
+
+        if kind == "logical":
+            label.next_logical = end
+        else:
+            label.next_start = end + 1
+
+        if kind == "extended":
+            label.extended_partition = partition.parted_partition
+            label.next_logical = start
+
+        label.free_regions = self._free_regions(disk)
+
+        return partition
+
+    def _free_regions(self, disk):
+        label = disk.format
+        end = _sectors(disk.size) - 1
+        regions = []
+
+        if label.next_start <= end:
+            regions.append((label.next_start, end))
+
+        if label.extended_partition is not None:
+            ext_end = label.extended_partition.geometry.end
+            if label.next_logical + 1 < ext_end:
+                regions.append((label.next_logical + 1, ext_end))
+
+        return sorted((start, end, Size((end - start + 1) * SECTOR_SIZE)) for start, end in regions)
+
+    def luks(self, device, opened=True):
+        """ Encrypt the device; returns the LUKS device (None if not opened)
+        """
+
+        self._set_format(device, FakeFormat("luks", status=opened, map_name="luks-" + device.name))
+
+        if not opened:
+            return None
+
+        return self._device("luks-" + device.name, "luks/dm-crypt", Size(device.size - Size("2 MiB")),
+                            parents=[device], slave=device)
+
+    def lvm_vg(self, pvs, name=None):
+        for pv in pvs:
+            self._set_format(pv, FakeFormat("lvmpv", pe_start=Size("1 MiB")))
+
+        pe_size = Size("4 MiB")
+        size = Size(sum(int(pv.size) - int(pv.format.pe_start) for pv in pvs) // int(pe_size) * int(pe_size))
+
+        vg = self._device(name or self._name("vg"), "lvmvg", size, parents=pvs, fmt=FakeFormat(exists=True),
+                          pvs=list(pvs), pe_size=pe_size, lvs=[])
+        self._set_vg_free(vg, size)
+
+        return vg
+
+    def _set_vg_free(self, vg, free):
+        vg.free_space = Size(free)
+        vg.free_extents = int(free) // int(vg.pe_size)
+
+    def _allocate_lv(self, vg, size):
+        size = Size(int(size) // int(vg.pe_size) * int(vg.pe_size))
+        if size > vg.free_space:
+            raise ValueError("Not enough space in %s" % vg.name)
+
+        self._set_vg_free(vg, int(vg.free_space) - int(size))
+
+        return size
+
+    def lvm_lv(self, vg, size, fmt=None, name=None):
+        lv = self._device(name or self._name("lv"), "lvmlv", self._allocate_lv(vg, size), parents=[vg],
+                          fmt=fmt or filesystem(), vg=vg)
+        vg.lvs.append(lv)
+
+        return lv
+
+    def thin_pool(self, vg, size, name=None):
+        pool = self._device(name or self._name("pool"), "lvmthinpool", self._allocate_lv(vg, size), parents=[vg],
+                            vg=vg, lvs=[])
+        vg.lvs.append(pool)
+
+        return pool
+
+    def thin_lv(self, pool, size, fmt=None, name=None):
+        # thin LVs can be overcommitted
+        lv = self._device(name or self._name("thinlv"), "lvmthinlv", size, parents=[pool],
+                          fmt=fmt or filesystem(), vg=pool.vg, pool=pool)
+        pool.lvs.append(lv)
+
+        return lv
+
+    def snapshot(self, origin, size, name=None):
+        vg = origin.vg
+        snapshot = self._device(name or origin.name + "_snap", "lvmsnapshot", self._allocate_lv(vg, size),
+                                parents=[vg], fmt=FakeFormat(origin.format.type), vg=vg, origin=origin)
+        vg.lvs.append(snapshot)
+
+        return snapshot
+
+    def mdarray(self, members, level="raid1", fmt=None, name=None):
+        for member in members:
+            self._set_format(member, FakeFormat("mdmember"))
+
+        if level == "raid0":
+            size = sum(int(member.size) for member in members)
+        else:
+            size = min(int(member.size) for member in members)
+
+        return self._device(name or self._name("md"), "mdarray", size, parents=members, fmt=fmt or filesystem(),
+                            members=list(members), level=level)
+
+    def btrfs_volume(self, members, name=None):
+        for member in members:
+            self._set_format(member, FakeFormat("btrfs"))
+
+        return self._device(name or self._name("btrfs"), "btrfs volume", sum(int(member.size) for member in members),
+                            parents=members, fmt=filesystem("btrfs"), members=list(members), subvolumes=[])
+
+    def btrfs_subvolume(self, volume, name=None):
+        subvolume = self._device(name or self._name("subvol"), "btrfs subvolume", volume.size, parents=[volume],
+                                 fmt=filesystem("btrfs"), volume=volume)
+        volume.subvolumes.append(subvolume)
+
+        return subvolume
+
+
+def _add_group(builder, lvs, logicals, subvolumes):
+    """ Add a group of disks with all supported kinds of devices:
+
+          * msdos disk with primary, extended and logical partitions
+          * two gpt disks with LVM (one PV encrypted) with 'lvs' LVs, thin
+            pool and snapshot
+          * two gpt disks with RAID1 array
+          * disk without disklabel with btrfs volume and subvolumes
+
+    """
+
+    msdos = builder.disk(Size("500 GiB"), label="msdos")
+    builder.partition(msdos, Size("1 GiB"), filesystem("ext4", "/boot"))
+    builder.partition(msdos, Size("8 GiB"), FakeFormat("swap"))
+    builder.partition(msdos, Size("400 GiB"), kind="extended")
+    for _i in range(logicals):
+        builder.partition(msdos, Size("1 GiB"), filesystem("ext4"), kind="logical")
+
+    lvm_size = Size("%d GiB" % max(100, lvs * 2))
+    pv1 = builder.partition(builder.disk(lvm_size + Size("10 GiB")), lvm_size)
+    pv2 = builder.partition(builder.disk(lvm_size + Size("10 GiB")), lvm_size)
+    vg = builder.lvm_vg([builder.luks(pv1), pv2])
+    lv_size = Size(int(lvm_size) // max(lvs, 1))
+    for i in range(lvs):
+        builder.lvm_lv(vg, lv_size, filesystem("xfs" if i % 2 else "ext4"))
+    pool = builder.thin_pool(vg, Size("10 GiB"))
+    builder.thin_lv(pool, Size("20 GiB"))
+    builder.snapshot(vg.lvs[0], Size("1 GiB"))
+
+    members = [builder.partition(builder.disk(Size("200 GiB")), Size("100 GiB")) for _i in range(2)]
+    builder.mdarray(members)
+
+    volume = builder.btrfs_volume([builder.disk(Size("200 GiB"), label=None)])
+    for _i in range(subvolumes):
+        builder.btrfs_subvolume(volume)
+
+
+def generate_topology(devices=100, lvs=None):
+    """ Generate device tree with (at least) the given number of devices
+
+        Device tree consists of groups of disks with all supported device
+        types (see :func:`_add_group`), number of LVs in VGs grows with the
+        number of devices (up to hundreds of LVs per VG).
+
+        :param devices: number of devices
+        :type devices: int
+        :param lvs: number of LVs in every VG (None to derive from 'devices')
+        :type lvs: int
+        :rtype: :class:`FakeStorage`
+
+    """
+
+    if lvs is None:
+        lvs = max(2, min(300, devices // 20))
+
+    builder = TopologyBuilder()
+
+    while len(builder.storage.devices) < devices:
+        _add_group(builder, lvs=lvs, logicals=4, subvolumes=3)
+
+    return builder.storage
+
+# ---------------------------------------------------------------------------- #
+
+
+class StubBlivetUtils(BlivetUtils):
+    """ BlivetUtils working with a fake device tree (nothing is scanned,
+        free regions of disks are taken from their fake disklabels)
+
+        ..note.: lookups using the device index (get_device_by_name...) are
+                 not available
+    """
+
+    def __init__(self, storage):  # pylint: disable=super-init-not-called
+        self.kickstart = False
+        self.storage = storage
+
+        self._snapshot_generation = 0
+        self._snapshot_keys = {}
+
+        self._free_regions = {}
+        self._free_regions_generation = 0
+        self._free_regions_lock = threading.Lock()
+        self._pseudo_devices = {}
+
+    def _get_free_regions(self, disk):
+        return list(disk.format.free_regions)
+
+
+class StubClient(object):
+    """ Client calling StubBlivetUtils methods directly (for the views)
+    """
+
+    def __init__(self, blivet_utils):
+        self.blivet_utils = blivet_utils
+
+    def remote_call(self, method, *args):
+        return getattr(self.blivet_utils, method)(*args)
+
+    def call_async(self, method, *args, callback=None):
+        future = Future()
+        future.set_result(self.remote_call(method, *args))
+
+        if callback:
+            callback(future)
+
+        return future
+
+    def calls_async(self, calls, callback=None):
+        future = Future()
+        future.set_result([self.remote_call(method, *args) for method, args in calls])
+
+        if callback:
+            callback(future)
+
+        return future
+
+    @contextmanager
+    def prefetch(self, devices, params):  # pylint: disable=unused-argument
+        yield
+
+
+class _TreeIter(object):
+
+    def __init__(self, values, parent, index):
+        self.values = values
+        self.parent = parent
+        self.index = index
+        self.children = []
+
+
+class FakeTreeStore(object):
+    """ Subset of Gtk.TreeStore used by ListPartitions and LogicalView (so the
+        views can run without a display)
+    """
+
+    def __init__(self):
+        self._rows = []
+
+    def _siblings(self, treeiter):
+        return treeiter.parent.children if treeiter.parent else self._rows
+
+    def append(self, parent, values):
+        siblings = parent.children if parent else self._rows
+        treeiter = _TreeIter(list(values), parent, len(siblings))
+        siblings.append(treeiter)
+
+        return treeiter
+
+    def clear(self):
+        self._rows = []
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, treeiter):
+        return treeiter.values
+
+    def get_iter_first(self):
+        return self._rows[0] if self._rows else None
+
+    def iter_next(self, treeiter):
+        siblings = self._siblings(treeiter)
+        return siblings[treeiter.index + 1] if treeiter.index + 1 < len(siblings) else None
+
+    def iter_children(self, treeiter):
+        return treeiter.children[0] if treeiter.children else None
+
+    def iter_has_child(self, treeiter):
+        return bool(treeiter.children)
+
+    def iter_n_children(self, treeiter):
+        return len(treeiter.children)
+
+    def iter_depth(self, treeiter):
+        depth = 0
+        while treeiter.parent:
+            depth += 1
+            treeiter = treeiter.parent
+
+        return depth
+
+    def foreach(self, func, *data):
+        def _walk(treeiters, path):
+            for treeiter in treeiters:
+                if func(self, path + (treeiter.index,), treeiter, *data) or \
+                   _walk(treeiter.children, path + (treeiter.index,)):
+                    return True
+            return False
+
+        _walk(self._rows, ())
+
+
+def stub_blivet_gui(blivet_utils):
+    """ Fake BlivetGUI for the views (ListPartitions, LogicalView) calling
+        the BlivetUtils methods directly
+
+        :param blivet_utils: BlivetUtils with the fake device tree
+        :type blivet_utils: :class:`StubBlivetUtils`
+
+    """
+
+    partitions_list = FakeTreeStore()
+
+    builder = MagicMock()
+    builder.get_object.side_effect = lambda name: partitions_list if name == "liststore_logical" else MagicMock()
+
+    blivet_gui = MagicMock(kickstart_mode=False, builder=builder, client=StubClient(blivet_utils))
+    # there is no device snapshot, the views read the devices themselves
+    blivet_gui.device_snapshot.get.return_value = None
+
+    return blivet_gui
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from blivet.size import Size
+
+from blivetgui.device_snapshot import DeviceSnapshot
+from blivetgui.list_partitions import ListPartitions
+from blivetgui.visualization.logical_view import LogicalView, RECT_MIN_SIZE
+
+from blivetgui_tests.topology import TopologyBuilder, StubBlivetUtils, generate_topology, disk_name, \
+    filesystem, stub_blivet_gui
+
+
+class TopologyTest(unittest.TestCase):
+
+    def test_disk_name(self):
+        self.assertEqual([disk_name(i) for i in (0, 25, 26, 27, 701, 702)],
+                         ["sda", "sdz", "sdaa", "sdab", "sdzz", "sdaaa"])
+
+    def test_generate(self):
+        for devices in (10, 100, 1000):
+            storage = generate_topology(devices)
+            self.assertGreaterEqual(len(storage.devices), devices)
+
+            # ids and names are unique
+            self.assertEqual(len(set(device.id for device in storage.devices)), len(storage.devices))
+            self.assertEqual(len(set(device.name for device in storage.devices)), len(storage.devices))
+
+            types = set(device.type for device in storage.devices)
+            self.assertEqual(types, set(["disk", "partition", "luks/dm-crypt", "lvmvg", "lvmlv", "lvmthinpool",
+                                         "lvmthinlv", "lvmsnapshot", "mdarray", "btrfs volume",
+                                         "btrfs subvolume"]))
+
+        # number of LVs grows with the number of devices
+        self.assertEqual(len(generate_topology(1000).vgs[0].lvs), 50 + 2)
+        self.assertEqual(len(generate_topology(10, lvs=200).vgs[0].lvs), 200 + 2)
+
+    def test_partitions(self):
+        builder = TopologyBuilder()
+
+        disk = builder.disk(Size("10 GiB"), label="msdos")
+        part1 = builder.partition(disk, Size("1 GiB"), filesystem())
+        extended = builder.partition(disk, Size("5 GiB"), kind="extended")
+        logical = builder.partition(disk, Size("1 GiB"), kind="logical")
+
+        self.assertEqual([part.name for part in disk.children], ["sda1", "sda2", "sda5"])
+        self.assertEqual(disk.format.extended_partition, extended.parted_partition)
+        self.assertGreater(logical.parted_partition.geometry.start, extended.parted_partition.geometry.start)
+        self.assertEqual(logical.disks, [disk])
+        self.assertTrue(part1.isleaf)
+
+        # free space after the extended partition and inside of it
+        regions = disk.format.free_regions
+        self.assertEqual(len(regions), 2)
+        self.assertEqual(regions[0][0], logical.parted_partition.geometry.end + 1)
+        self.assertEqual(regions[1][0], extended.parted_partition.geometry.end + 1)
+
+        with self.assertRaises(ValueError):
+            builder.partition(disk, Size("10 GiB"))
+
+    def test_disk_children(self):
+        storage = generate_topology(10)
+        utils = StubBlivetUtils(storage)
+        msdos, gpt = storage.disks[0], storage.disks[1]
+
+        children = utils.get_disk_children(msdos)
+        self.assertEqual([part.name for part in children.partitions[:3]], ["sda1", "sda2", "sda3"])
+        self.assertEqual(children.partitions[3].type, "free space")
+        self.assertEqual(children.extended.name, "sda3")
+        self.assertEqual([part.name for part in children.logicals[:4]], ["sda5", "sda6", "sda7", "sda8"])
+        self.assertTrue(children.logicals[4].is_logical)
+
+        children = utils.get_disk_children(gpt)
+        self.assertEqual([part.type for part in children.partitions], ["partition", "free space"])
+        self.assertIsNone(children.extended)
+
+        # btrfs on disk without disklabel
+        btrfs_disk = storage.btrfs_volumes[0].parents[0]
+        self.assertEqual(utils.get_disk_children(btrfs_disk).partitions, storage.btrfs_volumes)
+
+    def test_roots(self):
+        storage = generate_topology(10)
+        utils = StubBlivetUtils(storage)
+
+        vg = storage.vgs[0]
+        # one of the PVs is encrypted
+        self.assertEqual(utils.get_roots(vg), set(pv.disks[0] for pv in vg.pvs))
+        self.assertEqual(utils.get_roots(storage.mdarrays[0]), set(storage.disks[3:5]))
+        self.assertEqual(utils.get_roots(storage.btrfs_volumes[0]), set([storage.disks[5]]))
+
+        # VG with free space
+        self.assertEqual(utils.get_children(vg)[-1].type, "free space")
+        self.assertEqual(utils.get_group_device(vg.parents[0].slave), vg)
+
+    def test_devicetree_snapshot(self):
+        storage = generate_topology(100)
+        utils = StubBlivetUtils(storage)
+
+        snapshot = DeviceSnapshot(utils.get_devicetree_snapshot())
+        self.assertEqual(len(snapshot.devices), len(storage.devices))
+        self.assertEqual(len(snapshot.group_devices["lvm"]), len(storage.vgs))
+
+        vg_info = snapshot.devices[storage.vgs[0].id]
+        self.assertEqual(len(vg_info.children), len(storage.vgs[0].lvs))
+
+    def test_views(self):
+        storage = generate_topology(10)
+        utils = StubBlivetUtils(storage)
+        blivet_gui = stub_blivet_gui(utils)
+
+        list_partitions = ListPartitions(blivet_gui)
+
+        # extended partition with logical partitions and free space
+        list_partitions._load_children(storage.disks[0], storage.disks[0], utils.get_disk_children(storage.disks[0]))
+        store = list_partitions.partitions_list
+        self.assertEqual(len(store), 4)
+        extended_iter = store.iter_next(store.iter_next(store.get_iter_first()))
+        self.assertEqual(store[extended_iter][1], "sda3")
+        self.assertEqual(store.iter_n_children(extended_iter), 5)
+
+        # LVs, thin pool and free space in the VG; thin LVs are loaded together
+        # with the other devices (no blocking calls)
+        store.clear()
+        vg = storage.vgs[0]
+        client = blivet_gui.client
+        blivet_gui.client = MagicMock(wraps=client)
+        list_partitions._load_children(vg, vg, utils.get_children(vg))
+        self.assertEqual(len(store), len(vg.lvs) + 1)
+        blivet_gui.client.remote_call.assert_not_called()
+        # one batch -- children of the thin pool
+        self.assertEqual(blivet_gui.client.calls_async.call_count, 1)
+        blivet_gui.client = client
+
+        # rectangles for all devices
+        with patch("blivetgui.visualization.logical_view.Gtk", MagicMock()):
+            logical_view = LogicalView(blivet_gui)
+        logical_view._devices_list = store
+        logical_view._view_width = 10000
+
+        widths = logical_view._compute_rect_widths()
+        self.assertEqual(len(widths), len(vg.lvs) + 2)  # + thin LV
+        self.assertTrue(all(width >= RECT_MIN_SIZE // 2 for width in widths.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest.mock import MagicMock
+
+import queue
+import threading
+
+from blivetgui.udev_monitor import UdevMonitor
+
+
+class FakeMonitor(object):
+    """ Monitor returning events from a queue
+    """
+
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def start(self):
+        pass
+
+    def poll(self, timeout=None):
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def add_event(self, action, sys_path):
+        self.events.put(MagicMock(action=action, sys_path=sys_path))
+
+
+class UdevMonitorTest(unittest.TestCase):
+
+    def test_debounce(self):
+        fake_monitor = FakeMonitor()
+        batches = []
+        reported = threading.Event()
+
+        def _callback(events):
+            batches.append(events)
+            reported.set()
+
+        monitor = UdevMonitor(_callback, monitor=fake_monitor)
+        monitor.debounce = 0.2
+        monitor.poll_interval = 0.1
+        monitor.start()
+
+        # burst of events is reported at once, only the last event for every device
+        for i in range(100):
+            fake_monitor.add_event("add", "/sys/block/sd%d" % i)
+        fake_monitor.add_event("change", "/sys/block/sd0")
+
+        self.assertTrue(reported.wait(5))
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(len(batches[0]), 100)
+        self.assertEqual(batches[0][-1], ("change", "/sys/block/sd0"))
+
+        # new batch for events arriving later
+        reported.clear()
+        fake_monitor.add_event("remove", "/sys/block/sd1")
+        self.assertTrue(reported.wait(5))
+        self.assertEqual(batches[1], [("remove", "/sys/block/sd1")])
+
+        monitor.stop()
+
+    def test_max_delay(self):
+        fake_monitor = FakeMonitor()
+        monitor = UdevMonitor(MagicMock(), monitor=fake_monitor)
+        monitor.debounce = 5
+        monitor.max_delay = 0.2
+
+        # events arriving all the time -- batch is reported after max_delay
+        stop = threading.Event()
+
+        def _events():
+            while not stop.is_set():
+                fake_monitor.add_event("change", "/sys/block/sda")
+                stop.wait(0.01)
+
+        producer = threading.Thread(target=_events)
+        producer.start()
+
+        events = monitor._collect_events()
+        stop.set()
+        producer.join()
+
+        self.assertEqual(events, [("change", "/sys/block/sda")])
+
+    def test_suppress(self):
+        fake_monitor = FakeMonitor()
+        monitor = UdevMonitor(MagicMock(), monitor=fake_monitor)
+        monitor.debounce = 0.1
+        monitor.poll_interval = 0.1
+
+        # events received while suppressed are dropped
+        monitor.suppress()
+        fake_monitor.add_event("change", "/sys/block/sda")
+        self.assertTrue(monitor._drop_suppressed())
+
+        # nested suppression
+        monitor.suppress()
+        monitor.resume()
+        self.assertTrue(monitor._drop_suppressed())
+
+        # events queued before resuming are dropped too
+        fake_monitor.add_event("change", "/sys/block/sdb")
+        monitor.resume()
+        fake_monitor.add_event("add", "/sys/block/sdc")
+        fake_monitor.add_event("change", "/sys/block/sdc")
+        self.assertTrue(monitor._drop_suppressed())
+        self.assertTrue(fake_monitor.events.empty())
+
+        # and new events are reported again
+        fake_monitor.add_event("remove", "/sys/block/sdd")
+        self.assertEqual(monitor._collect_events(), [("remove", "/sys/block/sdd")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,21 @@
 # -*- coding: utf-8 -*-
 
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
 
-from blivetgui.blivet_utils import BlivetUtils, FreeSpaceDevice
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from blivetgui.blivet_utils import BlivetUtils, DaemonThreadPool, FreeSpaceDevice, ScopedStorage
 
 from blivet.size import Size
 
 
+class LUKSError(Exception):
+    pass
+
+
 class FreeSpaceDeviceTest(unittest.TestCase):
 
     def test_free_basic(self):
@@ -107,6 +115,532 @@ class BlivetUtilsTest(unittest.TestCase):
         self.assertEqual(res.min_size, Size("1 MiB"))
         self.assertEqual(res.max_size, Size("1 GiB"))
 
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    def test_size_info(self):
+        utils = BlivetUtils()
+        utils._size_info = {}
+        utils._size_info_lock = threading.Lock()
+        utils._size_info_executor = ThreadPoolExecutor(max_workers=2)
+        utils._size_info_demand_executor = ThreadPoolExecutor(max_workers=2)
+        utils._size_info_cache = MagicMock()
+        utils._size_info_cache.apply.return_value = False
+        utils.size_info_timeout = 5
+
+        # formats are probed in parallel -- this would time out if they were
+        # probed one by one
+        barrier = threading.Barrier(2, timeout=5)
+        formats = [MagicMock(type="ext4", resizable=True), MagicMock(type="ntfs", resizable=True)]
+        for fmt in formats:
+            fmt.update_size_info.side_effect = barrier.wait
+
+        devices = [MagicMock(type="partition", format=fmt) for fmt in formats]
+        devices.append(MagicMock(type="disk"))
+        utils.storage = MagicMock(devices=devices)
+
+        # probing is started in background
+        utils._update_min_sizes_info()
+        self.assertEqual(len(utils._size_info), 2)
+
+        for fmt in formats:
+            utils._wait_size_info(fmt)
+
+        # size information is probed only once for every format
+        utils._wait_size_info(formats[0])
+        self.assertEqual(formats[0].update_size_info.call_count, 1)
+
+        # format not probed in background is probed when needed
+        fmt = MagicMock()
+        utils._wait_size_info(fmt)
+        self.assertEqual(fmt.update_size_info.call_count, 1)
+
+        # probed information is saved to the cache
+        utils._size_info_cache.store.assert_any_call(formats[0])
+
+        # no probing when the information is in the cache
+        utils._size_info_cache.apply.return_value = True
+        fmt = MagicMock()
+        utils._wait_size_info(fmt)
+        self.assertFalse(fmt.update_size_info.called)
+        utils._size_info_cache.apply.return_value = False
+
+        # probing takes too long
+        release = threading.Event()
+        device = MagicMock(type="partition", size=Size("1 GiB"), resizable=True)
+        device.format = MagicMock(type="ext4", exists=True, resizable=True)
+        device.format.update_size_info.side_effect = lambda: release.wait(5)
+        utils.size_info_timeout = 0.1
+
+        res = utils.device_resizable(device)
+        self.assertFalse(res.resizable)
+        self.assertIsNotNone(res.error)
+
+        release.set()
+        utils._size_info_executor.shutdown(wait=True)
+        utils._size_info_demand_executor.shutdown(wait=True)
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    def test_size_info_priority(self):
+        utils = BlivetUtils()
+        utils._size_info = {}
+        utils._size_info_lock = threading.Lock()
+        utils._size_info_executor = ThreadPoolExecutor(max_workers=1)
+        utils._size_info_demand_executor = ThreadPoolExecutor(max_workers=1)
+        utils._size_info_cache = MagicMock()
+        utils._size_info_cache.apply.return_value = False
+        utils.size_info_timeout = 5
+
+        # background probing is blocked by a slow format
+        release = threading.Event()
+        formats = [MagicMock(type="ext4", resizable=True) for _i in range(3)]
+        formats[0].update_size_info.side_effect = lambda: release.wait(5)
+        utils.storage = MagicMock(devices=[MagicMock(type="partition", format=fmt) for fmt in formats])
+
+        utils.size_info_prefetch = False
+        utils._update_min_sizes_info()
+        self.assertEqual(utils._size_info, {})
+
+        utils.size_info_prefetch = True
+        utils._update_min_sizes_info()
+        probes = [utils._size_info[id(fmt)] for fmt in formats]
+
+        # format waiting in the queue is probed right away when needed
+        utils._wait_size_info(formats[1])
+        self.assertEqual(formats[1].update_size_info.call_count, 1)
+        self.assertTrue(probes[1].future.cancelled())
+
+        # timeout starts when the probing starts, not when waiting for it
+        utils.size_info_timeout = 0.1
+        probes[0].start_time -= 1
+        with self.assertRaises(FutureTimeoutError):
+            utils._wait_size_info(formats[0])
+
+        # reset cancels probes that haven't started yet
+        utils._update_min_sizes_info()
+        self.assertTrue(probes[2].future.cancelled())
+        self.assertFalse(formats[2].update_size_info.called)
+
+        release.set()
+        utils._size_info_executor.shutdown(wait=True)
+        utils._size_info_demand_executor.shutdown(wait=True)
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    def test_partitioning_scope(self):
+        utils = BlivetUtils()
+
+        disks = [MagicMock(id=i, type="disk") for i in range(3)]
+        existing = [MagicMock(type="partition", exists=True, disk=disk) for disk in disks]
+        new_part = MagicMock(type="partition", exists=False, req_disks=[disks[0]], req_grow=True, disk=disks[0])
+
+        utils.storage = MagicMock(partitions=existing + [new_part], partitioned=disks, size_sets=[])
+
+        # only disk of the new partition is allocated
+        scope = utils._partitioning_scope([MagicMock(device=new_part)])
+        self.assertEqual(scope, [disks[0]])
+
+        scoped = ScopedStorage(utils.storage, scope)
+        self.assertEqual(scoped.partitioned, [disks[0]])
+        self.assertEqual(scoped.partitions, [existing[0], new_part])
+        # other attributes are taken from (and set to) the real storage
+        self.assertEqual(scoped.devicetree, utils.storage.devicetree)
+        scoped.size_sets = ["set"]
+        self.assertEqual(utils.storage.size_sets, ["set"])
+        utils.storage.size_sets = []
+
+        # no partitions changed -- nothing to allocate
+        self.assertEqual(utils._partitioning_scope([MagicMock(device=MagicMock(type="lvmlv"))]), [])
+
+        # unknown actions -- all disks
+        self.assertIsNone(utils._partitioning_scope(None))
+
+        # request growing on multiple disks
+        other_part = MagicMock(type="partition", exists=False, req_disks=[disks[1], disks[2]], req_grow=True,
+                               disk=disks[1])
+        utils.storage.partitions.append(other_part)
+        self.assertIsNone(utils._partitioning_scope([MagicMock(device=new_part)]))
+
+        # request partially in scope
+        other_part.req_grow = False
+        self.assertEqual(utils._partitioning_scope([MagicMock(device=new_part)]), [disks[0]])
+        other_part.req_disks = [disks[0], disks[1]]
+        self.assertIsNone(utils._partitioning_scope([MagicMock(device=new_part)]))
+
+        # growth sets
+        other_part.req_disks = [disks[1]]
+        utils.storage.size_sets = [MagicMock()]
+        self.assertIsNone(utils._partitioning_scope([MagicMock(device=new_part)]))
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    @patch("blivetgui.blivet_utils.blivet.partitioning.do_partitioning")
+    def test_do_partitioning(self, do_partitioning):
+        utils = BlivetUtils()
+        utils.storage = MagicMock()
+        utils._invalidate_free_regions = MagicMock()
+        utils._device_index = MagicMock()
+
+        utils._partitioning_scope = MagicMock(return_value=None)
+        utils._do_partitioning()
+        do_partitioning.assert_called_once_with(utils.storage)
+        utils._invalidate_free_regions.assert_called_once_with(None)
+
+        do_partitioning.reset_mock()
+        scope = [MagicMock(id=1)]
+        utils._partitioning_scope = MagicMock(return_value=scope)
+        utils._do_partitioning([MagicMock()])
+        self.assertTrue(isinstance(do_partitioning.call_args[0][0], ScopedStorage))
+        utils._invalidate_free_regions.assert_called_with(scope)
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    @patch("blivetgui.blivet_utils.blivet.partitioning.get_free_regions")
+    def test_free_regions(self, get_free_regions):
+        utils = BlivetUtils()
+        utils.storage = MagicMock(next_id=0)
+        utils._free_regions = {}
+        utils._free_regions_generation = 0
+        utils._free_regions_lock = threading.Lock()
+        utils._pseudo_devices = {}
+        utils._device_index = MagicMock()
+
+        disk1 = MagicMock(id=1, is_disk=True, format=MagicMock(type="disklabel", extended_partition=None))
+        disk2 = MagicMock(id=2, is_disk=True, format=MagicMock(type="disklabel", extended_partition=None))
+        utils.storage.disks = [disk1, disk2]
+
+        region = MagicMock(start=2048, end=4196351, length=4194304, device=MagicMock(sectorSize=512))
+        get_free_regions.return_value = [region]
+
+        # free regions are computed only once for every disk
+        free = utils.get_free_disks_regions()
+        self.assertEqual(len(free), 2)
+        self.assertEqual(free[0].size, Size("2 GiB"))
+        self.assertEqual((free[0].start, free[0].end), (2048, 4196351))
+        self.assertEqual(len(utils._get_free_primary(disk1)), 1)
+        self.assertEqual(get_free_regions.call_count, 2)
+
+        # action on a partition on disk1 -- only disk1 is scanned again
+        action = MagicMock(device=MagicMock(is_disk=False, disks=[disk1]))
+        utils._on_action_changed(action=action)
+        utils._device_index.update.assert_called_once_with(action, False)
+        utils.get_free_disks_regions()
+        self.assertEqual(get_free_regions.call_count, 3)
+        get_free_regions.assert_called_with([disk1], align=True)
+
+        # partitioning all disks
+        utils._invalidate_free_regions(None)
+        utils.get_free_disks_regions()
+        self.assertEqual(get_free_regions.call_count, 5)
+
+        # device tree changed while computing the regions -- result is not saved
+        def _get_free_regions(_disks, align):
+            utils._invalidate_free_regions([disk2])
+            return [region]
+
+        get_free_regions.side_effect = _get_free_regions
+        utils._invalidate_free_regions([disk1])
+        utils._get_free_regions(disk1)
+        self.assertNotIn(disk1.id, utils._free_regions.keys())
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    @patch("blivetgui.blivet_utils.blivet.partitioning.get_free_regions")
+    def test_pseudo_devices(self, get_free_regions):
+        utils = BlivetUtils()
+        utils.storage = MagicMock()
+        type(utils.storage).next_id = PropertyMock(side_effect=range(100))
+        utils._free_regions = {}
+        utils._free_regions_generation = 0
+        utils._free_regions_lock = threading.Lock()
+        utils._pseudo_devices = {}
+
+        disk1 = MagicMock(id=1, is_disk=True, disks=[], format=MagicMock(type="disklabel", extended_partition=None))
+        disk2 = MagicMock(id=2, is_disk=True, disks=[], format=MagicMock(type="ext4"))
+        utils.storage.disks = [disk1, disk2]
+
+        region = MagicMock(start=2048, end=4196351, length=4194304, device=MagicMock(sectorSize=512))
+        get_free_regions.return_value = [region]
+
+        # the same free space and raw format is represented by the same object
+        free = utils.get_free_disks_regions()
+        self.assertEqual(len(free), 1)
+        self.assertIs(utils.get_disk_children(disk1).partitions[0], free[0])
+        self.assertIs(utils.get_free_disks_regions()[0], free[0])
+
+        raw = utils.get_disk_children(disk2).partitions[0]
+        self.assertEqual(raw.type, "raw format")
+        self.assertIs(utils.get_disk_children(disk2).partitions[0], raw)
+        self.assertNotEqual(raw.id, free[0].id)
+
+        # disk1 changed -- new free space device, raw format device on disk2 stays
+        utils._invalidate_free_regions([disk1])
+        self.assertIsNot(utils.get_free_disks_regions()[0], free[0])
+        self.assertIs(utils.get_disk_children(disk2).partitions[0], raw)
+
+        # new format on disk2
+        disk2.format = MagicMock(type="xfs")
+        self.assertIsNot(utils.get_disk_children(disk2).partitions[0], raw)
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    @patch("blivetgui.blivet_utils.blivet.udev")
+    def test_luks_decrypt(self, udev):
+        utils = BlivetUtils()
+        utils.storage = MagicMock()
+        utils._invalidate_free_regions = MagicMock()
+        utils._device_index = MagicMock()
+        utils._devicetree_reloaded = MagicMock()
+
+        disk = MagicMock()
+        device = MagicMock(disks=[disk], format=MagicMock(map_name="luks-1234"))
+
+        luks_info = {"sysfs": "/devices/virtual/block/dm-0"}
+        lv_info = {"sysfs": "/devices/virtual/block/dm-1"}
+        holders = {"/devices/virtual/block/dm-0": [lv_info], "/devices/virtual/block/dm-1": []}
+
+        udev.get_device.return_value = luks_info
+        udev.device_get_sysfs_path.side_effect = lambda info: info["sysfs"]
+        udev.device_get_holders.side_effect = lambda info: holders[info["sysfs"]]
+
+        # only the new device and its holders are scanned
+        self.assertTrue(utils.luks_decrypt(device, "passphrase"))
+        udev.get_device.assert_called_once_with(device_node="/dev/mapper/luks-1234")
+        self.assertEqual([c[0][0] for c in utils.storage.devicetree.handle_device.call_args_list], [luks_info, lv_info])
+        self.assertFalse(any(c[1]["update_orig_fmt"] for c in utils.storage.devicetree.handle_device.call_args_list))
+        utils.storage.devicetree.populate.assert_not_called()
+        utils._device_index.rebuild.assert_called_once_with()
+
+        # new device not found -- full populate
+        udev.get_device.return_value = None
+        self.assertTrue(utils.luks_decrypt(device, "passphrase"))
+        utils.storage.devicetree.populate.assert_called_once_with()
+        utils._devicetree_reloaded.assert_called_once_with()
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    def test_older_blivet(self):
+        utils = BlivetUtils()
+        utils.storage = MagicMock()
+        del utils.storage.devicetree.drop_device_info_cache
+        del utils.storage.devicetree.handle_device
+
+        utils._drop_device_info_cache()
+        utils.storage.devicetree.drop_lvm_cache.assert_called_once_with()
+
+        # single devices can't be added -- all devices are scanned
+        utils._scan_devices([{"name": "sda"}])
+        utils.storage.devicetree.populate.assert_called_once_with()
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    @patch("blivetgui.blivet_utils.blivet.udev", MagicMock(spec=["device_get_sysfs_path", "device_get_slaves"]))
+    def test_older_udev(self):
+        utils = BlivetUtils()
+        utils.storage = MagicMock()
+
+        # holders of a device can't be found -- all devices are scanned
+        utils._scan_devices([{"name": "sda"}])
+        utils.storage.devicetree.handle_device.assert_not_called()
+        utils.storage.devicetree.populate.assert_called_once_with()
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    @patch("blivetgui.blivet_utils.blivet.errors.LUKSError", LUKSError)
+    def test_luks_decrypt_all(self):
+        utils = BlivetUtils()
+        utils._populate_luks_devices = MagicMock()
+
+        started = []
+        barrier = threading.Barrier(2, timeout=5)
+
+        def _setup(device):
+            # devices are opened in parallel
+            started.append(device)
+            barrier.wait()
+            if device.passphrase != "passphrase":
+                raise LUKSError("wrong passphrase")
+
+        devices = [MagicMock(passphrase="passphrase"), MagicMock(passphrase="other")]
+        for device in devices:
+            device.format.setup.side_effect = functools.partial(_setup, device)
+
+        result = utils.luks_decrypt_all(devices, "passphrase")
+
+        self.assertEqual(result.decrypted, [devices[0]])
+        self.assertEqual(result.failed, [devices[1]])
+        for device in devices:
+            device.format._set_passphrase.assert_called_once_with("passphrase")
+
+        # device tree updated only once for all decrypted devices
+        utils._populate_luks_devices.assert_called_once_with([devices[0]])
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    @patch("blivetgui.blivet_utils.blivet.udev")
+    def test_reload_device(self, udev):
+        utils = BlivetUtils()
+        utils.storage = MagicMock()
+        utils._invalidate_free_regions = MagicMock()
+        utils._device_index = MagicMock()
+
+        disk1 = MagicMock(id=1, is_disk=True, sysfs_path="/sys/block/sda")
+        disk2 = MagicMock(id=2, is_disk=True, sysfs_path="/sys/block/sdb")
+        disk3 = MagicMock(id=3, is_disk=True, sysfs_path="/sys/block/sdc")
+        vg = MagicMock(id=4, is_disk=False, disks=[disk1])
+        lv = MagicMock(id=5, is_disk=False, disks=[disk1, disk2])
+
+        dependents = {disk1.id: [vg, lv], disk2.id: [lv], disk3.id: []}
+        utils.storage.devicetree.get_dependent_devices.side_effect = lambda disk: dependents[disk.id]
+
+        # all disks with devices depending on the VG
+        self.assertEqual(utils._reload_scope(vg), [disk1, disk2])
+        self.assertEqual(utils._reload_scope(disk3), [disk3])
+
+        # pending action on one of the disks
+        utils.storage.devicetree.actions = [MagicMock(device=MagicMock(id=6, disks=[disk2]))]
+        result = utils.reload_device(vg)
+        self.assertFalse(result.success)
+        self.assertIsNotNone(result.message)
+        utils.storage.devicetree.recursive_remove.assert_not_called()
+
+        # no actions for the disks -- disks are removed and scanned again
+        utils.storage.devicetree.actions = [MagicMock(device=MagicMock(id=7, disks=[disk3]))]
+        infos = {disk1.sysfs_path: {"name": "sda"}, disk2.sysfs_path: None}
+        udev.get_device.side_effect = lambda sysfs_path: infos[sysfs_path]
+        utils._disk_partitions_info = MagicMock(return_value=[{"name": "sda1"}])
+        utils._scan_devices = MagicMock()
+
+        result = utils.reload_device(vg)
+        self.assertTrue(result.success)
+        self.assertEqual([c[0][0] for c in utils.storage.devicetree.recursive_remove.call_args_list], [disk1, disk2])
+        # sdb disappeared
+        utils.storage.devicetree.hide.assert_called_once_with(disk2)
+        # original formats are read again
+        utils._scan_devices.assert_called_once_with([{"name": "sda"}, {"name": "sda1"}], update_orig_fmt=True)
+        utils._invalidate_free_regions.assert_called_once_with([disk1, disk2])
+        utils._device_index.rebuild.assert_called_once_with()
+
+        # scanned devices get their original formats updated
+        del utils._scan_devices
+        udev.device_get_sysfs_path.side_effect = lambda info: info["name"]
+        udev.device_get_holders.return_value = []
+        utils._scan_devices([{"name": "sda"}], update_orig_fmt=True)
+        utils.storage.devicetree.handle_device.assert_called_once_with({"name": "sda"}, update_orig_fmt=True)
+
+    @patch("blivetgui.blivet_utils.blivet.udev")
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    def test_apply_udev_events(self, udev):
+        utils = BlivetUtils()
+        utils.storage = MagicMock(names=["sda", "sdb"])
+        utils._rescan_disks = MagicMock()
+
+        disk1 = MagicMock(id=1, is_disk=True, sysfs_path="/sys/block/sda")
+        disk2 = MagicMock(id=2, is_disk=True, sysfs_path="/sys/block/sdb")
+        part = MagicMock(id=3, is_disk=False, disks=[disk2])
+
+        devices = {disk1.sysfs_path: disk1, disk2.sysfs_path: disk2, "/sys/block/sdb/sdb1": part}
+        utils.storage.devicetree.get_device_by_sysfs_path.side_effect = lambda path, **kwargs: devices.get(path)
+        utils.storage.devicetree.get_dependent_devices.return_value = []
+        utils.storage.devicetree.actions = []
+
+        # change of a known partition and a new partition on a known disk
+        self.assertTrue(utils.apply_udev_events([("change", "/sys/block/sdb/sdb1"), ("add", "/sys/block/sda/sda1")]))
+        utils._rescan_disks.assert_called_once_with([disk2, disk1], [])
+
+        # disks with pending actions are not changed
+        utils._rescan_disks.reset_mock()
+        utils.storage.devicetree.actions = [MagicMock(device=part)]
+        self.assertFalse(utils.apply_udev_events([("remove", "/sys/block/sdb/sdb1")]))
+        utils._rescan_disks.assert_not_called()
+
+        # removed device we don't know about
+        self.assertFalse(utils.apply_udev_events([("remove", "/sys/block/sdc")]))
+        utils._rescan_disks.assert_not_called()
+
+        # new disk -- added to the tree
+        udev.get_device.return_value = {"name": "sdc"}
+
+        def _rescan(_disks, _infos):
+            utils.storage.names = ["sda", "sdb", "sdc"]
+        utils._rescan_disks.side_effect = _rescan
+
+        self.assertTrue(utils.apply_udev_events([("add", "/sys/block/sdc")]))
+        utils._rescan_disks.assert_called_once_with([], [{"name": "sdc"}])
+
+        # new device that was ignored -- nothing changed
+        utils._rescan_disks.reset_mock()
+        utils._rescan_disks.side_effect = None
+        self.assertFalse(utils.apply_udev_events([("add", "/sys/block/sdc")]))
+        utils._rescan_disks.assert_called_once_with([], [{"name": "sdc"}])
+
+    @patch("blivetgui.blivet_utils.BlivetUtils.__init__", lambda a: None)
+    def test_add_devices(self):
+        utils = BlivetUtils()
+        utils.storage = MagicMock()
+        utils._do_partitioning = MagicMock()
+
+        class ActionList(list):
+            add = list.append
+
+        def _add(_utils, user_input):
+            if user_input.fail:
+                # some actions were already applied by the handler
+                utils.storage.devicetree.actions.add(MagicMock(_applied=True))
+                raise RuntimeError("failed")
+            return [MagicMock(_applied=False), MagicMock(_applied=False)]
+
+        utils.add_dict = {"partition": _add}
+
+        # all actions are scheduled and partitioning is done only once
+        old_action = MagicMock()
+        utils.storage.devicetree.actions = ActionList([old_action])
+        user_inputs = [MagicMock(device_type="partition", fail=False) for _i in range(3)]
+        result = utils.add_devices(user_inputs)
+        self.assertTrue(result.success)
+        self.assertEqual(len(result.actions), 3)
+        self.assertEqual(len(utils.storage.devicetree.actions), 7)
+        utils._do_partitioning.assert_called_once_with([ac for actions in result.actions for ac in actions])
+
+        # failure -- all actions scheduled since the start are canceled (even
+        # the ones applied by the handler)
+        utils.storage.devicetree.actions = ActionList([old_action])
+        utils._do_partitioning.reset_mock()
+        user_inputs[2].fail = True
+        result = utils.add_devices(user_inputs)
+        self.assertFalse(result.success)
+        self.assertIsInstance(result.exception, RuntimeError)
+        self.assertEqual(utils.storage.devicetree.actions, [old_action])
+        utils._do_partitioning.assert_not_called()
+
+        # partitioning failure
+        user_inputs[2].fail = False
+        utils._do_partitioning.side_effect = RuntimeError("partitioning failed")
+        result = utils.add_devices(user_inputs)
+        self.assertFalse(result.success)
+        self.assertEqual(utils.storage.devicetree.actions, [old_action])
+
+
+class DaemonThreadPoolTest(unittest.TestCase):
+
+    def test_pool(self):
+        pool = DaemonThreadPool(1, "test-pool")
+        pool.idle_timeout = 0.1
+
+        # hanging task doesn't block the interpreter exit
+        release = threading.Event()
+        hanging = pool.submit(release.wait, 5)
+        self.assertTrue(all(thread.daemon for thread in pool._threads))
+        self.assertEqual(len(pool._threads), 1)
+
+        # tasks waiting for a thread can be canceled
+        waiting = pool.submit(lambda: None)
+        self.assertTrue(waiting.cancel())
+
+        failing = pool.submit(functools.partial(int, "a"))
+        release.set()
+        self.assertTrue(hanging.result(timeout=5))
+        with self.assertRaises(ValueError):
+            failing.result(timeout=5)
+
+        # idle threads exit
+        idle = threading.Event()
+        for _i in range(500):
+            if not pool._threads:
+                break
+            idle.wait(0.01)
+        self.assertEqual(pool._threads, [])
+        self.assertEqual(pool.submit(len, "abc").result(timeout=5), 3)
+
 
 if __name__ == "__main__":
     unittest.main()